@@ -0,0 +1,87 @@
+"""Benchmark: streaming vs vectorized OHLCV bars over all timeframes.
+
+Generates a random trade stream over several sessions, feeds it tick by
+tick to BarEngine (every timeframe at once), backfills the same ticks
+vectorized, checks both give identical bars and compares with a list of
+dicts for one timeframe, as the old GUI built its 1-minute bars. Run from
+the repository root:
+    python -m benchmarks.bench_bars --count 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from bos_bars import BarEngine, TIMEFRAMES, DEFAULT_TIMEFRAMES
+
+ISIN = 'PL0GF0031252'
+
+
+def make_trades(count, seed=1):
+    rng = np.random.default_rng(seed)
+    start_ns = 1_760_000_000 * 1_000_000_000
+    gaps = rng.exponential(0.2, count)  # średnio 5 transakcji na sekundę
+    timestamps = start_ns + (np.cumsum(gaps) * 1e9).astype(np.int64)
+    prices = 2500 + np.cumsum(rng.integers(-1, 2, count))
+    sizes = rng.integers(1, 21, count)
+    return timestamps, prices.astype(np.int64), sizes.astype(np.int64)
+
+
+def dict_bars(timestamps, prices, sizes, period):
+    bars = []
+    current = None
+    period_ns = period * 1_000_000_000
+    for timestamp_ns, price, size in zip(timestamps, prices, sizes):
+        start = timestamp_ns // period_ns * period_ns
+        if current is None or start != current['time']:
+            if current is not None:
+                bars.append(current)
+            current = {'time': start, 'open': price, 'high': price, 'low': price, 'close': price, 'volume': size}
+        else:
+            current['high'] = max(current['high'], price)
+            current['low'] = min(current['low'], price)
+            current['close'] = price
+            current['volume'] += size
+    return bars
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=1_000_000, help='Liczba transakcji')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    timestamps, prices, sizes = make_trades(args.count, args.seed)
+    span_h = (timestamps[-1] - timestamps[0]) / 3.6e12
+    capacity = args.count  # wszystkie świece w pamięci, aby porównać całość
+    ticks = list(zip(timestamps.tolist(), prices.tolist(), sizes.tolist()))
+    print(f"{args.count} transakcji z {span_h:.0f} h, interwały {', '.join(DEFAULT_TIMEFRAMES)}")
+
+    streaming = BarEngine(capacity=capacity, utc_offset=0)
+    update = streaming.update
+    start = time.perf_counter()
+    for timestamp_ns, price, size in ticks:
+        update(ISIN, timestamp_ns, price, size)
+    stream_s = time.perf_counter() - start
+    print(f"  strumieniowo (update)        {stream_s / args.count * 1e6:>7.2f} µs/tick   {args.count / stream_s:>12,.0f} ticków/s")
+
+    backfilled = BarEngine(capacity=capacity, utc_offset=0)
+    start = time.perf_counter()
+    counts = backfilled.backfill(ISIN, timestamps, prices, sizes)
+    backfill_s = time.perf_counter() - start
+    print(f"  wektorowo (backfill)         {backfill_s / args.count * 1e6:>7.3f} µs/tick   {args.count / backfill_s:>12,.0f} ticków/s  ({stream_s / backfill_s:.0f}x)")
+
+    for timeframe in DEFAULT_TIMEFRAMES:
+        a, b = streaming.bars(ISIN, timeframe), backfilled.bars(ISIN, timeframe)
+        assert len(a) == counts[timeframe] and all(np.array_equal(x, y) for x, y in zip(a, b)), timeframe
+
+    start = time.perf_counter()
+    bars = dict_bars(timestamps.tolist(), prices.tolist(), sizes.tolist(), TIMEFRAMES['1m'])
+    dict_s = time.perf_counter() - start
+    assert len(bars) + 1 == counts['1m']
+    print(f"  lista słowników, tylko 1m    {dict_s / args.count * 1e6:>7.2f} µs/tick   {args.count / dict_s:>12,.0f} ticków/s")
+    print(f"  świece: {counts}, pamięć {backfilled.nbytes() / 1e6:.0f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+"""End-to-end benchmarks of BossaAPIClient against the local NOL3 simulator.
+
+Measures async-channel throughput (frame -> _parse_market_data -> gui_queue),
+tick-to-GUI latency of MktDataInc -> MARKET_DATA_UPDATE, and order round trips
+of send_limit_order / cancel_order; then the same order round trips and
+tick-to-event latency for AsyncBossaAPIClient on the same simulator. Run
+from the repository root:
+    python -m benchmarks.bench_e2e --output benchmarks/results/e2e.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import queue
+import threading
+import time
+from datetime import datetime
+
+from bos_async import AsyncBossaAPIClient
+from bos_bot import BossaAPIClient, TICK_SIZES
+from bos_fixml import FIXML_OPEN, FIXML_CLOSE
+from bos_price import TickTable
+from bos_simulator import NOL3Simulator
+
+ISIN = "PL0GF0031252"
+ACCOUNT = "00-22-000000"
+
+
+def mkt_data_inc(price):
+    return f'{FIXML_OPEN}<MktDataInc><Inc Typ="2" Px="{price:.2f}" Sz="1"><Instrmt ID="{ISIN}" Src="4"/></Inc></MktDataInc>{FIXML_CLOSE}'
+
+
+def summarize(samples_ns):
+    """p50/p99/max/mean of nanosecond samples, reported in microseconds."""
+    if not samples_ns:
+        return {'samples': 0}
+    ordered = sorted(samples_ns)
+    def pct(p):
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))] / 1000
+    return {'samples': len(ordered), 'p50': pct(50), 'p90': pct(90), 'p99': pct(99), 'max': ordered[-1] / 1000, 'mean': sum(ordered) / len(ordered) / 1000}
+
+
+class GuiConsumer(threading.Thread):
+    """Stands in for BossaApp.process_queue, timestamping MARKET_DATA_UPDATE."""
+
+    def __init__(self, gui_queue):
+        super().__init__(daemon=True)
+        self.gui_queue = gui_queue
+        self.market_updates = 0
+        self.connected = threading.Event()
+        self._wanted = None
+        self._seen_at = None
+        self._seen = threading.Event()
+
+    def expect_price(self, price):
+        self._seen.clear()
+        self._wanted = price
+
+    def wait_seen(self, timeout):
+        return self._seen_at if self._seen.wait(timeout) else None
+
+    def run(self):
+        while True:
+            message_type, data = self.gui_queue.get()
+            if message_type is None:
+                return
+            if message_type == "MARKET_DATA_UPDATE":
+                now = time.perf_counter_ns()
+                self.market_updates += 1
+                if self._wanted is not None and data.get('last_price') == self._wanted:
+                    self._wanted = None
+                    self._seen_at = now
+                    self._seen.set()
+            elif message_type == "LOG" and "asynchronicznym" in str(data):
+                self.connected.set()
+
+
+def bench_throughput(simulator, consumer, messages, batch=1000):
+    frames = [mkt_data_inc(1000 + i * 0.01) for i in range(messages)]
+    target = consumer.market_updates + messages
+    start = time.perf_counter()
+    for i in range(0, messages, batch):
+        simulator.push(*frames[i:i + batch])
+    deadline = start + 120
+    while consumer.market_updates < target and time.perf_counter() < deadline:
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    received = messages - (target - consumer.market_updates)
+    return {'messages': messages, 'received': received, 'seconds': round(elapsed, 4), 'msg_per_s': round(received / elapsed, 1)}
+
+
+def bench_tick_to_gui(simulator, consumer, samples):
+    latencies = []
+    for i in range(samples):
+        price = 5000 + i
+        consumer.expect_price(f"{price:.2f}")
+        sent_at = time.perf_counter_ns()
+        simulator.push(mkt_data_inc(price))
+        seen_at = consumer.wait_seen(1.0)
+        if seen_at is not None:
+            latencies.append(seen_at - sent_at)
+    return summarize(latencies)
+
+
+def bench_orders(simulator, client, samples):
+    send_ns, cancel_ns = [], []
+    for _ in range(samples):
+        # Limit daleko od rynku, żeby symulator nie wykonał zlecenia przed anulatą.
+        start = time.perf_counter_ns()
+        client.send_limit_order(ACCOUNT, "Kupno", 1, 1)
+        send_ns.append(time.perf_counter_ns() - start)
+        with simulator._lock:
+            ord_id = max(simulator.orders, default=None)
+        if ord_id is None:
+            continue
+        start = time.perf_counter_ns()
+        client.cancel_order({'id_dm': ord_id, 'k_s_text': "Kupno", 'ilosc': 1, 'rachunek': ACCOUNT})
+        cancel_ns.append(time.perf_counter_ns() - start)
+    return {'send_limit_order': summarize(send_ns), 'cancel_order': summarize(cancel_ns)}
+
+
+async def bench_async_client(simulator, samples):
+    # Ta sama tabela ticków co BossaAPIClient, więc ceny FW20 są w punktach.
+    client = AsyncBossaAPIClient("BOS", "BOS", simulator.sync_port, simulator.async_port, ticks=TickTable(TICK_SIZES))
+    try:
+        if not await client.login():
+            raise SystemExit("AsyncBossaAPIClient nie zalogował się do symulatora.")
+        await client.add_to_filter(ISIN)
+        send_ns, cancel_ns = [], []
+        for _ in range(samples):
+            start = time.perf_counter_ns()
+            report = await client.send_limit_order(ACCOUNT, "Kupno", 1, 1, ISIN)
+            send_ns.append(time.perf_counter_ns() - start)
+            if report is None:
+                continue
+            start = time.perf_counter_ns()
+            await client.cancel_order({'id_dm': report.order_id, 'k_s_text': "Kupno", 'ilosc': 1, 'rachunek': ACCOUNT}, ISIN)
+            cancel_ns.append(time.perf_counter_ns() - start)
+
+        events = client.events()
+        # Symulator wita nowego klienta asynchronicznego wyciągiem; dopiero potem ticki do niego trafią.
+        async for message_type, _ in events:
+            if message_type == "PORTFOLIO_UPDATE":
+                break
+        latencies = []
+        for i in range(samples):
+            price = 7000 + i
+            sent_at = time.perf_counter_ns()
+            simulator.push(mkt_data_inc(price))
+            async for message_type, data in events:
+                if message_type == "MARKET_DATA_UPDATE" and ISIN in data:
+                    break
+            latencies.append(time.perf_counter_ns() - sent_at)
+            last_price = data[ISIN].get('last_price')
+            assert last_price == price, f"AsyncBossaAPIClient: cena {last_price} zamiast {price} ticków"
+        return {'send_limit_order': summarize(send_ns), 'cancel_order': summarize(cancel_ns), 'tick_to_event': summarize(latencies)}
+    finally:
+        await client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=100_000, help='Ramki MktDataInc w teście przepustowości')
+    parser.add_argument('--latency-samples', type=int, default=2000, help='Próbki tick-to-GUI')
+    parser.add_argument('--order-samples', type=int, default=500, help='Pary zlecenie/anulata')
+    parser.add_argument('--async-samples', type=int, default=500, help='Pary zlecenie/anulata i ticki dla AsyncBossaAPIClient')
+    parser.add_argument('--output', help='Plik JSON z wynikami (domyślnie benchmarks/results/e2e-<czas>.json)')
+    args = parser.parse_args()
+
+    simulator = NOL3Simulator(rate=0, heartbeat_interval=3600, statement_interval=3600).start()
+    gui_queue = queue.Queue()
+    consumer = GuiConsumer(gui_queue)
+    consumer.start()
+    # Bez konflacji: mierzymy drogę każdego ticka do kolejki GUI.
+    client = BossaAPIClient("BOS", "BOS", gui_queue, sync_port=simulator.sync_port, async_port=simulator.async_port, gui_rate_hz=None)
+    threading.Thread(target=client.run, daemon=True).start()
+    if not consumer.connected.wait(5):
+        raise SystemExit("Klient nie połączył się z symulatorem.")
+    client.add_to_filter(ISIN)
+
+    results = {
+        'benchmark': 'e2e',
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': vars(args),
+        'async_throughput': bench_throughput(simulator, consumer, args.messages),
+        'tick_to_gui_latency_us': bench_tick_to_gui(simulator, consumer, args.latency_samples),
+        'order_round_trip_us': bench_orders(simulator, client, args.order_samples),
+    }
+    if client.async_pipeline is not None:
+        results['async_pipeline'] = client.async_pipeline.stats()
+    results['sync_channel'] = client.sync_channel.stats()
+    results['internal_latency'] = client.latency.report()
+
+    client.disconnect()
+    gui_queue.put((None, None))
+    results['async_client_us'] = asyncio.run(bench_async_client(simulator, args.async_samples))
+    simulator.stop()
+
+    output = args.output or os.path.join('benchmarks', 'results', f"e2e-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"Zapisano {output}")
+
+
+if __name__ == '__main__':
+    main()
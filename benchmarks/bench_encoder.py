@@ -0,0 +1,56 @@
+"""Microbenchmark: f-string builders vs precompiled-template encoder, orders per second.
+
+Both sides produce a framed order ready for the socket. Run from the
+repository root:
+    python -m benchmarks.bench_encoder --count 200000
+"""
+import argparse
+import time
+
+import bos_fixml
+from bos_encoder import FixmlEncoder
+from bos_price import TickTable
+from bos_transport import encode_frame
+
+ISIN = 'PL0GF0031252'
+ACCOUNT = '00-22-123456'
+
+
+def legacy_order(order_id, ticks):
+    return encode_frame(bos_fixml.build_limit_order(order_id, ACCOUNT, '1', 1, 2500 + order_id % 50, ISIN, ticks))
+
+
+def legacy_cancel(order_id, ticks):
+    return encode_frame(bos_fixml.build_cancel_request(order_id, str(order_id - 1), ACCOUNT, '2', 1, ISIN))
+
+
+def run(build, count):
+    start = time.perf_counter()
+    for order_id in range(1, count + 1):
+        build(order_id)
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=200000)
+    args = parser.parse_args()
+
+    ticks = TickTable({ISIN: '1'})
+    encoder = FixmlEncoder(ticks)
+    # Ta sama sekunda po obu stronach - ramki muszą być identyczne.
+    assert encoder.limit_order(7, ACCOUNT, '1', 1, 2507, ISIN).frame == legacy_order(7, ticks)
+    assert encoder.cancel(7, '6', ACCOUNT, '2', 1, ISIN).frame == legacy_cancel(7, ticks)
+
+    cases = (
+        ("Order, f-string + strftime", lambda i: legacy_order(i, ticks)),
+        ("Order, szablon + cache czasu", lambda i: encoder.limit_order(i, ACCOUNT, '1', 1, 2500 + i % 50, ISIN)),
+        ("OrdCxlReq, f-string + strftime", lambda i: legacy_cancel(i, ticks)),
+        ("OrdCxlReq, szablon + cache czasu", lambda i: encoder.cancel(i, str(i - 1), ACCOUNT, '2', 1, ISIN)),
+    )
+    for name, build in cases:
+        print(f"{name:<34} {run(build, args.count):>12,.0f} zleceń/s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Microbenchmark: legacy _receive_message vs FrameReader.
+
+Run from the repository root:
+    python -m benchmarks.bench_framing
+"""
+import argparse
+import socket
+import struct
+import threading
+import time
+
+from bos_transport import FRAME_HEADER, FrameReader
+
+MKT_DATA_INC = ('<FIXML v="5.0" r="20080317" s="20080314"><MktDataInc>'
+                '<Inc Typ="0" Px="2345.00" Sz="12"><Instrmt ID="PL0GF0031252" Src="4"/></Inc>'
+                '<Inc Typ="1" Px="2346.00" Sz="7"><Instrmt ID="PL0GF0031252" Src="4"/></Inc>'
+                '</MktDataInc></FIXML>')
+
+
+def make_statement(positions):
+    rows = ''.join(f'<Position Acc110="{i}" Acc120="0"><Instrmt Sym="SYM{i}" ID="PL{i:010d}"/></Position>' for i in range(positions))
+    return f'<FIXML v="5.0" r="20080317" s="20080314"><Statement Acct="00-22-000001"><Fund name="SaldoGot" value="1000"/>{rows}</Statement></FIXML>'
+
+
+def legacy_receive_message(sock):
+    # Kopia BossaAPIClient._receive_message sprzed FrameReader.
+    header_data = sock.recv(4)
+    if not header_data: return None
+    message_length = struct.unpack('<I', header_data)[0]
+    if message_length == 0: return ""
+    message_data = b''
+    while len(message_data) < message_length:
+        chunk = sock.recv(message_length - len(message_data))
+        if not chunk: raise ConnectionError("Przerwano połączenie.")
+        message_data += chunk
+    return message_data.decode('utf-8', 'replace').strip().rstrip('\x00')
+
+
+def run_case(name, message, count, read_factory):
+    payload = message.encode('utf-8')
+    blob = (FRAME_HEADER.pack(len(payload)) + payload) * count
+    reader_sock, writer_sock = socket.socketpair()
+    writer = threading.Thread(target=lambda: (writer_sock.sendall(blob), writer_sock.close()), daemon=True)
+    read = read_factory(reader_sock)
+    start = time.perf_counter()
+    writer.start()
+    received = 0
+    while read() is not None:
+        received += 1
+    elapsed = time.perf_counter() - start
+    writer.join()
+    reader_sock.close()
+    assert received == count, (name, received, count)
+    mb = len(blob) / elapsed / 1e6
+    print(f"{name:<34} {count:>8} ramek  {count / elapsed:>12,.0f} msg/s  {mb:>8.1f} MB/s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--small', type=int, default=200_000, help='Liczba ramek MktDataInc')
+    parser.add_argument('--large', type=int, default=200, help='Liczba ramek Statement')
+    parser.add_argument('--positions', type=int, default=5000, help='Pozycji w jednym Statement')
+    args = parser.parse_args()
+
+    statement = make_statement(args.positions)
+    print(f"MktDataInc: {len(MKT_DATA_INC)} B, Statement: {len(statement)} B")
+    for label, message, count in (('MktDataInc', MKT_DATA_INC, args.small), ('Statement', statement, args.large)):
+        run_case(f"{label} legacy _receive_message", message, count, lambda s: lambda: legacy_receive_message(s))
+        run_case(f"{label} FrameReader.read_message", message, count, lambda s: FrameReader(s).read_message)
+        run_case(f"{label} FrameReader.read_frame", message, count, lambda s: FrameReader(s).read_frame)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Benchmark: streaming vs vectorized SMA/EMA/RSI/MACD.
+
+Times one O(1) update per value for each indicator, then the vectorized
+backfill of the same history against feeding it value by value, checking
+both give the same results and that streaming continues from the
+backfilled state. Run from the repository root:
+    python -m benchmarks.bench_indicators --count 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from bos_indicators import SMA, EMA, RSI, MACD
+
+CASES = {
+    'SMA(20)': lambda: SMA(20),
+    'EMA(20)': lambda: EMA(20),
+    'RSI(14)': lambda: RSI(14),
+    'MACD(12,26,9)': lambda: MACD(),
+}
+
+
+def as_array(values, field=None):
+    if field is not None:
+        values = [None if value is None else getattr(value, field) for value in values]
+    return np.array([np.nan if value is None else value for value in values], np.float64)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=1_000_000, help='Liczba wartości (zamknięć świec)')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    closes = (2500 + np.cumsum(rng.integers(-3, 4, args.count))).astype(np.float64)
+    values = closes.tolist()
+    half = args.count // 2
+    print(f"{args.count} wartości")
+    for name, make in CASES.items():
+        indicator = make()
+        update = indicator.update
+        start = time.perf_counter()
+        streamed = [update(value) for value in values]
+        stream_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        backfilled = make().backfill(closes)
+        backfill_s = time.perf_counter() - start
+
+        continued = make()
+        continued.backfill(closes[:half])
+        tail = [continued.update(value) for value in values[half:]]
+        if name.startswith('MACD'):
+            for field in ('macd', 'signal'):
+                assert np.allclose(as_array(streamed, field), getattr(backfilled, field), rtol=1e-9, atol=1e-9, equal_nan=True)
+                assert np.allclose(as_array(tail, field), as_array(streamed[half:], field), rtol=1e-9, atol=1e-9, equal_nan=True)
+        else:
+            assert np.allclose(as_array(streamed), backfilled, rtol=1e-9, equal_nan=True)
+            assert np.allclose(as_array(tail), as_array(streamed[half:]), rtol=1e-9, equal_nan=True)
+        print(f"  {name:<14} update {stream_s / args.count * 1e6:>6.2f} µs/wartość   backfill {backfill_s / args.count * 1e6:>6.3f} µs/wartość  ({stream_s / backfill_s:.0f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Microbenchmark: ElementTree vs scanner MktDataInc parsing, dicts vs QuoteStore.
+
+The feed is generated by NOL3Simulator (seeded) or read from a file with one
+FIXML message per line. Run from the repository root:
+    python -m benchmarks.bench_market_data
+"""
+import argparse
+import time
+
+import bos_fixml
+from bos_quotes import QuoteStore
+from bos_simulator import NOL3Simulator
+
+
+def simulated_feed(count, seed):
+    simulator = NOL3Simulator(seed=seed)
+    simulator.subscribed.update(simulator.instruments)
+    return [frame[4:].decode('utf-8') for frame in simulator._market_data_frames(count)]
+
+
+def run_case(name, apply, feed, repeat, store_factory=dict):
+    best = None
+    for _ in range(repeat):
+        market_data = store_factory()
+        start = time.perf_counter()
+        for message in feed:
+            apply(message, market_data)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{name:<28} {len(feed):>8} msg  {len(feed) / best:>12,.0f} msg/s  {best / len(feed) * 1e6:>7.2f} µs/msg")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=100_000, help='Liczba komunikatów z symulatora')
+    parser.add_argument('--feed', help='Plik z komunikatami MktDataInc, jeden na linię')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    if args.feed:
+        with open(args.feed, encoding='utf-8') as f:
+            feed = [line.strip() for line in f if '<MktDataInc' in line]
+    else:
+        feed = simulated_feed(args.count, args.seed)
+
+    tree_market_data, fast_market_data = {}, {}
+    for message in feed:
+        bos_fixml.apply_market_data_tree(message, tree_market_data)
+        bos_fixml.apply_market_data(message, fast_market_data)
+    assert tree_market_data == fast_market_data, "Parsery dają różne notowania"
+
+    tree = run_case("ElementTree", bos_fixml.apply_market_data_tree, feed, args.repeat)
+    fast = run_case("skaner (apply_market_data)", bos_fixml.apply_market_data, feed, args.repeat)
+    store = run_case("QuoteStore.apply_market_data", lambda message, quotes: quotes.apply_market_data(message), feed, args.repeat, QuoteStore)
+    print(f"przyspieszenie: skaner {tree / fast:.1f}x, QuoteStore {tree / store:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Microbenchmark: per-update cost of the order book engine at 10 and 50 levels.
+
+Replays a random stream of new/change/delete level updates, checked
+against a plain-list reference model, then times OrderBook.apply alone,
+a best-level + cumulative read after each update, and the full MktDataInc
+path (parse + apply). Run from the repository root:
+    python -m benchmarks.bench_order_book --depth 10 50
+"""
+import argparse
+import random
+import time
+
+import bos_fixml
+from bos_book import OrderBook, OrderBooks, NEW, CHANGE, DELETE
+from bos_price import TickTable
+
+ISIN = 'PL0GF0031252'
+
+
+def make_updates(depth, count, seed=1):
+    """Random (action, Typ, level, price, size) updates that keep each side sorted and in depth."""
+    rng = random.Random(seed)
+    sides = {'0': [], '1': []}
+    updates = []
+    for _ in range(count):
+        typ = rng.choice('01')
+        levels = sides[typ]
+        action = rng.choice((NEW, CHANGE, CHANGE, DELETE)) if levels else NEW
+        if action == NEW and len(levels) < depth:
+            level = rng.randint(1, len(levels) + 1)
+            # Cena między sąsiednimi poziomami - strona zostaje posortowana.
+            if typ == '0':
+                upper = levels[level - 2][0] if level > 1 else 3000
+                lower = levels[level - 1][0] if level <= len(levels) else upper - 20
+            else:
+                lower = levels[level - 2][0] if level > 1 else 2000
+                upper = levels[level - 1][0] if level <= len(levels) else lower + 20
+            if upper - lower < 2:
+                action = CHANGE
+            else:
+                price = rng.randint(lower + 1, upper - 1)
+                levels.insert(level - 1, (price, rng.randint(1, 50)))
+                updates.append((NEW, typ, level, price, levels[level - 1][1]))
+                continue
+        if not levels:
+            continue
+        level = rng.randint(1, len(levels))
+        if action == DELETE:
+            del levels[level - 1]
+            updates.append((DELETE, typ, level, None, 0))
+        else:
+            size = rng.randint(1, 50)
+            levels[level - 1] = (levels[level - 1][0], size)
+            updates.append((CHANGE, typ, level, None, size))
+    return updates, sides
+
+
+def to_message(update):
+    action, typ, level, price, size = update
+    px = f' Px="{price}.00"' if price is not None else ''
+    return f'{bos_fixml.FIXML_OPEN}<MktDataInc><Inc UpdtAct="{action}" Typ="{typ}"{px} Sz="{size}" MDPxLvl="{level}"><Instrmt ID="{ISIN}" Src="4"/></Inc></MktDataInc>{bos_fixml.FIXML_CLOSE}'
+
+
+def run(depth, count):
+    updates, expected = make_updates(depth, count)
+    book = OrderBook(ISIN, depth)
+    start = time.perf_counter_ns()
+    for update in updates:
+        book.apply(*update)
+    apply_ns = (time.perf_counter_ns() - start) / len(updates)
+    assert book.bids.levels() == expected['0'] and book.asks.levels() == expected['1']
+
+    book = OrderBook(ISIN, depth)
+    bids, asks = book.bids, book.asks
+    start = time.perf_counter_ns()
+    for update in updates:
+        book.apply(*update)
+        bids.best(), asks.best(), bids.cumulative(depth), asks.cumulative(depth)
+    read_ns = (time.perf_counter_ns() - start) / len(updates)
+
+    messages = [to_message(update) for update in updates]
+    books = OrderBooks(depth, TickTable({ISIN: '1'}))
+    start = time.perf_counter_ns()
+    for message in messages:
+        books.apply_market_data(message)
+    message_ns = (time.perf_counter_ns() - start) / len(messages)
+    assert books.get(ISIN).bids.levels() == expected['0'] and books.get(ISIN).asks.levels() == expected['1']
+    return len(updates), apply_ns, read_ns, message_ns
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--depth', type=int, nargs='+', default=[10, 50])
+    parser.add_argument('--count', type=int, default=200000)
+    args = parser.parse_args()
+
+    for depth in args.depth:
+        count, apply_ns, read_ns, message_ns = run(depth, args.count)
+        print(f"{depth} poziomów, {count} aktualizacji:")
+        print(f"  OrderBook.apply                   {apply_ns / 1000:>7.2f} µs/aktualizację")
+        print(f"  apply + najlepsze + skumulowane   {read_ns / 1000:>7.2f} µs/aktualizację")
+        print(f"  MktDataInc (parsowanie + apply)   {message_ns / 1000:>7.2f} µs/komunikat")
+
+
+if __name__ == '__main__':
+    main()
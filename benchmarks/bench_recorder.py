@@ -0,0 +1,89 @@
+"""Benchmark: cost of recording the async feed on the listener thread at 50k msg/s.
+
+Feeds simulator MktDataInc frames to FeedRecorder.record at a paced rate
+(the listener's view: time spent in record per frame) and at full speed,
+then checks that the writer kept up (nothing dropped or pending), that
+the capture reads back frame for frame and that a time seek lands on the
+right record. Run from the repository root:
+    python -m benchmarks.bench_recorder --rate 50000 --seconds 5
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from bos_recorder import FeedRecorder, FeedReader, ASYNC_IN, index_path
+from bos_simulator import NOL3Simulator
+
+
+def simulated_frames(count, seed):
+    simulator = NOL3Simulator(seed=seed)
+    simulator.subscribed.update(simulator.instruments)
+    return [frame[4:] for frame in simulator._market_data_frames(count)]
+
+
+def paced(recorder, frames, rate, seconds):
+    """Call record at ``rate`` per second; return per-call costs in ns."""
+    costs = []
+    interval = 1_000_000_000 / rate
+    total = int(rate * seconds)
+    start = time.perf_counter_ns()
+    for i in range(total):
+        due = start + int(i * interval)
+        while time.perf_counter_ns() < due:
+            pass
+        t0 = time.perf_counter_ns()
+        recorder.record(ASYNC_IN, frames[i % len(frames)])
+        costs.append(time.perf_counter_ns() - t0)
+    return costs, (time.perf_counter_ns() - start) / 1e9
+
+
+def flat_out(recorder, frames, count):
+    start = time.perf_counter_ns()
+    record = recorder.record
+    for i in range(count):
+        record(ASYNC_IN, frames[i % len(frames)])
+    return (time.perf_counter_ns() - start) / count
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rate', type=int, default=50_000, help='Komunikatów na sekundę')
+    parser.add_argument('--seconds', type=float, default=5.0)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    frames = simulated_frames(10_000, args.seed)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'session.feed')
+        recorder = FeedRecorder(path).start()
+        costs, elapsed = paced(recorder, frames, args.rate, args.seconds)
+        pending = recorder.stats()['pending']
+        recorder.close()
+        stats = recorder.stats()
+        costs.sort()
+        size = os.path.getsize(path)
+        print(f"{len(costs)} ramek w {elapsed:.2f} s ({len(costs) / elapsed:,.0f} msg/s), {size / 1e6:.1f} MB, indeks {os.path.getsize(index_path(path))} B")
+        print(f"  record (wątek nasłuchu)  mediana {statistics.median(costs) / 1000:.2f} µs  p99 {percentile(costs, 0.99) / 1000:.2f} µs  max {costs[-1] / 1000:.1f} µs")
+        print(f"  zapis w tle              {stats['batches']} partii, najw. {stats['max_batch']} ramek, w kolejce na koniec {pending}, odrzucone {stats['dropped']}")
+
+        with FeedReader(path) as reader:
+            records = list(reader)
+            assert len(records) == len(costs) and all(r.payload == frames[i % len(frames)] for i, r in enumerate(records))
+            middle = records[len(records) // 2].timestamp_ns
+            first = next(reader.records(start_ns=middle))
+            assert first.timestamp_ns == middle
+
+        recorder = FeedRecorder(path).start()
+        record_ns = flat_out(recorder, frames, len(costs))
+        recorder.close()
+        print(f"  bez tempa                {record_ns / 1000:.2f} µs/ramkę ({1e9 / record_ns:,.0f} ramek/s), odrzucone {recorder.stats()['dropped']}")
+
+
+if __name__ == '__main__':
+    main()
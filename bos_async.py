@@ -0,0 +1,210 @@
+import asyncio
+import itertools
+import threading
+
+import bos_fixml
+from bos_encoder import FixmlEncoder
+from bos_price import TICKS
+from bos_transport import FRAME_HEADER, decode_frame, encode_frame
+
+
+async def read_frame(reader):
+    """Read one length-prefixed FIXML message from a StreamReader, None on EOF."""
+    try:
+        header = await reader.readexactly(4)
+    except asyncio.IncompleteReadError as e:
+        if e.partial: raise ConnectionError("Przerwano połączenie.") from e
+        return None
+    try:
+        payload = await reader.readexactly(FRAME_HEADER.unpack(header)[0])
+    except asyncio.IncompleteReadError as e:
+        raise ConnectionError("Przerwano połączenie.") from e
+    return decode_frame(payload)
+
+
+def _market_data_event(message, ticks):
+    quotes = {}
+    bos_fixml.apply_market_data(message, quotes, ticks)
+    return ("MARKET_DATA_UPDATE", quotes)
+
+
+# Typ komunikatu FIXML -> funkcja (message, ticks) zwracająca zdarzenie (message_type, data).
+ASYNC_EVENT_PARSERS = {
+    'ExecRpt': lambda message, ticks: ("EXEC_REPORT", bos_fixml.parse_execution_report(message, ticks)),
+    'MktDataInc': _market_data_event,
+    'Statement': lambda message, ticks: ("PORTFOLIO_UPDATE", bos_fixml.parse_portfolio(message)),
+    'Heartbeat': lambda message, ticks: ("HEARTBEAT", None),
+    'ApplMsgRpt': lambda message, ticks: ("APPL_MSG", bos_fixml.parse_appl_msg_text(message)),
+}
+
+
+def parse_async_message(message, ticks=TICKS):
+    """Turn one async-channel message into a (message_type, data) event, prices in ``ticks``."""
+    parser = ASYNC_EVENT_PARSERS.get(bos_fixml.message_type(message))
+    return parser(message, ticks) if parser else ("ASYNC_MSG", message)
+
+
+class AsyncBossaAPIClient:
+    """bossaAPI client running entirely on one asyncio event loop.
+
+    Sync requests are served from a small pool of stream connections to the
+    NOL3 sync port, capped at ``max_connections``; further requests wait on
+    the loop instead of blocking a thread each. The async channel is exposed
+    as an async iterator of parsed ``(message_type, data)`` events. Prices
+    are integer ticks of ``ticks``; pass the same TickTable as
+    BossaAPIClient (``TickTable(TICK_SIZES)``) to get the same scale.
+    """
+
+    def __init__(self, username, password, sync_port, async_port, host='127.0.0.1', max_connections=8, ticks=TICKS):
+        self.username = username
+        self.password = password
+        self.sync_port = sync_port
+        self.async_port = async_port
+        self.host = host
+        self.is_logged_in = False
+        self._request_ids = itertools.count(2)
+        self._max_connections = max_connections
+        self._slots = None
+        self._idle = []
+        self._async_streams = None
+        self.ticks = ticks
+        self.encoder = FixmlEncoder(ticks)
+
+    def next_request_id(self):
+        return next(self._request_ids)
+
+    async def login(self):
+        """Log in over the sync channel, return True when UserStat is 1."""
+        response = await self.request(self.encoder.login(self.next_request_id(), self.username, self.password))
+        self.is_logged_in = bool(response) and '<UserRsp' in response and bos_fixml.parse_login_status(response) == '1'
+        return self.is_logged_in
+
+    async def send_limit_order(self, account, direction, quantity, price, isin):
+        """Send a day limit order (price in ticks, see bos_price), return its ExecReport or None on rejection."""
+        request = self.encoder.limit_order(self.next_request_id(), account, bos_fixml.side_code(direction), quantity, price, isin)
+        response = await self.request(request)
+        return bos_fixml.parse_execution_report(response, self.ticks) if response and '<ExecRpt' in response else None
+
+    async def cancel_order(self, order_details, isin):
+        """Cancel an order described like BossaAPIClient.cancel_order expects."""
+        request = self.encoder.cancel(self.next_request_id(), order_details['id_dm'], order_details['rachunek'], bos_fixml.side_code(order_details['k_s_text']), order_details['ilosc'], isin)
+        response = await self.request(request)
+        return bos_fixml.parse_execution_report(response, self.ticks) if response and '<ExecRpt' in response else None
+
+    async def add_to_filter(self, isin):
+        response = await self.request(self.encoder.filter_add(self.next_request_id(), isin))
+        return bool(response) and '<MktDataFull' in response
+
+    async def clear_filter(self):
+        response = await self.request(self.encoder.filter_clear(self.next_request_id()))
+        return bool(response) and '<MktDataFull' in response
+
+    async def request(self, message):
+        """Send one FIXML request on the sync channel and return the response."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self._max_connections)
+        async with self._slots:
+            reader, writer = await self._acquire()
+            try:
+                writer.write(encode_frame(message))
+                await writer.drain()
+                response = await read_frame(reader)
+                if response is None:
+                    raise ConnectionError("Serwer zamknął połączenie synchroniczne.")
+            except BaseException:
+                writer.close()
+                raise
+            if reader.at_eof():
+                writer.close()
+            else:
+                self._idle.append((reader, writer))
+            return response
+
+    async def _acquire(self):
+        # Połączenia zamknięte przez NOL3 w czasie bezczynności są odrzucane.
+        while self._idle:
+            reader, writer = self._idle.pop()
+            if not reader.at_eof() and not writer.is_closing():
+                return reader, writer
+            writer.close()
+        return await asyncio.open_connection(self.host, self.sync_port)
+
+    async def events(self):
+        """Yield parsed async-channel events until the connection closes."""
+        if self._async_streams is None:
+            self._async_streams = await asyncio.open_connection(self.host, self.async_port)
+        reader, _ = self._async_streams
+        while True:
+            message = await read_frame(reader)
+            if message is None: break
+            yield parse_async_message(message, self.ticks)
+
+    def __aiter__(self):
+        return self.events()
+
+    async def close(self):
+        streams, self._idle = self._idle, []
+        if self._async_streams is not None:
+            streams.append(self._async_streams)
+            self._async_streams = None
+        for _, writer in streams:
+            writer.close()
+        for _, writer in streams:
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+
+
+class ThreadedBossaAPIClient:
+    """Blocking facade over AsyncBossaAPIClient for thread-based callers.
+
+    One background thread runs the event loop; every call is submitted to it
+    with ``run_coroutine_threadsafe`` and async-channel events are forwarded
+    to ``gui_queue`` as ``(message_type, data)`` tuples.
+    """
+
+    def __init__(self, username, password, sync_port, async_port, gui_queue, **kwargs):
+        self.gui_queue = gui_queue
+        self.client = AsyncBossaAPIClient(username, password, sync_port, async_port, **kwargs)
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+        self._listener = None
+
+    def _call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def login(self):
+        logged_in = self._call(self.client.login())
+        if logged_in:
+            self._listener = asyncio.run_coroutine_threadsafe(self._forward_events(), self.loop)
+        return logged_in
+
+    def send_limit_order(self, account, direction, quantity, price, isin):
+        return self._call(self.client.send_limit_order(account, direction, quantity, price, isin))
+
+    def cancel_order(self, order_details, isin):
+        return self._call(self.client.cancel_order(order_details, isin))
+
+    def add_to_filter(self, isin):
+        return self._call(self.client.add_to_filter(isin))
+
+    def clear_filter(self):
+        return self._call(self.client.clear_filter())
+
+    def disconnect(self):
+        if self._listener is not None:
+            self._listener.cancel()
+        self._call(self.client.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=1)
+        self.gui_queue.put(("DISCONNECTED", None))
+
+    async def _forward_events(self):
+        try:
+            async for event in self.client:
+                self.gui_queue.put(event)
+        except Exception as e:
+            # Jak w nasłuchu synchronicznego klienta: błąd trafia do logu zamiast znikać w Future.
+            self.gui_queue.put(("LOG", f"Błąd w wątku asynchronicznym: {e}"))
@@ -0,0 +1,376 @@
+import threading
+import time
+from typing import NamedTuple
+
+try:
+    import numpy as np
+except ImportError:  # świece wymagają NumPy; klient działa bez nich
+    np = None
+
+# Interwały świec w sekundach, nazwy jak w wyborze interwału wykresu.
+TIMEFRAMES = {'1m': 60, '5m': 300, '15m': 900, '30m': 1800, '1h': 3600, '4h': 14400, '1d': 86400}
+DEFAULT_TIMEFRAMES = tuple(TIMEFRAMES)
+
+# Domyślna liczba zamkniętych świec pamiętanych na instrument i interwał (56 B na świecę).
+DEFAULT_CAPACITY = 10_000
+
+SECOND_NS = 1_000_000_000
+DAY_NS = 86400 * SECOND_NS
+
+
+class Bar(NamedTuple):
+    """One OHLCV bar; prices in ticks, start in ns since the epoch."""
+    start: int
+    open: int
+    high: int
+    low: int
+    close: int
+    volume: int
+    trades: int
+
+
+class Bars(NamedTuple):
+    """Bars of one query in chronological order, one NumPy array per column."""
+    start: "np.ndarray"   # int64, ns od epoki
+    open: "np.ndarray"    # int64, ticki
+    high: "np.ndarray"
+    low: "np.ndarray"
+    close: "np.ndarray"
+    volume: "np.ndarray"  # int64, suma Sz
+    trades: "np.ndarray"  # int64, liczba transakcji
+
+    def __len__(self):
+        return len(self.start)
+
+
+def local_utc_offset():
+    """Offset of local time from UTC in seconds, e.g. 7200 in CEST."""
+    return time.localtime().tm_gmtoff
+
+
+def exchange_time_ns(tm, now_ns, utc_offset=0):
+    """Trade time Tm ('HH:MM:SS[.fff]', local exchange time) as ns since the epoch.
+
+    The date is taken from ``now_ns``; a Tm more than 12 hours ahead of it
+    belongs to the previous day. A malformed Tm gives ``now_ns``.
+    """
+    try:
+        seconds = int(tm[0:2]) * 3600 + int(tm[3:5]) * 60 + int(tm[6:8])
+        fraction = int(tm[9:18].ljust(9, '0')) if len(tm) > 9 and tm[8] == '.' else 0
+    except (ValueError, TypeError):
+        return now_ns
+    offset_ns = utc_offset * SECOND_NS
+    day = (now_ns + offset_ns) // DAY_NS * DAY_NS - offset_ns
+    timestamp_ns = day + seconds * SECOND_NS + fraction
+    if timestamp_ns - now_ns > DAY_NS // 2:
+        timestamp_ns -= DAY_NS
+    return timestamp_ns
+
+
+def aggregate(timestamps, prices, sizes, period, utc_offset=0):
+    """Vectorized OHLCV of trade ticks in buckets of ``period`` seconds, as Bars.
+
+    Ticks are sorted by time first if needed; buckets start at multiples of
+    the period in local time, so daily bars span local days. Periods
+    without trades produce no bar.
+    """
+    timestamps = np.asarray(timestamps, np.int64)
+    prices = np.asarray(prices, np.int64)
+    sizes = np.asarray(sizes, np.int64)
+    if not len(timestamps):
+        return Bars(*(np.zeros(0, np.int64) for _ in Bars._fields))
+    if np.any(timestamps[1:] < timestamps[:-1]):
+        order = np.argsort(timestamps, kind='stable')
+        timestamps, prices, sizes = timestamps[order], prices[order], sizes[order]
+    period_ns = period * SECOND_NS
+    offset_ns = utc_offset * SECOND_NS
+    buckets = (timestamps + offset_ns) // period_ns
+    starts = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+    ends = np.append(starts[1:], len(timestamps))
+    return Bars(buckets[starts] * period_ns - offset_ns, prices[starts], np.maximum.reduceat(prices, starts),
+                np.minimum.reduceat(prices, starts), prices[ends - 1], np.add.reduceat(sizes, starts), ends - starts)
+
+
+def rollup(bars, period, utc_offset=0):
+    """Vectorized bars of ``period`` seconds from chronological bars of a period that divides it."""
+    if not len(bars):
+        return bars
+    period_ns = period * SECOND_NS
+    offset_ns = utc_offset * SECOND_NS
+    buckets = (bars.start + offset_ns) // period_ns
+    starts = np.flatnonzero(np.concatenate(([True], buckets[1:] != buckets[:-1])))
+    ends = np.append(starts[1:], len(buckets))
+    return Bars(buckets[starts] * period_ns - offset_ns, bars.open[starts], np.maximum.reduceat(bars.high, starts), np.minimum.reduceat(bars.low, starts),
+                bars.close[ends - 1], np.add.reduceat(bars.volume, starts), np.add.reduceat(bars.trades, starts))
+
+
+class BarSeries:
+    """OHLCV bars of one instrument and timeframe: closed bars in a ring, the open bar in Python ints.
+
+    ``update`` is O(1): a trade in the open bar's period only touches five
+    ints; a trade in a later period moves the open bar into preallocated
+    NumPy columns (the oldest of ``capacity`` bars is overwritten) and
+    opens a new one. A trade stamped before the open bar's period is folded
+    into the open bar, as closed bars are never reopened. ``backfill``
+    rebuilds the series from historical ticks in one vectorized pass and
+    streaming continues from its last bar.
+    """
+
+    __slots__ = ('period', 'period_ns', 'offset_ns', 'capacity', 'columns', 'written', '_bucket', '_bar', '_lock')
+
+    def __init__(self, period, capacity=DEFAULT_CAPACITY, utc_offset=0, lock=None):
+        if np is None:
+            raise ImportError("Świece wymagają pakietu numpy.")
+        self.period = period
+        self.period_ns = period * SECOND_NS
+        self.offset_ns = utc_offset * SECOND_NS
+        self.capacity = capacity
+        self.columns = tuple(np.zeros(capacity, np.int64) for _ in Bar._fields)
+        self.written = 0
+        self._bucket = None
+        self._bar = None  # [start, open, high, low, close, volume, trades] bieżącej świecy
+        self._lock = lock if lock is not None else threading.Lock()
+
+    def __len__(self):
+        return min(self.written, self.capacity) + (self._bar is not None)
+
+    def bucket(self, timestamp_ns):
+        """Number of the period holding ``timestamp_ns``."""
+        return (timestamp_ns + self.offset_ns) // self.period_ns
+
+    def update(self, timestamp_ns, price, size):
+        """Add one trade; return the Bar it closed, or None."""
+        with self._lock:
+            return self._add(timestamp_ns, price, size)
+
+    def current(self):
+        """The open bar, None before the first trade."""
+        with self._lock:
+            return Bar(*self._bar) if self._bar is not None else None
+
+    def bars(self, count=None, include_open=True):
+        """The newest ``count`` bars (all held if None), oldest first, optionally with the open bar."""
+        with self._lock:
+            return self._bars(count, self._bar if include_open else None)
+
+    def backfill(self, timestamps, prices, sizes):
+        """Replace the series with bars aggregated from historical trades; return the bar count."""
+        bars = aggregate(timestamps, prices, sizes, self.period, self.offset_ns // SECOND_NS)
+        with self._lock:
+            return self._load(bars)
+
+    def nbytes(self):
+        return sum(column.nbytes for column in self.columns)
+
+    def _add(self, timestamp_ns, price, size):
+        bucket = (timestamp_ns + self.offset_ns) // self.period_ns
+        bar = self._bar
+        if bar is not None and bucket <= self._bucket:
+            if price > bar[2]: bar[2] = price
+            if price < bar[3]: bar[3] = price
+            bar[4] = price
+            bar[5] += size
+            bar[6] += 1
+            return None
+        if bar is not None:
+            self._store(bar)
+        self._bucket = bucket
+        self._bar = [bucket * self.period_ns - self.offset_ns, price, price, price, price, size, 1]
+        return Bar(*bar) if bar is not None else None
+
+    def _fold(self, bar):
+        """Merge a closed bar of a finer timeframe into the open bar (opening one if needed)."""
+        own = self._bar
+        if own is None:
+            self._bucket = (bar[0] + self.offset_ns) // self.period_ns
+            self._bar = [self._bucket * self.period_ns - self.offset_ns, *bar[1:]]
+            return
+        if bar[2] > own[2]: own[2] = bar[2]
+        if bar[3] < own[3]: own[3] = bar[3]
+        own[4] = bar[4]
+        own[5] += bar[5]
+        own[6] += bar[6]
+
+    def _close(self):
+        """Store the open bar as closed and return it; None if there is none."""
+        bar = self._bar
+        if bar is None:
+            return None
+        self._store(bar)
+        self._bar = self._bucket = None
+        return Bar(*bar)
+
+    def _store(self, bar):
+        i = self.written % self.capacity
+        for column, value in zip(self.columns, bar):
+            column[i] = value
+        self.written += 1
+
+    def _load(self, bars):
+        count = len(bars)
+        closed = count - 1 if count else 0
+        kept = min(closed, self.capacity)
+        for column, values in zip(self.columns, bars):
+            column[:kept] = values[closed - kept:closed]
+        self.written = kept
+        if count:
+            self._bar = [int(values[-1]) for values in bars]
+            self._bucket = (self._bar[0] + self.offset_ns) // self.period_ns
+        else:
+            self._bar = self._bucket = None
+        return count
+
+    def _bars(self, count, open_bar):
+        held = min(self.written, self.capacity)
+        if count is None:
+            count = held + (open_bar is not None)
+        closed = max(0, min(count - (open_bar is not None), held))
+        end = self.written % self.capacity
+        start = end - closed
+        if start >= 0:
+            columns = [column[start:end] for column in self.columns]
+        else:
+            columns = [np.concatenate((column[self.capacity + start:], column[:end])) for column in self.columns]
+        if open_bar is not None and count > 0:
+            columns = [np.append(column, value) for column, value in zip(columns, open_bar)]
+        else:
+            columns = [column.copy() for column in columns]
+        return Bars(*columns)
+
+
+def _merged(coarse, fine, start):
+    """Open bar of a coarse series as seen now: its folded part plus the finest open bar."""
+    if fine is None:
+        return coarse
+    if coarse is None:
+        return [start, *fine[1:]]
+    return [coarse[0], coarse[1], max(coarse[2], fine[2]), min(coarse[3], fine[3]), fine[4], coarse[5] + fine[5], coarse[6] + fine[6]]
+
+
+class BarEngine:
+    """Bars of every configured timeframe for each traded instrument.
+
+    Timeframes are cascaded: a trade only updates the finest timeframe's
+    open bar, and each coarser timeframe folds in a finer bar when that
+    closes, closing its own bar as soon as a trade falls in its next
+    period. A tick therefore costs one O(1) series update whatever the
+    number of timeframes, and coarser open bars are combined with the
+    finest one when read. All series of an instrument share one lock.
+    Series are created on an instrument's first trade; bucket boundaries
+    follow local time (``utc_offset`` seconds from UTC, by default the
+    machine's), the exchange's own clock. ``backfill`` rebuilds all
+    timeframes of an instrument from historical ticks, e.g. a TickHistory
+    window of trades.
+    """
+
+    def __init__(self, timeframes=DEFAULT_TIMEFRAMES, capacity=DEFAULT_CAPACITY, utc_offset=None):
+        if np is None:
+            raise ImportError("Świece wymagają pakietu numpy.")
+        unknown = [timeframe for timeframe in timeframes if timeframe not in TIMEFRAMES]
+        if unknown:
+            raise ValueError(f"Nieznane interwały świec: {', '.join(unknown)}")
+        if not timeframes:
+            raise ValueError("Brak interwałów świec.")
+        # Najkrótszy interwał dzieli wszystkie pozostałe (TIMEFRAMES dzielą dobę), więc świece się zagnieżdżają.
+        self.timeframes = tuple(sorted(set(timeframes), key=TIMEFRAMES.get))
+        self.capacity = capacity
+        self.utc_offset = local_utc_offset() if utc_offset is None else utc_offset
+        self.instruments = {}  # isin -> krotka BarSeries w kolejności timeframes (od najkrótszego)
+        self._last_tm = None  # (Tm, now_ns, znacznik) ostatniej przeliczonej transakcji
+        self._lock = threading.Lock()
+
+    def __contains__(self, isin):
+        return isin in self.instruments
+
+    def series(self, isin, timeframe):
+        """BarSeries of one instrument and timeframe, None if unknown.
+
+        The open bar of a series other than the finest holds only closed
+        finer bars; ``bars`` and ``current`` of the engine include the rest.
+        """
+        series = self.instruments.get(isin)
+        if series is None or timeframe not in self.timeframes:
+            return None
+        return series[self.timeframes.index(timeframe)]
+
+    def bars(self, isin, timeframe, count=None, include_open=True):
+        """Bars of one instrument and timeframe like BarSeries.bars, None if unknown."""
+        one = self.series(isin, timeframe)
+        if one is None:
+            return None
+        with one._lock:
+            return one._bars(count, self._open_bar(isin, one) if include_open else None)
+
+    def current(self, isin, timeframe):
+        """The open Bar of one instrument and timeframe, None if there is none."""
+        one = self.series(isin, timeframe)
+        if one is None:
+            return None
+        with one._lock:
+            bar = self._open_bar(isin, one)
+        return Bar(*bar) if bar is not None else None
+
+    def update(self, isin, timestamp_ns, price, size):
+        """Add one trade; return [(timeframe, closed Bar), ...], finest first, usually empty."""
+        series = self.instruments.get(isin)
+        if series is None: series = self._series(isin)
+        finest = series[0]
+        with finest._lock:
+            bar = finest._add(timestamp_ns, price, size)
+            if bar is None:
+                return ()
+            closed = [(self.timeframes[0], bar)]
+            for timeframe, one in zip(self.timeframes[1:], series[1:]):
+                one._fold(bar)
+                if one.bucket(timestamp_ns) > one._bucket:
+                    closed.append((timeframe, one._close()))
+        return closed
+
+    def update_trade(self, isin, tm, price, size, now_ns):
+        """Like update, stamped with the trade's exchange time Tm (``now_ns`` if missing)."""
+        if not tm:
+            return self.update(isin, now_ns, price, size)
+        # Tm ma rozdzielczość sekundy - kolejne transakcje zwykle mają ten sam.
+        last = self._last_tm
+        if last is not None and last[0] == tm and 0 <= now_ns - last[1] < SECOND_NS:
+            timestamp_ns = last[2]
+        else:
+            timestamp_ns = exchange_time_ns(tm, now_ns, self.utc_offset)
+            self._last_tm = (tm, now_ns, timestamp_ns)
+        return self.update(isin, timestamp_ns, price, size)
+
+    def backfill(self, isin, timestamps, prices, sizes):
+        """Rebuild all timeframes of ``isin`` from historical trades; return {timeframe: bar count}."""
+        series = self.instruments.get(isin) or self._series(isin)
+        finest = series[0]
+        bars = aggregate(timestamps, prices, sizes, finest.period, self.utc_offset)
+        # Dłuższe interwały powstają z zamkniętych świec najkrótszego, jak przy strumieniu.
+        closed = Bars(*(column[:-1] for column in bars))
+        with finest._lock:
+            counts = {self.timeframes[0]: finest._load(bars)}
+            cutoff = finest._bar[0] if finest._bar is not None else None
+            for timeframe, one in zip(self.timeframes[1:], series[1:]):
+                one._load(rollup(closed, one.period, self.utc_offset))
+                if one._bar is not None and one.bucket(cutoff) > one._bucket:
+                    one._close()
+                counts[timeframe] = min(one.written, one.capacity) + (self._open_bar(isin, one) is not None)
+        return counts
+
+    def nbytes(self):
+        return sum(one.nbytes() for series in list(self.instruments.values()) for one in series)
+
+    def _open_bar(self, isin, one):
+        finest = self.instruments[isin][0]
+        if one is finest:
+            return finest._bar
+        fine = finest._bar
+        start = one.bucket(fine[0]) * one.period_ns - one.offset_ns if fine is not None else None
+        return _merged(one._bar, fine, start)
+
+    def _series(self, isin):
+        with self._lock:
+            series = self.instruments.get(isin)
+            if series is None:
+                lock = threading.Lock()
+                series = self.instruments[isin] = tuple(BarSeries(TIMEFRAMES[timeframe], self.capacity, self.utc_offset, lock) for timeframe in self.timeframes)
+        return series
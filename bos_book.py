@@ -0,0 +1,202 @@
+import time
+from array import array
+
+from bos_fixml import inc_entries
+from bos_price import TICKS
+
+# MDUpdateAction (Inc@UpdtAct): nowy poziom, zmiana poziomu, usunięcie poziomu.
+NEW, CHANGE, DELETE = '0', '1', '2'
+# Typ wpisu strony arkusza: '0' oferty kupna, '1' oferty sprzedaży.
+BOOK_TYPES = ('0', '1')
+
+
+class BookSide:
+    """One side of an order book as ``depth`` preallocated price/size levels.
+
+    Level 1 is the best price; the exchange keeps the levels sorted, so a
+    new level shifts the ones below it down (the last falls off at full
+    depth) and a deleted level shifts them up, both as one slice copy of the
+    int64 arrays. Cumulative sizes are rebuilt lazily from the first level
+    that changed, so a read after any number of updates is one pass at most
+    and a repeated read is O(1).
+    """
+
+    __slots__ = ('depth', 'count', 'prices', 'sizes', '_cumulative', '_valid')
+
+    def __init__(self, depth):
+        self.depth = depth
+        self.count = 0
+        self.prices = array('q', bytes(8 * depth))
+        self.sizes = array('q', bytes(8 * depth))
+        self._cumulative = array('q', bytes(8 * depth))
+        self._valid = 0
+
+    def __len__(self):
+        return self.count
+
+    def insert(self, level, price, size):
+        """New level at ``level`` (1-based); levels past the current count are appended."""
+        i = min(level, self.count + 1) - 1
+        if i < 0 or i >= self.depth:
+            return
+        end = min(self.count, self.depth - 1)
+        prices, sizes = self.prices, self.sizes
+        prices[i + 1:end + 1] = prices[i:end]
+        sizes[i + 1:end + 1] = sizes[i:end]
+        prices[i] = price
+        sizes[i] = size
+        self.count = end + 1
+        if i < self._valid: self._valid = i
+
+    def change(self, level, price, size):
+        """Update a level in place; price None keeps the level's price. Unknown levels are appended."""
+        i = level - 1
+        if i < 0:
+            return
+        if i >= self.count:
+            if price is not None: self.insert(level, price, size)
+            return
+        if price is not None: self.prices[i] = price
+        self.sizes[i] = size
+        if i < self._valid: self._valid = i
+
+    def delete(self, level):
+        i = level - 1
+        count = self.count
+        if i < 0 or i >= count:
+            return
+        self.prices[i:count - 1] = self.prices[i + 1:count]
+        self.sizes[i:count - 1] = self.sizes[i + 1:count]
+        self.count = count - 1
+        if i < self._valid: self._valid = i
+
+    def clear(self):
+        self.count = 0
+        self._valid = 0
+
+    def best(self):
+        """(price, size) of level 1, None for an empty side."""
+        return (self.prices[0], self.sizes[0]) if self.count else None
+
+    def price(self, level):
+        return self.prices[level - 1] if 0 < level <= self.count else None
+
+    def size(self, level):
+        return self.sizes[level - 1] if 0 < level <= self.count else None
+
+    def cumulative(self, level):
+        """Total size of levels 1..level (capped at the number of levels)."""
+        n = min(level, self.count)
+        if n <= 0:
+            return 0
+        if self._valid < n:
+            cumulative, sizes = self._cumulative, self.sizes
+            start = self._valid
+            running = cumulative[start - 1] if start else 0
+            for j in range(start, self.count):
+                running += sizes[j]
+                cumulative[j] = running
+            self._valid = self.count
+        return self._cumulative[n - 1]
+
+    def levels(self):
+        """[(price, size), ...] from the best level down."""
+        count = self.count
+        return list(zip(self.prices[:count], self.sizes[:count]))
+
+
+class OrderBook:
+    """Bid and ask sides of one instrument, prices in integer ticks."""
+
+    __slots__ = ('isin', 'bids', 'asks', 'seq')
+
+    def __init__(self, isin, depth):
+        self.isin = isin
+        self.bids = BookSide(depth)
+        self.asks = BookSide(depth)
+        self.seq = 0
+
+    def apply(self, action, entry_type, level, price, size):
+        """Apply one level update: action NEW/CHANGE/DELETE, entry_type '0' bid or '1' ask."""
+        side = self.bids if entry_type == '0' else self.asks
+        if action == DELETE:
+            side.delete(level)
+        elif action == NEW:
+            side.insert(level, price, size)
+        else:
+            side.change(level, price, size)
+        self.seq += 1
+
+    def best_bid(self):
+        return self.bids.best()
+
+    def best_ask(self):
+        return self.asks.best()
+
+    def spread(self):
+        """Best ask minus best bid in ticks, None while either side is empty."""
+        if not self.bids.count or not self.asks.count:
+            return None
+        return self.asks.prices[0] - self.bids.prices[0]
+
+    def snapshot(self):
+        return {'isin': self.isin, 'bids': self.bids.levels(), 'asks': self.asks.levels(), 'seq': self.seq}
+
+
+class OrderBooks:
+    """Order books of all instruments subscribed with market depth.
+
+    ``apply_market_data`` reads each MktDataInc once: bid/ask entries with a
+    price level update the books, anything else (trades, LOP) goes to the
+    quote store as before. The store's bid/ask fields then get the new best
+    levels, so top-of-book readers need not know about depth.
+    """
+
+    def __init__(self, depth=10, ticks=TICKS, clock=time.time_ns):
+        self.depth = depth
+        self.ticks = ticks
+        self.clock = clock
+        self.books = {}
+
+    def __contains__(self, isin):
+        return isin in self.books
+
+    def get(self, isin):
+        return self.books.get(isin)
+
+    def book(self, isin):
+        book = self.books.get(isin)
+        if book is None:
+            book = self.books[isin] = OrderBook(isin, self.depth)
+        return book
+
+    def apply_market_data(self, xml_data, store=None):
+        """Apply a MktDataInc message, return the set of updated ISINs."""
+        return self.apply_entries(inc_entries(xml_data), store)
+
+    def apply_entries(self, entries, store=None):
+        """Apply the parsed <Inc> entries of one message (see bos_fixml.inc_entries), return updated ISINs."""
+        updated = set()
+        touched = set()
+        books, ticks = self.books, self.ticks
+        now = self.clock()
+        for action, entry_type, level, price_str, size_str, _, isin in entries:
+            if level and entry_type in BOOK_TYPES:
+                book = books.get(isin)
+                if book is None: book = self.book(isin)
+                price = ticks.to_ticks(isin, price_str) if price_str else None
+                book.apply(action, entry_type, int(level), price, int(float(size_str)) if size_str else 0)
+                touched.add(isin)
+            elif store is not None:
+                store.apply_entry(entry_type, price_str, size_str, isin, now)
+            updated.add(isin)
+        if store is not None:
+            for isin in touched:
+                book = books[isin]
+                bid, ask = book.bids.best(), book.asks.best()
+                store.update(isin, {'bid': bid and bid[0], 'bid_size': bid and bid[1], 'ask': ask and ask[0], 'ask_size': ask and ask[1]})
+                # Historia ticków dostaje najlepsze poziomy po komunikacie, jak przy MktDepth=0.
+                if store.history is not None:
+                    if bid: store.history.record(isin, now, '0', *bid)
+                    if ask: store.history.record(isin, now, '1', *ask)
+        return updated
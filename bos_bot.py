@@ -3,13 +3,44 @@ from tkinter import ttk, scrolledtext, messagebox
 import threading
 import queue
 import socket
-import struct
-import winreg
-import xml.etree.ElementTree as ET
+try:
+    import winreg
+except ImportError:  # poza Windows porty podaje się przez NOL3_SYNC_PORT/NOL3_ASYNC_PORT
+    winreg = None
+import os
 import time
 from datetime import datetime
 from enum import Enum
 import re
+import itertools
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from bos_transport import SyncConnectionPool, PipelinedSyncChannel, FrameReader
+from bos_encoder import FixmlEncoder
+from bos_pipeline import AsyncMessagePipeline
+from bos_quotes import QuoteStore, QuoteConflator
+from bos_book import OrderBooks
+import bos_ticks
+import bos_bars
+from bos_indicators import IndicatorSet, format_values
+from bos_portfolio import PortfolioState
+from bos_subscriptions import SubscriptionManager
+from bos_recorder import FeedRecorder, ASYNC_IN, SYNC_OUT, SYNC_IN
+from bos_clock import SYSTEM_CLOCK
+from bos_price import TickTable
+from bos_latency import LatencyTracker, RECV, BUILT, SENT, ACK, span_us
+import bos_fixml
+from bos_fixml import OrdStatus
+
+# Instrument menedżera transakcji i zleceń ręcznych oraz domyślna lista obserwowanych (kontrakty FW20).
+DEFAULT_INSTRUMENT = "PL0GF0031252"
+DEFAULT_WATCHLIST = ("PL0GF0031252", "PL0GF0031880")
+# Krok notowań instrumentów z niestandardowym tickiem; pozostałe mają 0.01.
+TICK_SIZES = {"PL0GF0031252": '1', "PL0GF0031880": '1'}
+# Katalog nagrań sesji włączanych w zakładce logowania.
+RECORDINGS_DIR = "recordings"
+# Czas (s) oczekiwania na odpowiedź portu synchronicznego, po którym żądanie uznaje się za utracone.
+SYNC_TIMEOUT = 10.0
 
 # (Enum BotState bez zmian)
 class BotState(Enum):
@@ -19,6 +50,9 @@ class BotState(Enum):
     IN_LONG_POSITION = 3
     IN_SHORT_POSITION = 4
 
+def _format_optional(value, fmt='{}'):
+    return fmt.format(value) if value is not None else ''
+
 class BossaApp:
     def __init__(self, root):
         self.root = root
@@ -26,10 +60,14 @@ class BossaApp:
         self.root.geometry("1100x900")
         self.client = None
         self.queue = queue.Queue()
-        self.TARGET_ISIN = "PL0GF0031252"
+        self.TARGET_ISIN = DEFAULT_INSTRUMENT
         self.orders = {}
         self.STATUS_MAP = {'0': 'Nowe', '1': 'Aktywne', '2': 'Wykonane', '4': 'Anulowane', '5': 'Zastąpione', '6': 'Oczekuje na anul.', '8': 'Odrzucone', 'E': 'Oczekuje na mod.'}
         self.SIDE_MAP = {'1': 'Kupno', '2': 'Sprzedaż'}
+        self.ticks = TickTable() # zastępowana tabelą klienta po zalogowaniu
+        self.QUEUE_BATCH = 200
+        self.server_latency = None # Txt z ApplMsgRpt
+        self.internal_latency = None # ostatni pomiar tick-to-trade / obiegu zlecenia
         self.create_widgets()
         self.process_queue()
 
@@ -53,8 +91,18 @@ class BossaApp:
         self.notebook.add(self.tab_portfolio, text="Portfel")
 
         tk.Label(self.tab_portfolio, text="Dane portfela:").pack(anchor='w')
-        self.portfolio_display = scrolledtext.ScrolledText(self.tab_portfolio, state='disabled')
-        self.portfolio_display.pack(fill='both', expand=True)
+        # Wiersze: rachunek > Środki/Pozycje > fundusz lub pozycja; iid = ścieżka, np. "00-22-1/pos/PL0GF0031252".
+        self.portfolio_tree = ttk.Treeview(self.tab_portfolio, columns=('wartosc', 'isin'), height=15)
+        self.portfolio_tree.heading('#0', text='Rachunek / Nazwa')
+        self.portfolio_tree.heading('wartosc', text='Wartość / Ilość')
+        self.portfolio_tree.heading('isin', text='ISIN')
+        self.portfolio_tree.column('#0', width=220)
+        self.portfolio_tree.column('wartosc', width=140, anchor='e')
+        self.portfolio_tree.column('isin', width=140, anchor='center')
+        portfolio_vsb = ttk.Scrollbar(self.tab_portfolio, orient="vertical", command=self.portfolio_tree.yview)
+        self.portfolio_tree.configure(yscrollcommand=portfolio_vsb.set)
+        portfolio_vsb.pack(side='right', fill='y')
+        self.portfolio_tree.pack(fill='both', expand=True)
 
         monitor_main_frame = tk.Frame(self.tab_monitor)
         monitor_main_frame.pack(fill='both', expand=True)
@@ -137,15 +185,30 @@ class BossaApp:
         self.login_button.pack(side='left', padx=10)
         self.disconnect_button = tk.Button(login_frame, text="Rozłącz", command=self.disconnect, state='disabled')
         self.disconnect_button.pack(side='left', padx=10)
+        self.record_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(login_frame, text="Nagrywaj sesję", variable=self.record_var).pack(side='left', padx=10)
 
         filter_frame = tk.Frame(self.tab_login, relief='groove', borderwidth=2, padx=5, pady=5)
         filter_frame.pack(fill='x', pady=5)
-        tk.Label(filter_frame, text=f"Filtr notowań dla {self.TARGET_ISIN}:", font=('Helvetica', 10, 'bold')).pack(side='left', padx=(0, 10))
-        self.add_filter_button = tk.Button(filter_frame, text=f"Dodaj {self.TARGET_ISIN} do filtra", command=self.add_to_filter, state='disabled')
+        tk.Label(filter_frame, text="Filtr notowań (ISIN, po przecinku):", font=('Helvetica', 10, 'bold')).pack(side='left', padx=(0, 10))
+        self.filter_entry = tk.Entry(filter_frame, width=40)
+        self.filter_entry.pack(side='left', padx=5)
+        self.filter_entry.insert(0, ", ".join(DEFAULT_WATCHLIST))
+        self.add_filter_button = tk.Button(filter_frame, text="Dodaj do filtra", command=self.add_to_filter, state='disabled')
         self.add_filter_button.pack(side='left', padx=5)
+        self.remove_filter_button = tk.Button(filter_frame, text="Usuń z filtra", command=self.remove_from_filter, state='disabled')
+        self.remove_filter_button.pack(side='left', padx=5)
         self.clear_filter_button = tk.Button(filter_frame, text="Wyczyść filtr", command=self.clear_filter, state='disabled')
         self.clear_filter_button.pack(side='left', padx=5)
 
+        # Notowania wszystkich instrumentów w filtrze; wiersz = ISIN.
+        watch_cols = ('isin', 'bid', 'ask', 'last_price', 'lop')
+        self.watchlist_tree = ttk.Treeview(self.tab_login, columns=watch_cols, show='headings', height=6)
+        for col, text in zip(watch_cols, ('ISIN', 'Kupno', 'Sprzedaż', 'Ostatnia', 'LOP')):
+            self.watchlist_tree.heading(col, text=text)
+            self.watchlist_tree.column(col, width=110, anchor='center')
+        self.watchlist_tree.pack(fill='x', pady=5)
+
         order_frame = tk.Frame(self.tab_orders, relief='groove', borderwidth=2, padx=5, pady=5)
         order_frame.pack(fill='x', pady=5)
         tk.Label(order_frame, text=f"Nowe zlecenie (Limit, Dzień) dla {self.TARGET_ISIN}:", font=('Helvetica', 10, 'bold')).pack(anchor='w')
@@ -272,100 +335,120 @@ class BossaApp:
         self.heartbeat_var.set("❤")
         self.status_label.after(300, lambda: self.heartbeat_var.set("♡"))
 
-  #  def _update_latency(self,txt_value):
-        
+    def _update_latency_label(self):
+        text = f"Latency: {self.server_latency or '---'}"
+        if self.internal_latency:
+            tick_to_trade = self.internal_latency.get('tick_to_trade_us')
+            order_ack = self.internal_latency.get('order_ack_us')
+            if tick_to_trade is not None:
+                text += f" | Wewn.: {tick_to_trade:.0f}µs"
+            if order_ack is not None:
+                text += f" | Zlec.: {order_ack:.0f}µs"
+        self.status_latency_var.set(text + " ")
+
     # Pozostałe metody bez zmian
     def process_queue(self):
         try:
-            message_type, data = self.queue.get_nowait()
-            if message_type == "PORTFOLIO_UPDATE":
-                self.display_portfolio(data['portfolio_data'])
-                self.pos_label.config(text=str(data.get('open_position_qty', '---')))
-                if data.get('portfolio_data') and not self.account_entry.get():
-                    first_account = next(iter(data['portfolio_data']))
-                    self.account_entry.insert(0, first_account)
-                
-                # NEW: Check for existing position and enable button
-                if data.get('existing_position_found'):
-                    self.start_bot_existing_pos_button.config(state='normal')
-                    self.log_message(self.bot_log, f"Znaleziono istniejącą pozycję: {data['existing_position_details']['quantity']} szt. {data['existing_position_details']['symbol']} ({data['existing_position_details']['position_type']}). Możesz uruchomić bota z tą pozycją.")
-                else:
-                    self.start_bot_existing_pos_button.config(state='disabled')
-            elif message_type == "MARKET_DATA_UPDATE":
-                if data.get('isin') == self.TARGET_ISIN:
-                    self.bid_label.config(text=f"{data.get('bid', '---'):.2f}")
-                    self.ask_label.config(text=f"{data.get('ask', '---'):.2f}")
-                    self.last_label.config(text=f"{data.get('last_price', '---'):.2f}")
-                    self.lop_label.config(text=f"{data.get('lop', '---')}")
-                    if self.root.focus_get() != self.price_entry:
-                        price = data.get('last_price')
-                        if price:
-                            self.price_entry.delete(0, tk.END)
-                            self.price_entry.insert(0, f"{price:.2f}")
-            elif message_type == "BOT_STATE_UPDATE":
-                entry_price = data.get('entry_price')
-                self.close_pos_button.config(state='normal' if entry_price else 'disabled')
-                if entry_price:
-                    be_price = entry_price + 2 * data.get('commission', 1) if data.get('position_type') == 'LONG' else entry_price - 2 * data.get('commission', 1)
-                    self.be_label.config(text=f"{be_price:.2f}")
-                else:
-                    self.be_label.config(text="---")
-                    self.start_long_button.config(state='normal')
-                    self.start_short_button.config(state='normal')
-                    self.start_bot_existing_pos_button.config(state='disabled') # Disable if bot is idle/stopped
-            elif message_type == "BOT_LOG":
-                self.log_message(self.bot_log, data)
-            elif message_type == "EXEC_REPORT":
-                self.update_order_monitor(data)
-            elif message_type == "LOG":
-                self.log_message(self.status_log, data)
-            elif message_type == "LOGIN_SUCCESS":
-                self.log_message(self.status_log, f"Logowanie udane! Dodaj {self.TARGET_ISIN} do filtra, aby otrzymywać ceny.")
-                self.disconnect_button.config(state='normal')
-                self.add_filter_button.config(state='normal')
-                self.clear_filter_button.config(state='normal')
-                self.send_order_button.config(state='normal')
-                self.start_long_button.config(state='normal')
-                self.start_short_button.config(state='normal')
-            elif message_type == "ASYNC_MSG":
-            # Heartbeat detection (assuming heartbeat contains <HrtBt or similar)
-                if "<Heartbeat" in data:
-                    self._flash_heartbeat()
-                elif "<ApplMsgRpt" in data:
-                    try:
-                        root = ET.fromstring(data)  # parse string into XML
-                        appl_msg = root.find("ApplMsgRpt")  # find <ApplMsgRpt> element
-                        txt_value = appl_msg.get("Txt") if appl_msg is not None else None
-                        if txt_value:
-                            self.status_latency_var.set(f"Latency: {txt_value.strip()} ")
-#                            self.log_message(self.async_messages, f"Otrzymano ApplMsgRpt: {txt_value.strip()}")
-                        else:
-                            self.log_message(self.async_messages, "Otrzymano ApplMsgRpt (brak Txt)")
-                    except Exception as e:
-                        self.log_message(self.async_messages, f"Błąd parsowania ApplMsgRpt: {e}")
-                else:
-                    self.log_message(self.async_messages, data.strip())
-            elif message_type == "DISCONNECTED":
-                self.log_message(self.status_log, "Rozłączono.")
-                self.login_button.config(state='normal')
-                self.disconnect_button.config(state='disabled')
-                self.add_filter_button.config(state='disabled')
-                self.clear_filter_button.config(state='disabled')
-                self.send_order_button.config(state='disabled')
-                self.start_long_button.config(state='disabled')
-                self.start_short_button.config(state='disabled')
-                self.close_pos_button.config(state='disabled')
-                self.start_bot_existing_pos_button.config(state='disabled') # Disable on disconnect
-                self.client = None
-                self.orders = {}
-                for i in self.order_tree.get_children(): self.order_tree.delete(i)
-            elif message_type == "LOGIN_FAIL":
-                self.log_message(self.status_log, f"Logowanie nie powiodło się: {data}")
-                self.login_button.config(state='normal')
+            # Do QUEUE_BATCH komunikatów na cykl - po jednym na 100 ms GUI nie nadążało za rynkiem.
+            for _ in range(self.QUEUE_BATCH):
+                message_type, data = self.queue.get_nowait()
+                self._handle_queue_message(message_type, data)
         except queue.Empty:
             pass
         finally:
             self.root.after(100, self.process_queue)
+
+    def _handle_queue_message(self, message_type, data):
+        if message_type == "PORTFOLIO_UPDATE":
+            self.display_portfolio(data['changes'])
+            self.pos_label.config(text=str(data.get('open_position_qty', '---')))
+            if not self.account_entry.get():
+                first_account = next((account for account, changes in data['changes'].items() if changes is not None), None)
+                if first_account: self.account_entry.insert(0, first_account)
+            
+            # NEW: Check for existing position and enable button
+            if data.get('existing_position_found'):
+                self.start_bot_existing_pos_button.config(state='normal')
+                self.log_message(self.bot_log, f"Znaleziono istniejącą pozycję: {data['existing_position_details']['quantity']} szt. {data['existing_position_details']['symbol']} ({data['existing_position_details']['position_type']}). Możesz uruchomić bota z tą pozycją.")
+            else:
+                self.start_bot_existing_pos_button.config(state='disabled')
+        elif message_type == "MARKET_DATA_UPDATE":
+            if self.watchlist_tree.exists(data.get('isin')):
+                self.watchlist_tree.item(data['isin'], values=(data['isin'], data.get('bid', '---'), data.get('ask', '---'), data.get('last_price', '---'), data.get('lop', '---')))
+            if data.get('isin') == self.TARGET_ISIN:
+                self.bid_label.config(text=data.get('bid', '---'))
+                self.ask_label.config(text=data.get('ask', '---'))
+                self.last_label.config(text=data.get('last_price', '---'))
+                self.lop_label.config(text=f"{data.get('lop', '---')}")
+                if self.root.focus_get() != self.price_entry:
+                    price = data.get('last_price')
+                    if price:
+                        self.price_entry.delete(0, tk.END)
+                        self.price_entry.insert(0, price)
+        elif message_type == "BOT_STATE_UPDATE":
+            entry_price = data.get('entry_price')
+            self.close_pos_button.config(state='normal' if entry_price else 'disabled')
+            if entry_price:
+                self.be_label.config(text=data['be_price'])
+            else:
+                self.be_label.config(text="---")
+                self.start_long_button.config(state='normal')
+                self.start_short_button.config(state='normal')
+                self.start_bot_existing_pos_button.config(state='disabled') # Disable if bot is idle/stopped
+        elif message_type == "SUBSCRIPTIONS":
+            for isin in set(self.watchlist_tree.get_children()) - set(data):
+                self.watchlist_tree.delete(isin)
+            for isin in data:
+                if not self.watchlist_tree.exists(isin):
+                    self.watchlist_tree.insert('', 'end', iid=isin, values=(isin, '---', '---', '---', '---'))
+        elif message_type == "BOT_LOG":
+            self.log_message(self.bot_log, data)
+        elif message_type == "EXEC_REPORT":
+            self.update_order_monitor(data)
+        elif message_type == "LATENCY_UPDATE":
+            self.internal_latency = data
+            self._update_latency_label()
+        elif message_type == "LOG":
+            self.log_message(self.status_log, data)
+        elif message_type == "LOGIN_SUCCESS":
+            self.log_message(self.status_log, f"Logowanie udane! Dodaj instrumenty (w tym {self.TARGET_ISIN}) do filtra, aby otrzymywać ceny.")
+            self.disconnect_button.config(state='normal')
+            self.add_filter_button.config(state='normal')
+            self.remove_filter_button.config(state='normal')
+            self.clear_filter_button.config(state='normal')
+            self.send_order_button.config(state='normal')
+            self.start_long_button.config(state='normal')
+            self.start_short_button.config(state='normal')
+        elif message_type == "HEARTBEAT":
+            self._flash_heartbeat()
+        elif message_type == "APPL_MSG":
+            if data:
+                self.server_latency = data.strip()
+                self._update_latency_label()
+            else:
+                self.log_message(self.async_messages, "Otrzymano ApplMsgRpt (brak Txt)")
+        elif message_type == "ASYNC_MSG":
+            self.log_message(self.async_messages, data.strip())
+        elif message_type == "DISCONNECTED":
+            self.log_message(self.status_log, "Rozłączono.")
+            self.login_button.config(state='normal')
+            self.disconnect_button.config(state='disabled')
+            self.add_filter_button.config(state='disabled')
+            self.remove_filter_button.config(state='disabled')
+            self.clear_filter_button.config(state='disabled')
+            self.send_order_button.config(state='disabled')
+            self.start_long_button.config(state='disabled')
+            self.start_short_button.config(state='disabled')
+            self.close_pos_button.config(state='disabled')
+            self.start_bot_existing_pos_button.config(state='disabled') # Disable on disconnect
+            self.client = None
+            self.orders = {}
+            for i in self.order_tree.get_children(): self.order_tree.delete(i)
+            # Nowy PortfolioState po ponownym logowaniu wysyła tylko wiersze obecne, więc zamknięte pozycje zostałyby na ekranie.
+            self.portfolio_tree.delete(*self.portfolio_tree.get_children())
+        elif message_type == "LOGIN_FAIL":
+            self.log_message(self.status_log, f"Logowanie nie powiodło się: {data}")
+            self.login_button.config(state='normal')
     
     def start_trade(self, direction):
         if not self.client:
@@ -411,12 +494,14 @@ class BossaApp:
             self.log_message(self.bot_log, "Ręczne zamykanie pozycji...")
             self.client.close_trade_manually()
 
-    def update_order_monitor(self, data):
-        order_id = data.get('id_dm')
+    def update_order_monitor(self, report):
+        order_id = report.order_id
         if not order_id: return
-        data['status'] = self.STATUS_MAP.get(data['status'], data['status'])
-        data['k_s'] = self.SIDE_MAP.get(data['k_s'], data['k_s'])
-        values = [data.get(col, '') for col in ('id_dm', 'id_klienta', 'status', 'symbol', 'k_s', 'ilosc', 'pozostalo', 'wykonano', 'limit', 'cena_ost', 'czas')]
+        # ExecReport jest współdzielony z menedżerem - tylko odczyt, bez modyfikacji.
+        values = [order_id, report.client_id, self.STATUS_MAP.get(report.status_code, report.status_code), report.symbol,
+                  report.side.label if report.side else '', _format_optional(report.quantity), _format_optional(report.leaves_qty), _format_optional(report.cum_qty),
+                  self._format_price(report.isin, report.price), self._format_price(report.isin, report.last_px),
+                  report.transact_time.strftime('%Y-%m-%d %H:%M:%S') if report.transact_time else '']
         if order_id in self.orders:
             item_id = self.orders[order_id]
             self.order_tree.item(item_id, values=values)
@@ -424,6 +509,9 @@ class BossaApp:
             item_id = self.order_tree.insert('', 'end', values=values)
             self.orders[order_id] = item_id
 
+    def _format_price(self, isin, ticks):
+        return self.ticks.format(isin, ticks) if ticks is not None else ''
+
     def send_order(self):
         account = self.account_entry.get()
         direction = self.direction_combo.get()
@@ -439,13 +527,13 @@ class BossaApp:
             self.log_message(self.status_log, "BŁĄD: Ilość musi być dodatnią liczbą całkowitą.")
             return
         try:
-            price = float(price_str)
+            price = self.ticks.to_ticks(self.TARGET_ISIN, price_str.replace(',', '.'))
             if price <= 0: raise ValueError
         except ValueError:
             self.log_message(self.status_log, "BŁĄD: Cena musi być dodatnią liczbą.")
             return
         if self.client:
-            self.log_message(self.status_log, f"Przygotowywanie zlecenia {direction} {quantity} szt. {self.TARGET_ISIN} z limitem {price}...")
+            self.log_message(self.status_log, f"Przygotowywanie zlecenia {direction} {quantity} szt. {self.TARGET_ISIN} z limitem {self.ticks.format(self.TARGET_ISIN, price)}...")
             params = (account, direction, quantity, price)
             threading.Thread(target=self.client.send_limit_order, args=params, daemon=True).start()
 
@@ -470,13 +558,28 @@ class BossaApp:
             self.log_message(self.status_log, "BŁĄD: Wprowadź swoje dane logowania.")
             self.login_button.config(state='normal')
             return
-        self.client = BossaAPIClient(username, password, self.queue)
+        record_path = None
+        if self.record_var.get():
+            os.makedirs(RECORDINGS_DIR, exist_ok=True)
+            record_path = os.path.join(RECORDINGS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}.feed")
+        self.client = BossaAPIClient(username, password, self.queue, record_path=record_path)
+        self.ticks = self.client.ticks
         threading.Thread(target=self.client.run, daemon=True).start()
 
+    def _filter_isins(self):
+        return [isin for isin in re.split(r'[\s,;]+', self.filter_entry.get().upper()) if isin]
+
     def add_to_filter(self):
-        if self.client:
-            self.log_message(self.status_log, f"Wysyłanie żądania dodania {self.TARGET_ISIN} do filtra...")
-            threading.Thread(target=self.client.add_to_filter, args=(self.TARGET_ISIN,), daemon=True).start()
+        isins = self._filter_isins()
+        if self.client and isins:
+            self.log_message(self.status_log, f"Wysyłanie żądania dodania {', '.join(isins)} do filtra...")
+            threading.Thread(target=self.client.add_to_filter, args=(isins,), daemon=True).start()
+
+    def remove_from_filter(self):
+        isins = self._filter_isins()
+        if self.client and isins:
+            self.log_message(self.status_log, f"Wysyłanie żądania usunięcia {', '.join(isins)} z filtra...")
+            threading.Thread(target=self.client.remove_from_filter, args=(isins,), daemon=True).start()
 
     def clear_filter(self):
         if self.client:
@@ -489,41 +592,76 @@ class BossaApp:
             self.disconnect_button.config(state='disabled')
             self.client.disconnect()
             
-    def display_portfolio(self, portfolio_data):
-        self.portfolio_display.config(state='normal')
-        self.portfolio_display.delete('1.0', tk.END)
-        formatted_text = ""
-        for account, data in portfolio_data.items():
-            formatted_text += f"[ RACHUNEK: {account} ]\n"
-            formatted_text += "  Środki:\n"
-            for fund, value in data.get('funds', {}).items():
-                formatted_text += f"    - {fund}: {value}\n"
-            formatted_text += "\n  Pozycje:\n"
-            positions = data.get('positions', [])
-            if positions:
-                for pos in positions:
-                    formatted_text += f"    - Symbol: {pos['symbol']}, Ilość: {pos['quantity']}, ISIN: {pos['isin']}\n"
-            else:
-                formatted_text += "    - Brak otwartych pozycji.\n"
-            formatted_text += "-"*40 + "\n"
-        self.portfolio_display.insert(tk.END, formatted_text)
-        self.portfolio_display.config(state='disabled')
+    def display_portfolio(self, changes):
+        """Apply a PortfolioState delta to the tree, touching only the rows that changed."""
+        tree = self.portfolio_tree
+        for account, account_changes in changes.items():
+            if account_changes is None:
+                if tree.exists(account): tree.delete(account)
+                continue
+            funds_node, positions_node = f"{account}/funds", f"{account}/pos"
+            if not tree.exists(account):
+                tree.insert('', 'end', iid=account, text=f"RACHUNEK: {account}", open=True)
+                tree.insert(account, 'end', iid=funds_node, text="Środki", open=True)
+                tree.insert(account, 'end', iid=positions_node, text="Pozycje", open=True)
+            for fund, value in account_changes['funds'].items():
+                self._set_portfolio_row(funds_node, f"{funds_node}/{fund}", fund, None if value is None else (value, ''))
+            for isin, position in account_changes['positions'].items():
+                self._set_portfolio_row(positions_node, f"{positions_node}/{isin}", position and position['symbol'], None if position is None else (position['quantity'], isin))
+            count = len(tree.get_children(positions_node))
+            tree.item(positions_node, text=f"Pozycje ({count})" if count else "Pozycje - brak otwartych pozycji")
+
+    def _set_portfolio_row(self, parent, iid, text, values):
+        tree = self.portfolio_tree
+        if values is None:
+            if tree.exists(iid): tree.delete(iid)
+        elif tree.exists(iid):
+            tree.item(iid, text=text, values=values)
+        else:
+            tree.insert(parent, 'end', iid=iid, text=text, values=values)
 
 class BossaAPIClient:
-    def __init__(self, username, password, gui_queue):
-        # ... (bez zmian)
+    def __init__(self, username, password, gui_queue, sync_port=None, async_port=None, gui_rate_hz=10.0, instrument=DEFAULT_INSTRUMENT, book_depth=0, tick_history=bos_ticks.DEFAULT_CAPACITY, record_path=None, clock=SYSTEM_CLOCK, bar_timeframes=bos_bars.DEFAULT_TIMEFRAMES):
         self.username = username
         self.password = password
         self.gui_queue = gui_queue
-        self.sync_port = None
-        self.async_port = None
+        self.sync_port = sync_port
+        self.async_port = async_port
         self.is_logged_in = False
         self.portfolio = {}
+        self.portfolio_state = PortfolioState()
+        self._portfolio_summary = None
         self.stop_event = threading.Event()
-        self.request_id = 1
+        self._request_ids = itertools.count(2)
+        self._request_id_lock = threading.Lock()
         self.async_socket = None
-        self.market_data = {}
-        self.TARGET_ISIN = "PL0GF0031252"
+        self.async_pipeline = None
+        self.sync_channel = None
+        # record_path: surowe ramki async i sync sesji zapisywane w tle do pliku (bos_recorder).
+        self.record_path = record_path
+        self.recorder = None
+        self.latency = LatencyTracker()
+        # Czas menedżera i znaczników; bos_replay podstawia zegar odtwarzanej sesji.
+        self.clock = clock
+        self._last_tick = None # (recv_ns, parsed_ns) ostatniego MktDataInc
+        self.TARGET_ISIN = instrument # instrument menedżera transakcji
+        # Ceny w kliencie są liczbą ticków; FW20 notowany jest co 1 pkt.
+        self.ticks = TickTable(TICK_SIZES)
+        # Ostatnie tick_history ticków na instrument (wymaga NumPy) dla menedżera, wykresów i wskaźników.
+        self.tick_history = bos_ticks.TickHistory(tick_history, clock.time_ns) if tick_history and bos_ticks.np is not None else None
+        # Świece OHLCV wszystkich interwałów z transakcji (czas Tm giełdy, wolumen Sz); wymaga NumPy.
+        self.bars = bos_bars.BarEngine(bar_timeframes) if bar_timeframes and bos_bars.np is not None else None
+        # (isin, interwał) -> IndicatorSet aktualizowany zamknięciami świec; patrz add_indicators.
+        self.indicators = {}
+        self._indicator_lock = threading.Lock()
+        self.market_data = QuoteStore(ticks=self.ticks, history=self.tick_history, clock=clock.time_ns)
+        self.encoder = FixmlEncoder(self.ticks, clock=clock.time)
+        # book_depth > 0: subskrypcja z arkuszem (MktDepth) i pełny arkusz zleceń na instrument.
+        self.order_books = OrderBooks(book_depth, self.ticks, clock.time_ns) if book_depth else None
+        self.subscriptions = SubscriptionManager(self.encoder, self._send_and_receive_sync_many, self._next_request_id, depth=book_depth)
+        self.subscriptions.add_consumer(self.TARGET_ISIN, self._on_target_tick)
+        # GUI dostaje najwyżej gui_rate_hz migawek na instrument na sekundę; None = każdy tick.
+        self.quote_conflator = QuoteConflator(self.market_data, self._publish_quote, gui_rate_hz) if gui_rate_hz else None
         self.manager_thread = None
         self.manager_stop_event = threading.Event()
         self.manager_state = BotState.STOPPED
@@ -535,45 +673,53 @@ class BossaAPIClient:
         self.position_type = None
         self.daily_profit = 0
         self.existing_position_details = None # NEW: To store details of an existing position
+        # Obsługa komunikatów async wg typu (pierwszy element w <FIXML>): handler(message, received_ns)
+        self.async_handlers = {
+            'ExecRpt': self._parse_execution_report,
+            'MktDataInc': self._parse_market_data,
+            'Statement': self._parse_portfolio,
+            'Heartbeat': self._handle_heartbeat,
+            'ApplMsgRpt': self._handle_appl_msg,
+        }
 
     # --- ZAKTUALIZOWANA METODA ---
     def cancel_order(self, order_details):
         """Wysyła w pełni sformatowane żądanie anulowania zlecenia."""
-        self.request_id += 1
-        client_cancel_id = self.request_id
-        
-        side = '1' if order_details['k_s_text'] == "Kupno" else '2'
-        txn_time = datetime.now().strftime('%Y%m%d-%H:%M:%S')
-        fixml_request = f"""<FIXML v="5.0" r="20080317" s="20080314">
-<OrdCxlReq ID="{client_cancel_id}" OrdID="{order_details['id_dm']}" Acct="{order_details['rachunek']}" Side="{side}"  TxnTm="{txn_time}">
-<Instrmt ID="{self.TARGET_ISIN}" Src="4"/>
-<OrdQty Qty="{order_details['ilosc']}"/>
-</OrdCxlReq></FIXML>"""
-        
+        fixml_request = self._build_cancel_request(order_details)
         response = self._send_and_receive_sync(fixml_request)
+        self._handle_cancel_response(order_details, response)
+
+    def _build_cancel_request(self, order_details):
+        client_cancel_id = self._next_request_id()
+        side = bos_fixml.side_code(order_details['k_s_text'])
+        return self.encoder.cancel(client_cancel_id, order_details['id_dm'], order_details['rachunek'], side, order_details['ilosc'], self.TARGET_ISIN)
+
+    def _handle_cancel_response(self, order_details, response):
         # Odpowiedź na anulatę również przyjdzie jako ExecRpt, więc _parse_execution_report ją obsłuży
         if response and '<ExecRpt' in response:
             self._parse_execution_report(response)
         else:
             self._log(f"Odpowiedź na anulatę zlecenia {order_details['id_dm']}: {response}")
 
+    def _replace_stop_order(self, cancel_details, direction, quantity, price, trigger=None):
+        """Anuluje stary stop i składa nowy - oba żądania są w locie jednocześnie."""
+        cancel_request = self._build_cancel_request(cancel_details)
+        self.stop_order_id = None
+        order_id, order_request = self._build_limit_order(cancel_details['rachunek'], direction, quantity, price, is_managed=True, trigger=trigger)
+        cancel_response, order_response = self._send_and_receive_sync_many([cancel_request, order_request], order_id)
+        self._handle_cancel_response(cancel_details, cancel_response)
+        self._handle_order_response(order_response)
+
     # --- ZAKTUALIZOWANA METODA ---
-    def _parse_portfolio(self, xml_data):
-        root = ET.fromstring(xml_data)
+    def _parse_portfolio(self, xml_data, received_ns=None):
+        parsed_portfolio, changes = self.portfolio_state.apply_statement(xml_data)
+        if parsed_portfolio is None:
+            return
         open_position_qty = 0
-        parsed_portfolio = {}
         self.existing_position_details = None # Reset before parsing
 
-        for statement in root.findall('Statement'):
-            account_id = statement.get('Acct')
-            parsed_portfolio[account_id] = {'funds': {}, 'positions': []}
-            for fund in statement.findall('Fund'):
-                parsed_portfolio[account_id]['funds'][fund.get('name')] = fund.get('value')
-            for position in statement.findall('.//Position'):
-                instrument = position.find('Instrmt')
-                pos_data = { 'symbol': instrument.get('Sym'), 'isin': instrument.get('ID'), 'quantity': int(position.get('Acc110')), 'blocked_quantity': position.get('Acc120') }
-                parsed_portfolio[account_id]['positions'].append(pos_data)
-                
+        for account_id, account_data in parsed_portfolio.items():
+            for pos_data in account_data['positions']:
                 if pos_data['isin'] == self.TARGET_ISIN:
                     open_position_qty += int(pos_data['quantity'])
                     # NEW: Store existing position details if found in the target account
@@ -587,66 +733,64 @@ class BossaAPIClient:
                         }
 
         self.portfolio = parsed_portfolio
+        summary = (open_position_qty, self.existing_position_details)
+        if not changes and summary == self._portfolio_summary:
+            return
+        self._portfolio_summary = summary
         self.gui_queue.put(("PORTFOLIO_UPDATE", {
-            'portfolio_data': self.portfolio,
+            'changes': changes, # tylko zmienione środki i pozycje, patrz PortfolioState
             'open_position_qty': open_position_qty,
             'existing_position_found': self.existing_position_details is not None, # NEW: Indicate if an existing position was found
             'existing_position_details': self.existing_position_details # NEW: Pass details to GUI
         }))
     
     # ... (pozostałe metody BossaAPIClient bez zmian)
-    def _parse_execution_report(self, xml_data):
+    def _parse_execution_report(self, xml_data, received_ns=None):
         try:
-            root = ET.fromstring(xml_data)
-            exec_rpt = root.find('ExecRpt')
-            if exec_rpt is None: return
-            instrument = exec_rpt.find('Instrmt')
-            symbol = instrument.get('Sym', 'N/A') if instrument is not None else 'N/A'
-            order_data = {'id_dm': exec_rpt.get('OrdID', ''), 'id_klienta': exec_rpt.get('ID', ''),'status': exec_rpt.get('Stat', ''), 'symbol': symbol, 'k_s': exec_rpt.get('Side', ''), 'ilosc': exec_rpt.find('.//OrdQty').get('Qty', '') if exec_rpt.find('.//OrdQty') is not None else '', 'pozostalo': exec_rpt.get('LeavesQty', ''), 'wykonano': exec_rpt.get('CumQty', ''), 'limit': exec_rpt.get('Px', ''), 'cena_ost': exec_rpt.get('LastPx', ''), 'czas': exec_rpt.get('TxnTm', '')}
-            self.gui_queue.put(("EXEC_REPORT", order_data))
-            client_id = exec_rpt.get('ID')
-            status = exec_rpt.get('Stat')
-            dm_id = exec_rpt.get('OrdID')
+            report = bos_fixml.parse_execution_report(xml_data, self.ticks)
+            if report is None: return
+            parsed_ns = time.perf_counter_ns()
+            client_id = report.client_id
+            status = report.status_code
+            dm_id = report.order_id
+            self.gui_queue.put(("EXEC_REPORT", report))
+            self._record_ack(client_id)
             self._bot_log(f"DEBUG: Parsing ExecRpt - ID Klienta: {client_id}, Status: {status}, ID DM: {dm_id} ")
-            if status == '2':
-                last_px_str = exec_rpt.get('LastPx')
-                if not last_px_str: return
-
-                client_id = exec_rpt.get('ID')
-                dm_id = exec_rpt.get('OrdID')
+            if report.status is OrdStatus.FILLED:
+                if report.last_px is None: return
 
                 if self.manager_state == BotState.WAITING_FOR_ENTRY_FILL and client_id == self.entry_order_id:
-                    self._bot_log(f"DEBUG: Entry order filled. ID Klienta: {client_id}, ID DM: {dm_id}, Cena: {last_px_str}. Preparing to place stop order.")
-                    self.position_entry_price = float(last_px_str)
+                    self._bot_log(f"DEBUG: Entry order filled. ID Klienta: {client_id}, ID DM: {dm_id}, Cena: {self._px(report.last_px)}. Preparing to place stop order.")
+                    trigger = (received_ns, parsed_ns, 0, time.perf_counter_ns()) if received_ns else None
+                    self.position_entry_price = report.last_px
                     self.entry_order_id = dm_id
                     if self.position_type == "LONG":
                         self.manager_state = BotState.IN_LONG_POSITION
                         stop_price = self.position_entry_price - self.manager_params['trailing_stop']
                         self.active_stop_price = stop_price
-                        self._bot_log(f"Pozycja LONG otwarta @ {self.position_entry_price:.2f}. Ustawiam Stop-Loss na {stop_price:.2f}")
-                        self.send_limit_order(self.manager_params['account'], "Sprzedaż", 1, stop_price, is_managed=True)
+                        self._bot_log(f"Pozycja LONG otwarta @ {self._px(self.position_entry_price)}. Ustawiam Stop-Loss na {self._px(stop_price)}")
+                        self.send_limit_order(self.manager_params['account'], "Sprzedaż", 1, stop_price, is_managed=True, trigger=trigger)
                     elif self.position_type == "SHORT":
                         self.manager_state = BotState.IN_SHORT_POSITION
                         stop_price = self.position_entry_price + self.manager_params['trailing_stop']
                         self.active_stop_price = stop_price
-                        self._bot_log(f"Pozycja SHORT otwarta @ {self.position_entry_price:.2f}. Ustawiam Stop-Loss na {stop_price:.2f}")
-                        self.send_limit_order(self.manager_params['account'], "Kupno", 1, stop_price, is_managed=True)
-                    self.gui_queue.put(("BOT_STATE_UPDATE", {'entry_price': self.position_entry_price, 'commission': self.manager_params['commission'], 'position_type': self.position_type}))
+                        self._bot_log(f"Pozycja SHORT otwarta @ {self._px(self.position_entry_price)}. Ustawiam Stop-Loss na {self._px(stop_price)}")
+                        self.send_limit_order(self.manager_params['account'], "Kupno", 1, stop_price, is_managed=True, trigger=trigger)
+                    self.gui_queue.put(("BOT_STATE_UPDATE", self._bot_state()))
                 elif client_id == self.stop_order_id:
-                    exit_price = float(last_px_str)
+                    exit_price = report.last_px
                     profit = (exit_price - self.position_entry_price) if self.position_type == "LONG" else (self.position_entry_price - exit_price)
-                    profit -= 2 * self.manager_params['commission']
+                    # Wynik w jednostkach 10**-decimals: prowizja nie musi być wielokrotnością ticka.
+                    profit = profit * self.ticks.get(self.TARGET_ISIN).units - 2 * self.manager_params['commission']
                     self.daily_profit += profit
-                    self._bot_log(f"Pozycja ZAMKNIĘTA @ {exit_price:.2f}. Zysk/Strata: {profit:.2f}. Zysk dzienny: {self.daily_profit:.2f}")
+                    self._bot_log(f"Pozycja ZAMKNIĘTA @ {self._px(exit_price)}. Zysk/Strata: {self._amount(profit)}. Zysk dzienny: {self._amount(self.daily_profit)}")
                     self.manager_stop_event.set()
                     self.manager_state = BotState.IDLE
                     self.gui_queue.put(("BOT_STATE_UPDATE", {'entry_price': None}))
                 elif self.manager_state in [BotState.IN_LONG_POSITION, BotState.IN_SHORT_POSITION] and client_id == self.stop_order_id:
                     self._bot_log(f"Stop-loss order acknowledged by the server. ID: {dm_id}")
                     self.stop_order_id = dm_id
-            elif status in ['4', '8']:
-                client_id = exec_rpt.get('ID')
-                dm_id = exec_rpt.get('OrdID')
+            elif report.status in (OrdStatus.CANCELED, OrdStatus.REJECTED):
                 if self.manager_state == BotState.WAITING_FOR_ENTRY_FILL and client_id == self.stop_order_id:
                     self._bot_log(f"Stop-loss order updated. Status: {status}, Server ID: {dm_id}")
                     self.stop_order_id = dm_id
@@ -657,57 +801,131 @@ class BossaAPIClient:
         except Exception as e:
             self._log(f"Błąd podczas parsowania ExecutionReport: {e}")
 
-    def _parse_market_data(self, xml_data):
+    def _parse_market_data(self, xml_data, received_ns=None):
         try:
-            root = ET.fromstring(xml_data)
-            for inc_element in root.findall('.//Inc'):
-                entry_type = inc_element.get('Typ')
-                instrument = inc_element.find('Instrmt')
-                if instrument is not None:
-                    isin = instrument.get('ID')
-                    if isin not in self.market_data: self.market_data[isin] = {}
-                    price_str = inc_element.get('Px')
-                    size_str = inc_element.get('Sz')
-                    if price_str:
-                        price = float(price_str)
-                        if entry_type == '0': self.market_data[isin]['bid'] = price
-                        elif entry_type == '1': self.market_data[isin]['ask'] = price
-                        elif entry_type == '2': self.market_data[isin]['last_price'] = price
-                    if size_str and entry_type == 'C':
-                        self.market_data[isin]['lop'] = int(float(size_str))
-            if self.TARGET_ISIN in self.market_data:
-                data_to_send = self.market_data[self.TARGET_ISIN]
-                data_to_send['isin'] = self.TARGET_ISIN
-                self.gui_queue.put(("MARKET_DATA_UPDATE", data_to_send))
+            # Jedno parsowanie komunikatu; notowania, poziomy arkusza i transakcje idą z tej samej listy.
+            entries = bos_fixml.inc_entries(xml_data)
+            if self.order_books is not None and any(entry[2] for entry in entries):
+                updated = self.order_books.apply_entries(entries, self.market_data)
+            else:
+                updated = self.market_data.apply_entries(entries)
+            if self.bars is not None:
+                trades = [entry for entry in entries if entry[1] == '2' and entry[3]]
+                if trades: self._update_bars(trades)
+            self.subscriptions.dispatch(updated, received_ns)
+            if self.quote_conflator:
+                self.quote_conflator.mark(updated)
+            else:
+                for isin in updated:
+                    self._publish_quote(self.market_data.quote_text(isin))
         except Exception as e:
             self._log(f"Błąd podczas parsowania danych rynkowych: {e}")
 
+    def _update_bars(self, trades):
+        now_ns = self.clock.time_ns()
+        with self._indicator_lock:
+            for _, _, _, price_str, size_str, tm, isin in trades:
+                closed = self.bars.update_trade(isin, tm, self.ticks.to_ticks(isin, price_str), int(float(size_str)) if size_str else 0, now_ns)
+                for timeframe, bar in closed:
+                    indicators = self.indicators.get((isin, timeframe))
+                    if indicators is not None: indicators.update(bar.close)
+
+    def add_indicators(self, isin, timeframe, indicators=None):
+        """Compute indicators (default SMA/EMA/RSI/MACD) on the closes of an instrument's bars, in ticks.
+
+        The set is backfilled from the closed bars held so far and then
+        updated with each bar that closes; returns it, or None without bars.
+        """
+        if self.bars is None or timeframe not in self.bars.timeframes:
+            self._log(f"Wskaźniki {isin} {timeframe} niedostępne - brak świec tego interwału.")
+            return None
+        indicators = indicators if indicators is not None else IndicatorSet.default()
+        with self._indicator_lock:
+            bars = self.bars.bars(isin, timeframe, include_open=False)
+            indicators.backfill(bars.close if bars is not None else [])
+            self.indicators[(isin, timeframe)] = indicators
+        return indicators
+
+    def remove_indicators(self, isin, timeframe):
+        with self._indicator_lock:
+            self.indicators.pop((isin, timeframe), None)
+
+    def indicator_values(self, isin, timeframe, live=True):
+        """Latest indicator values; with ``live`` as if the forming bar closed at its current price."""
+        indicators = self.indicators.get((isin, timeframe))
+        if indicators is None:
+            return None
+        with self._indicator_lock:
+            bar = self.bars.current(isin, timeframe) if live else None
+            return indicators.peek(bar.close) if bar is not None else indicators.values()
+
+    def _px(self, ticks):
+        return self.ticks.format(self.TARGET_ISIN, ticks)
+
+    def _log_indicators(self):
+        """Wskaźniki instrumentu menedżera z interwału params['indicator_timeframe'] (rejestrowane przy pierwszym użyciu)."""
+        timeframe = self.manager_params.get('indicator_timeframe')
+        if not timeframe:
+            return
+        if (self.TARGET_ISIN, timeframe) not in self.indicators and self.add_indicators(self.TARGET_ISIN, timeframe) is None:
+            return
+        values = self.indicator_values(self.TARGET_ISIN, timeframe)
+        self._bot_log(f"Wskaźniki {timeframe} (w tickach): {format_values(values)}")
+
+    def _amount(self, units):
+        return self.ticks.get(self.TARGET_ISIN).format_units(units)
+
+    def _manager_params(self, params):
+        """Parametry menedżera: odległość stopu w tickach, prowizja w jednostkach 10**-decimals (poza siatką ticków)."""
+        tick = self.ticks.get(self.TARGET_ISIN)
+        return dict(params, trailing_stop=tick.to_ticks(str(params['trailing_stop'])), commission=tick.to_units(str(params['commission'])))
+
+    def _bot_state(self):
+        tick = self.ticks.get(self.TARGET_ISIN)
+        commission = 2 * self.manager_params['commission']
+        entry = self.position_entry_price * tick.units
+        be_price = entry + commission if self.position_type == "LONG" else entry - commission
+        return {'entry_price': self._px(self.position_entry_price), 'be_price': self._amount(be_price), 'position_type': self.position_type}
+
     def _bot_log(self, message):
         self.gui_queue.put(("BOT_LOG", message))
 
+    def _on_target_tick(self, isin, received_ns):
+        if received_ns:
+            self._last_tick = (received_ns, time.perf_counter_ns())
+
+    def _publish_quote(self, quote):
+        # quote_text() zwraca nowy słownik - GUI nie dzieli go z wątkiem parsowania.
+        self.gui_queue.put(("MARKET_DATA_UPDATE", quote))
+
+    def _record_ack(self, client_id):
+        record = self.latency.ack(client_id)
+        if record is not None:
+            self.gui_queue.put(("LATENCY_UPDATE", {'tick_to_trade_us': span_us(record, RECV, SENT), 'order_ack_us': span_us(record, BUILT, ACK)}))
+
     def start_trade_manager(self, params, direction):
         if self.manager_state not in [BotState.STOPPED, BotState.IDLE]:
             self._bot_log("Błąd: Menedżer jest już aktywny w innej pozycji.")
             return
-        self.manager_params = params
+        self.manager_params = self._manager_params(params)
         self.manager_stop_event.clear()
-        market_info = self.market_data.get(self.TARGET_ISIN)
-        if not market_info:
+        if self.TARGET_ISIN not in self.market_data:
             self._bot_log("Błąd: Brak danych rynkowych. Dodaj instrument do filtra.")
             return
         if direction == "Kupno":
-            entry_price = market_info.get('ask')
+            entry_price = self.market_data.get(self.TARGET_ISIN, 'ask')
             if not entry_price:
                 self._bot_log("Błąd: Brak ceny ASK do otwarcia pozycji LONG.")
                 return
             self.position_type = "LONG"
         else:
-            entry_price = market_info.get('bid')
+            entry_price = self.market_data.get(self.TARGET_ISIN, 'bid')
             if not entry_price:
                 self._bot_log("Błąd: Brak ceny BID do otwarcia pozycji SHORT.")
                 return
             self.position_type = "SHORT"
-        self._bot_log(f"Otwieram pozycję {self.position_type} zleceniem LIMIT po cenie {entry_price}...")
+        self._log_indicators()
+        self._bot_log(f"Otwieram pozycję {self.position_type} zleceniem LIMIT po cenie {self._px(entry_price)}...")
         self.manager_state = BotState.WAITING_FOR_ENTRY_FILL
         self.send_limit_order(params['account'], direction, 1, entry_price, is_managed=True)
         self.manager_thread = threading.Thread(target=self._trailing_stop_loop, daemon=True)
@@ -722,27 +940,28 @@ class BossaAPIClient:
             self._bot_log("Błąd: Menedżer jest już aktywny w innej pozycji.")
             return
 
-        self.manager_params = params
+        self.manager_params = self._manager_params(params)
         self.manager_stop_event.clear()
 
         # Initialize bot state based on existing position
         self.position_type = self.existing_position_details['position_type']
-        self.position_entry_price = self.market_data.get(self.TARGET_ISIN, {}).get('last_price', 0) # Use last price as a proxy for entry, or ideally fetch actual entry price if available
+        self.position_entry_price = self.market_data.get(self.TARGET_ISIN, 'last_price', 0) # Use last price as a proxy for entry, or ideally fetch actual entry price if available
+        self._log_indicators()
         
         if self.position_type == "LONG":
             self.manager_state = BotState.IN_LONG_POSITION
             self.active_stop_price = self.position_entry_price - self.manager_params['trailing_stop']
-            self._bot_log(f"Zarządzam istniejącą pozycją LONG. Cena wejścia (szacowana): {self.position_entry_price:.2f}. Ustawiam początkowy Stop-Loss na {self.active_stop_price:.2f}")
+            self._bot_log(f"Zarządzam istniejącą pozycją LONG. Cena wejścia (szacowana): {self._px(self.position_entry_price)}. Ustawiam początkowy Stop-Loss na {self._px(self.active_stop_price)}")
             # Place initial stop-loss for the existing position
             self.send_limit_order(self.manager_params['account'], "Sprzedaż", self.existing_position_details['quantity'], self.active_stop_price, is_managed=True)
         elif self.position_type == "SHORT":
             self.manager_state = BotState.IN_SHORT_POSITION
             self.active_stop_price = self.position_entry_price + self.manager_params['trailing_stop']
-            self._bot_log(f"Zarządzam istniejącą pozycją SHORT. Cena wejścia (szacowana): {self.position_entry_price:.2f}. Ustawiam początkowy Stop-Loss na {self.active_stop_price:.2f}")
+            self._bot_log(f"Zarządzam istniejącą pozycją SHORT. Cena wejścia (szacowana): {self._px(self.position_entry_price)}. Ustawiam początkowy Stop-Loss na {self._px(self.active_stop_price)}")
             # Place initial stop-loss for the existing position
             self.send_limit_order(self.manager_params['account'], "Kupno", self.existing_position_details['quantity'], self.active_stop_price, is_managed=True)
         
-        self.gui_queue.put(("BOT_STATE_UPDATE", {'entry_price': self.position_entry_price, 'commission': self.manager_params['commission'], 'position_type': self.position_type}))
+        self.gui_queue.put(("BOT_STATE_UPDATE", self._bot_state()))
         
         self.manager_thread = threading.Thread(target=self._trailing_stop_loop, daemon=True)
         self.manager_thread.start()
@@ -751,35 +970,35 @@ class BossaAPIClient:
         if self.manager_state not in [BotState.IN_LONG_POSITION, BotState.IN_SHORT_POSITION]:
             self._bot_log("Brak otwartej pozycji do zamknięcia.")
             return
+        # Use the quantity from existing_position_details if available, otherwise default to 1
+        qty_to_close = self.existing_position_details['quantity'] if self.existing_position_details else 1
+        if self.position_type == "LONG":
+            direction = "Sprzedaż"
+            exit_price = self.market_data.get(self.TARGET_ISIN, 'bid')
+            self._bot_log(f"Ręczne zamykanie LONG po cenie rynkowej (BID): {self._px(exit_price)}")
+        else:
+            direction = "Kupno"
+            exit_price = self.market_data.get(self.TARGET_ISIN, 'ask')
+            self._bot_log(f"Ręczne zamykanie SHORT po cenie rynkowej (ASK): {self._px(exit_price)}")
         if self.stop_order_id:
             self._bot_log(f"Anulowanie aktywnego stop-lossa (ID: {self.stop_order_id})...")
-            # Use the quantity from existing_position_details if available, otherwise default to 1
-            qty_to_cancel = self.existing_position_details['quantity'] if self.existing_position_details else 1
-            self.cancel_order({'id_dm': self.stop_order_id, 'k_s_text': 'Sprzedaż' if self.position_type == 'LONG' else 'Kupno', 'ilosc': qty_to_cancel, 'rachunek': self.manager_params['account']})
-            self.stop_order_id = None
-        market_info = self.market_data.get(self.TARGET_ISIN)
-        if self.position_type == "LONG":
-            exit_price = market_info.get('bid')
-            self._bot_log(f"Ręczne zamykanie LONG po cenie rynkowej (BID): {exit_price}")
-            qty_to_close = self.existing_position_details['quantity'] if self.existing_position_details else 1
-            self.send_limit_order(self.manager_params['account'], "Sprzedaż", qty_to_close, exit_price, is_managed=True)
-        elif self.position_type == "SHORT":
-            exit_price = market_info.get('ask')
-            self._bot_log(f"Ręczne zamykanie SHORT po cenie rynkowej (ASK): {exit_price}")
-            qty_to_close = self.existing_position_details['quantity'] if self.existing_position_details else 1
-            self.send_limit_order(self.manager_params['account'], "Kupno", qty_to_close, exit_price, is_managed=True)
+            self._replace_stop_order({'id_dm': self.stop_order_id, 'k_s_text': direction, 'ilosc': qty_to_close, 'rachunek': self.manager_params['account']}, direction, qty_to_close, exit_price)
+        else:
+            self.send_limit_order(self.manager_params['account'], direction, qty_to_close, exit_price, is_managed=True)
         self.manager_stop_event.set()
 
     def _trailing_stop_loop(self):
         self._bot_log("Pętla Trailing Stop rozpoczęta.")
         while not self.manager_stop_event.is_set():
             self._bot_log("DBG: Pętla Trailing Stop aktywna... sprawdzanie ceny...")
-            time.sleep(1.5)
+            self.clock.sleep(1.5)
             if self.manager_state not in [BotState.IN_LONG_POSITION, BotState.IN_SHORT_POSITION]:
                 self._bot_log("DBG: Pętla Trailing Stop zakończona - brak aktywnej pozycji.")
                 continue
             self._bot_log("DBG: Pętla Trailing Stop - pobieranie najnowszej ceny...")
-            last_price = self.market_data.get(self.TARGET_ISIN, {}).get('last_price')
+            tick = self._last_tick
+            woke_ns = time.perf_counter_ns()
+            last_price = self.market_data.get(self.TARGET_ISIN, 'last_price')
             if not last_price: continue
             new_stop_price = self.active_stop_price
             should_move_stop = False
@@ -799,36 +1018,37 @@ class BossaAPIClient:
                     should_move_stop = True
             
             if should_move_stop:
-                self._bot_log(f"Cena przesunęła się. Przesuwam stop-loss z {self.active_stop_price:.2f} na {new_stop_price:.2f}")
+                trigger = (*tick, woke_ns, time.perf_counter_ns()) if tick else None
+                self._bot_log(f"Cena przesunęła się. Przesuwam stop-loss z {self._px(self.active_stop_price)} na {self._px(new_stop_price)}")
                 
+                self.active_stop_price = new_stop_price
+                direction = "Sprzedaż" if self.position_type == "LONG" else "Kupno"
                 # Only attempt to cancel if there's an active stop order
                 if self.stop_order_id:
-                    self.cancel_order({'id_dm': self.stop_order_id, 'k_s_text': 'Sprzedaż' if self.position_type == "LONG" else 'Kupno', 'ilosc': qty_for_stop, 'rachunek': self.manager_params['account']})
-                    self.stop_order_id = None # Clear the old stop order ID immediately after cancellation request
-
-                self.active_stop_price = new_stop_price
-                if self.position_type == "LONG":
-                    self.send_limit_order(self.manager_params['account'], "Sprzedaż", qty_for_stop, new_stop_price, is_managed=True)
+                    self._replace_stop_order({'id_dm': self.stop_order_id, 'k_s_text': direction, 'ilosc': qty_for_stop, 'rachunek': self.manager_params['account']}, direction, qty_for_stop, new_stop_price, trigger)
                 else:
-                    self.send_limit_order(self.manager_params['account'], "Kupno", qty_for_stop, new_stop_price, is_managed=True)
+                    self.send_limit_order(self.manager_params['account'], direction, qty_for_stop, new_stop_price, is_managed=True, trigger=trigger)
         self._bot_log("Pętla Trailing Stop zakończona.")
 
-    def send_limit_order(self, account, direction, quantity, price, is_managed=False):
-        self.request_id += 1
-        client_order_id = self.request_id
+    def send_limit_order(self, account, direction, quantity, price, is_managed=False, trigger=None):
+        order_id, fixml_request = self._build_limit_order(account, direction, quantity, price, is_managed, trigger)
+        self._handle_order_response(self._send_and_receive_sync(fixml_request, order_id))
+
+    def _build_limit_order(self, account, direction, quantity, price, is_managed=False, trigger=None):
+        """Zwraca (ID klienta, FIXML); trigger to znaczniki (recv, parsed, wake, decision) decyzji o zleceniu."""
+        client_order_id = self._next_request_id()
         if is_managed:
             if self.manager_state == BotState.WAITING_FOR_ENTRY_FILL and not self.entry_order_id:
                 self.entry_order_id = str(client_order_id)
             # Always update stop_order_id if it's a managed stop-loss order
             elif self.manager_state in [BotState.IN_LONG_POSITION, BotState.IN_SHORT_POSITION]:
                 self.stop_order_id = str(client_order_id)
-        side = '1' if direction == "Kupno" else '2'
-        trade_date = datetime.now().strftime('%Y%m%d')
-        transact_time = datetime.now().strftime('%Y%m%d-%H:%M:%S')
-        order_type = 'L'
-        time_in_force = '0'
-        fixml_request = f"""<FIXML v="5.0" r="20080317" s="20080314"><Order ID="{client_order_id}" TrdDt="{trade_date}" Acct="{account}" Side="{side}" TxnTm="{transact_time}" OrdTyp="{order_type}" Px="{price:.2f}" Ccy="PLN" TmInForce="{time_in_force}"><Instrmt ID="{self.TARGET_ISIN}" Src="4"/><OrdQty Qty="{quantity}"/></Order></FIXML>"""
-        response = self._send_and_receive_sync(fixml_request)
+        side = bos_fixml.side_code(direction)
+        fixml_request = self.encoder.limit_order(client_order_id, account, side, quantity, price, self.TARGET_ISIN)
+        self.latency.start(str(client_order_id), trigger)
+        return str(client_order_id), fixml_request
+
+    def _handle_order_response(self, response):
         if response and '<ExecRpt' in response:
             self._parse_execution_report(response)
         elif response:
@@ -839,82 +1059,149 @@ class BossaAPIClient:
     def _log(self, message):
         self.gui_queue.put(("LOG", message))
 
-    def _send_and_receive_sync(self, message):
-        sync_socket = None
+    def _next_request_id(self):
+        # Wywoływane z wątku GUI, menedżera i nasłuchu - ID nie mogą się powtórzyć.
+        with self._request_id_lock:
+            return next(self._request_ids)
+
+    def _send_and_receive_sync(self, message, order_id=None):
         try:
-            sync_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sync_socket.connect(('127.0.0.1', self.sync_port))
-            self._send_message(sync_socket, message)
-            response = self._receive_message(sync_socket)
-            return response
+            future = self.sync_channel.submit(message)
+            if order_id: self.latency.stamp(order_id, SENT)
+            return self.sync_channel.results([future], SYNC_TIMEOUT)[0]
         except ConnectionAbortedError as e:
             self._log(f"BŁĄD: Połączenie zostało zerwane przez serwer (NOL3). {e}")
             return None
+        except FutureTimeoutError as e:
+            self._log(f"BŁĄD: {e}")
+            return None
         except Exception as e:
             self._log(f"BŁĄD komunikacji synchronicznej: {e}")
             return None
-        finally:
-            if sync_socket:
-                sync_socket.close()
 
-    def add_to_filter(self, isin):
-        self.request_id += 1
-        fixml_request = f'<FIXML v="5.0" r="20080317" s="20080314"><MktDataReq ReqID="{self.request_id}" SubReqTyp="1" MktDepth="0"><req Typ="0"/><req Typ="1"/><req Typ="2"/><req Typ="B"/><req Typ="C"/><req Typ="3"/><req Typ="4"/><req Typ="5"/><req Typ="7"/><req Typ="r"/><req Typ="8"/><InstReq><Instrmt ID="{isin}" Src="4"/></InstReq></MktDataReq></FIXML>'
-        response = self._send_and_receive_sync(fixml_request)
-        if response and '<MktDataFull' in response:
-            self._log(f"Pomyślnie dodano {isin} do filtra.")
-        else:
-            self._log(f"Błąd podczas dodawania do filtra. Odpowiedź: {response}")
+    def _send_and_receive_sync_many(self, messages, order_id=None):
+        try:
+            futures = self.sync_channel.submit_many(messages)
+            if order_id: self.latency.stamp(order_id, SENT)
+            return self.sync_channel.results(futures, SYNC_TIMEOUT)
+        except ConnectionAbortedError as e:
+            self._log(f"BŁĄD: Połączenie zostało zerwane przez serwer (NOL3). {e}")
+        except FutureTimeoutError as e:
+            self._log(f"BŁĄD: {e}")
+        except Exception as e:
+            self._log(f"BŁĄD komunikacji synchronicznej: {e}")
+        return [None] * len(messages)
+
+    def add_to_filter(self, isins):
+        """Dodaje do filtra instrumenty (ISIN lub lista), których w nim jeszcze nie ma."""
+        isins = [isins] if isinstance(isins, str) else list(isins)
+        added = self.subscriptions.add(isins)
+        failed = sorted(set(isins) - self.subscriptions.instruments)
+        if added:
+            self._log(f"Pomyślnie dodano do filtra: {', '.join(sorted(added))}.")
+        if failed:
+            self._log(f"Błąd podczas dodawania do filtra: {', '.join(failed)}.")
+        self._publish_subscriptions()
+
+    def remove_from_filter(self, isins):
+        """Usuwa z filtra tylko podane instrumenty, bez czyszczenia całego filtra."""
+        isins = [isins] if isinstance(isins, str) else list(isins)
+        removed = self.subscriptions.remove(isins)
+        failed = sorted(set(isins) & self.subscriptions.instruments)
+        if removed:
+            self._log(f"Pomyślnie usunięto z filtra: {', '.join(sorted(removed))}.")
+        if failed:
+            self._log(f"Błąd podczas usuwania z filtra: {', '.join(failed)}.")
+        self._publish_subscriptions()
 
     def clear_filter(self):
-        self.request_id += 1
-        fixml_request = f'<FIXML v="5.0" r="20080317" s="20080314"><MktDataReq ReqID="{self.request_id}" SubReqTyp="2"></MktDataReq></FIXML>'
-        response = self._send_and_receive_sync(fixml_request)
-        if response and '<MktDataFull' in response:
+        if self.subscriptions.clear():
             self._log("Pomyślnie wyczyszczono filtr.")
         else:
-            self._log(f"Błąd podczas czyszczenia filtra. Odpowiedź: {response}")
+            self._log("Błąd podczas czyszczenia filtra.")
+        self._publish_subscriptions()
+
+    def _publish_subscriptions(self):
+        self.gui_queue.put(("SUBSCRIPTIONS", sorted(self.subscriptions.instruments)))
 
     def _async_listener(self):
+        pipeline = AsyncMessagePipeline(self._handle_async_message, on_error=lambda e: self._log(f"Błąd w wątku asynchronicznym: {e}"))
+        self.async_pipeline = pipeline
         try:
             self.async_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.async_socket.connect(('127.0.0.1', self.async_port))
             self._log("Połączono z portem asynchronicznym.")
+            pipeline.start()
+            reader = FrameReader(self.async_socket)
+            recorder = self.recorder
+            # Ten wątek tylko wycina ramki; parsowanie odbywa się w wątkach potoku.
             while not self.stop_event.is_set():
-                message = self._receive_message(self.async_socket)
-                if message is None: break
-                self.gui_queue.put(("ASYNC_MSG", message))
-                if '<ExecRpt' in message: self._parse_execution_report(message)
-                elif '<MktDataInc' in message: self._parse_market_data(message)
-                elif '<Statement' in message:
-                    self._parse_portfolio(message)
+                frame = reader.read_frame()
+                if frame is None: break
+                data = bytes(frame)
+                if recorder is not None: recorder.record(ASYNC_IN, data)
+                pipeline.feed(data, time.perf_counter_ns())
         except Exception as e:
             if not self.stop_event.is_set(): self._log(f"Błąd w wątku asynchronicznym: {e}")
         finally:
             if self.async_socket: self.async_socket.close()
-            
+            pipeline.close()
+            self._log(f"Statystyki potoku asynchronicznego: {pipeline.stats()}")
+
+    def register_async_handler(self, message_type, handler):
+        """Dodaje lub zastępuje obsługę komunikatu async danego typu, np. 'TrdCaptRpt'."""
+        self.async_handlers[message_type] = handler
+
+    def _handle_async_message(self, message, message_type=None, received_ns=None):
+        if message_type is None: message_type = bos_fixml.message_type(message)
+        # Heartbeat i ApplMsgRpt idą do GUI jako własne zdarzenia, MktDataInc tylko jako
+        # skonflowane MARKET_DATA_UPDATE, Statement jako różnica portfela; reszta trafia
+        # także do okna komunikatów.
+        if message_type not in ('Heartbeat', 'ApplMsgRpt', 'MktDataInc', 'Statement'):
+            self.gui_queue.put(("ASYNC_MSG", message))
+        handler = self.async_handlers.get(message_type)
+        if handler: handler(message, received_ns)
+
+    def _handle_heartbeat(self, xml_data, received_ns=None):
+        self.gui_queue.put(("HEARTBEAT", None))
+
+    def _handle_appl_msg(self, xml_data, received_ns=None):
+        self.gui_queue.put(("APPL_MSG", bos_fixml.parse_appl_msg_text(xml_data)))
+
     def run(self):
-        if not self._get_ports_from_registry():
-            self.gui_queue.put(("LOGIN_FAIL", "Błąd odczytu portów z rejestru."))
+        if not self._get_ports():
+            self.gui_queue.put(("LOGIN_FAIL", "Błąd odczytu portów NOL3."))
             return
-        self.request_id += 1
-        login_request = f'<FIXML v="5.0" r="20080317" s="20080314"><UserReq UserReqID="{self.request_id}" UserReqTyp="1" Username="{self.username}" Password="{self.password}"/></FIXML>'
+        self.sync_channel = PipelinedSyncChannel(SyncConnectionPool('127.0.0.1', self.sync_port))
+        self.sync_channel.pool.start()
+        login_request = self.encoder.login(self._next_request_id(), self.username, self.password)
         self._log("Wysyłanie żądania logowania...")
         response = self._send_and_receive_sync(login_request)
         if response and '<UserRsp' in response:
-            root = ET.fromstring(response)
-            user_rsp = root.find('UserRsp')
-            if user_rsp is not None and user_rsp.get('UserStat') == '1':
+            status = bos_fixml.parse_login_status(response)
+            if status == '1':
                 self.is_logged_in = True
                 self.gui_queue.put(("LOGIN_SUCCESS", None))
                 self.manager_state = BotState.IDLE
+                if self.quote_conflator: self.quote_conflator.start()
+                if self.record_path: self._start_recording()
                 self._async_listener()
             else:
-                status = user_rsp.get('UserStat') if user_rsp is not None else 'brak'
-                self.gui_queue.put(("LOGIN_FAIL", f"Status: {status}"))
+                self.gui_queue.put(("LOGIN_FAIL", f"Status: {status or 'brak'}"))
         else:
             self.gui_queue.put(("LOGIN_FAIL", f"Nieoczekiwana odpowiedź: {response}"))
 
+    def _start_recording(self):
+        # Nagrywanie zaczyna się po zalogowaniu, więc UserReq z hasłem nie trafia do pliku.
+        try:
+            self.recorder = FeedRecorder(self.record_path).start()
+        except OSError as e:
+            self._log(f"Nie można rozpocząć nagrywania sesji: {e}")
+            return
+        recorder = self.recorder
+        self.sync_channel.tap = lambda outgoing, body: recorder.record(SYNC_OUT if outgoing else SYNC_IN, body)
+        self._log(f"Nagrywanie sesji do pliku {self.record_path}")
+
     def disconnect(self):
         self.manager_stop_event.set()
         self.stop_event.set()
@@ -925,9 +1212,42 @@ class BossaAPIClient:
                 pass
             finally:
                 self.async_socket.close()
+        if self.sync_channel:
+            self._log(f"Statystyki kanału sync: {self.sync_channel.stats()}")
+            self.sync_channel.close()
+        if self.quote_conflator:
+            self.quote_conflator.stop()
+            self._log(f"Statystyki konflacji notowań: {self.quote_conflator.stats()}")
+        self._log(f"Statystyki portfela: {self.portfolio_state.stats()}")
+        if self.recorder:
+            if self.sync_channel: self.sync_channel.tap = None
+            self.recorder.close()
+            self._log(f"Statystyki nagrywania sesji: {self.recorder.stats()}")
+        if self.latency.completed:
+            self._log(f"Opóźnienia wewnętrzne (tick-to-trade):\n{self.latency.format_report()}")
         self.gui_queue.put(("DISCONNECTED", None))
 
+    def _get_ports(self):
+        """Porty podane jawnie, potem zmienne NOL3_SYNC_PORT/NOL3_ASYNC_PORT (np. symulator), na końcu rejestr."""
+        if self.sync_port and self.async_port:
+            self._log(f"Porty z konfiguracji: Sync={self.sync_port}, Async={self.async_port}")
+            return True
+        env_sync, env_async = os.environ.get('NOL3_SYNC_PORT'), os.environ.get('NOL3_ASYNC_PORT')
+        if env_sync and env_async:
+            try:
+                self.sync_port = int(env_sync)
+                self.async_port = int(env_async)
+            except ValueError:
+                self._log(f"BŁĄD: Niepoprawne porty w zmiennych środowiskowych: {env_sync}, {env_async}")
+                return False
+            self._log(f"Porty ze zmiennych środowiskowych: Sync={self.sync_port}, Async={self.async_port}")
+            return True
+        return self._get_ports_from_registry()
+
     def _get_ports_from_registry(self):
+        if winreg is None:
+            self._log("BŁĄD: Rejestr Windows niedostępny. Ustaw NOL3_SYNC_PORT i NOL3_ASYNC_PORT.")
+            return False
         try:
             key_path = r"Software\COMARCH S.A.\NOL3\7\Settings"
             registry_key = winreg.OpenKey(winreg.HKEY_CURRENT_USER, key_path, 0, winreg.KEY_READ)
@@ -945,24 +1265,6 @@ class BossaAPIClient:
             self._log(f"BŁĄD podczas odczytu rejestru: {e}")
             return False
 
-    def _send_message(self, sock, message):
-        encoded_message = message.encode('utf-8')
-        header = struct.pack('<I', len(encoded_message))
-        sock.sendall(header)
-        sock.sendall(encoded_message)
-
-    def _receive_message(self, sock):
-        header_data = sock.recv(4)
-        if not header_data: return None
-        message_length = struct.unpack('<I', header_data)[0]
-        if message_length == 0: return ""
-        message_data = b''
-        while len(message_data) < message_length:
-            chunk = sock.recv(message_length - len(message_data))
-            if not chunk: raise ConnectionError("Przerwano połączenie.")
-            message_data += chunk
-        return message_data.decode('utf-8','replace').strip().rstrip('\x00')
-
 if __name__ == '__main__':
     root = tk.Tk()
     app = BossaApp(root)
@@ -0,0 +1,112 @@
+import heapq
+import itertools
+import threading
+import time
+from datetime import datetime
+
+
+class SystemClock:
+    """Wall-clock time and sleeping, as used by the client in a live session."""
+
+    def time(self):
+        return time.time()
+
+    def time_ns(self):
+        return time.time_ns()
+
+    def now(self):
+        return datetime.now()
+
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+
+SYSTEM_CLOCK = SystemClock()
+
+
+class ReplayClock:
+    """Virtual clock driven by a replay instead of the wall clock.
+
+    Time only moves when the replay calls ``advance``. A thread calling
+    ``sleep`` blocks until virtual time reaches its deadline; ``advance``
+    wakes sleepers in deadline order, setting the clock to each deadline,
+    and waits until the woken threads sleep again or exit before going on.
+    A manager loop therefore sees the same sequence of ticks and wake-ups
+    at any replay speed. ``close`` releases all sleepers for good.
+    """
+
+    def __init__(self, start_ns=0, poll=0.005):
+        self._now_ns = start_ns
+        self.poll = poll
+        self.closed = False
+        self.wakeups = 0
+        self._sleepers = []  # sterta (deadline, kolejność, wpis)
+        self._order = itertools.count()
+        self._cond = threading.Condition()
+
+    def time(self):
+        return self._now_ns / 1_000_000_000
+
+    def time_ns(self):
+        return self._now_ns
+
+    def now(self):
+        return datetime.fromtimestamp(self._now_ns / 1_000_000_000)
+
+    def sleep(self, seconds):
+        with self._cond:
+            if self.closed:
+                return
+            entry = [False, threading.current_thread()]
+            heapq.heappush(self._sleepers, (self._now_ns + int(seconds * 1_000_000_000), next(self._order), entry))
+            self._cond.notify_all()
+            while not entry[0] and not self.closed:
+                self._cond.wait()
+
+    def next_deadline(self):
+        """Virtual time of the earliest sleeper, None if nobody sleeps."""
+        with self._cond:
+            return self._sleepers[0][0] if self._sleepers else None
+
+    def advance(self, until_ns, on_wake=None):
+        """Move time forward to ``until_ns``, waking every sleeper due on the way.
+
+        ``on_wake()`` is called after each group of woken threads has
+        settled, e.g. to match orders they sent.
+        """
+        while True:
+            with self._cond:
+                if not self._sleepers or self._sleepers[0][0] > until_ns:
+                    self._now_ns = max(self._now_ns, until_ns)
+                    return
+                deadline = self._sleepers[0][0]
+                self._now_ns = max(self._now_ns, deadline)
+                woken = []
+                while self._sleepers and self._sleepers[0][0] == deadline:
+                    entry = heapq.heappop(self._sleepers)[2]
+                    entry[0] = True
+                    woken.append(entry[1])
+                self.wakeups += len(woken)
+                self._cond.notify_all()
+            self.settle(woken)
+            if on_wake is not None:
+                on_wake()
+
+    def settle(self, threads, timeout=None):
+        """Wait until each of ``threads`` sleeps on this clock or has finished."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while not self.closed:
+                sleeping = {entry[1] for _, _, entry in self._sleepers}
+                if all(thread in sleeping or not thread.is_alive() for thread in threads if thread is not None):
+                    return True
+                if deadline is not None and time.monotonic() >= deadline:
+                    return False
+                self._cond.wait(self.poll)
+        return True
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._sleepers.clear()
+            self._cond.notify_all()
@@ -0,0 +1,122 @@
+import time
+from datetime import datetime
+from functools import lru_cache
+
+from bos_fixml import FIXML_OPEN, FIXML_CLOSE, MARKET_DATA_TYPES
+from bos_price import TICKS
+from bos_transport import FRAME_HEADER, EncodedMessage
+
+_ATTR_ESCAPES = str.maketrans({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', '\t': '&#9;', '\n': '&#10;', '\r': '&#13;'})
+
+
+def escape_attr(value):
+    """Escape a value for a double-quoted XML attribute."""
+    return str(value).translate(_ATTR_ESCAPES)
+
+
+@lru_cache(maxsize=4096)
+def attr_bytes(value):
+    """Escaped UTF-8 bytes of an attribute value; accounts, ISINs and order IDs repeat."""
+    return escape_attr(value).encode('utf-8')
+
+
+class TimestampCache:
+    """TrdDt/TxnTm strings of the current second, formatted once per second.
+
+    strftime costs more than filling the rest of an order, and NOL3 only
+    takes TxnTm to the second, so the strings are rebuilt only when
+    ``int(clock())`` moves on.
+    """
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self._current = (None, b'', b'')
+
+    def now(self):
+        """Return (trade date, transact time) as ASCII bytes, e.g. b'20240131', b'20240131-09:00:00'."""
+        second = int(self.clock())
+        current = self._current
+        if current[0] != second:
+            moment = datetime.fromtimestamp(second)
+            # Krotka podmieniana w całości - czytelnik w innym wątku widzi spójną parę.
+            current = (second, moment.strftime('%Y%m%d').encode('ascii'), moment.strftime('%Y%m%d-%H:%M:%S').encode('ascii'))
+            self._current = current
+        return current[1], current[2]
+
+
+class Template:
+    """FIXML request split once into a bytes %-template inside the FIXML envelope.
+
+    ``render`` fills the slots (bytes for %s, ints for %d) and returns the
+    payload with its length prefix, ready for the socket.
+    """
+
+    __slots__ = ('name', 'payload')
+
+    def __init__(self, name, body):
+        self.name = name
+        self.payload = f'{FIXML_OPEN}{body}{FIXML_CLOSE}'.encode('utf-8')
+
+    def render(self, *values):
+        payload = self.payload % values
+        return FRAME_HEADER.pack(len(payload)) + payload
+
+
+USER_REQ = Template('UserReq', '<UserReq UserReqID="%d" UserReqTyp="1" Username="%s" Password="%s"/>')
+ORDER = Template('Order', '<Order ID="%d" TrdDt="%s" Acct="%s" Side="%s" TxnTm="%s" OrdTyp="L" Px="%s" Ccy="PLN" TmInForce="0"><Instrmt ID="%s" Src="4"/><OrdQty Qty="%d"/></Order>')
+ORD_CXL_REQ = Template('OrdCxlReq', '<OrdCxlReq ID="%d" OrdID="%s" Acct="%s" Side="%s" TxnTm="%s"><Instrmt ID="%s" Src="4"/><OrdQty Qty="%d"/></OrdCxlReq>')
+MKT_DATA_REQ = Template('MktDataReq', '<MktDataReq ReqID="%d" SubReqTyp="1" MktDepth="%d">%s%s</MktDataReq>')
+MKT_DATA_REMOVE = Template('MktDataReq', '<MktDataReq ReqID="%d" SubReqTyp="2">%s</MktDataReq>')
+MKT_DATA_CLEAR = Template('MktDataReq', '<MktDataReq ReqID="%d" SubReqTyp="2"></MktDataReq>')
+
+# Lista <req Typ="..."/> jest stała - sklejana raz.
+_MARKET_DATA_REQ_TYPES = ''.join(f'<req Typ="{typ}"/>' for typ in MARKET_DATA_TYPES).encode('ascii')
+
+
+@lru_cache(maxsize=1024)
+def _inst_req(isin):
+    return b'<InstReq><Instrmt ID="%s" Src="4"/></InstReq>' % attr_bytes(isin)
+
+
+class FixmlEncoder:
+    """Builds framed sync-channel requests from precompiled templates.
+
+    Every method returns an ``EncodedMessage`` whose frame goes to the socket
+    as is and whose key is the request ID the response will carry. Output matches
+    the ``bos_fixml.build_*`` functions byte for byte, except that attribute
+    values are escaped; those stay as the readable reference.
+    """
+
+    def __init__(self, ticks=TICKS, clock=time.time):
+        self.ticks = ticks
+        self.timestamps = TimestampCache(clock)
+
+    def login(self, request_id, username, password):
+        return EncodedMessage(USER_REQ.render(int(request_id), attr_bytes(username), escape_attr(password).encode('utf-8')), str(request_id))
+
+    def limit_order(self, order_id, account, side, quantity, price, isin):
+        """Day limit order; price is in integer ticks of the instrument."""
+        trade_date, transact_time = self.timestamps.now()
+        px = self.ticks.format(isin, price).encode('ascii')
+        return EncodedMessage(ORDER.render(int(order_id), trade_date, attr_bytes(account), attr_bytes(side), transact_time, px, attr_bytes(isin), int(quantity)), str(order_id))
+
+    def cancel(self, cancel_id, order_id, account, side, quantity, isin):
+        transact_time = self.timestamps.now()[1]
+        return EncodedMessage(ORD_CXL_REQ.render(int(cancel_id), attr_bytes(order_id), attr_bytes(account), attr_bytes(side), transact_time, attr_bytes(isin), int(quantity)), str(cancel_id))
+
+    def filter_add(self, request_id, isins, depth=0):
+        """MktDataReq subscribing one ISIN or an iterable of ISINs in a single request."""
+        if isinstance(isins, str):
+            isins = (isins,)
+        inst_reqs = b''.join(_inst_req(isin) for isin in isins)
+        return EncodedMessage(MKT_DATA_REQ.render(int(request_id), int(depth), _MARKET_DATA_REQ_TYPES, inst_reqs), str(request_id))
+
+    def filter_remove(self, request_id, isins):
+        """MktDataReq unsubscribing the listed ISINs only; without InstReq it would clear the filter."""
+        if isinstance(isins, str):
+            isins = (isins,)
+        inst_reqs = b''.join(_inst_req(isin) for isin in isins)
+        return EncodedMessage(MKT_DATA_REMOVE.render(int(request_id), inst_reqs), str(request_id))
+
+    def filter_clear(self, request_id):
+        return EncodedMessage(MKT_DATA_CLEAR.render(int(request_id)), str(request_id))
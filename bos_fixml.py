@@ -0,0 +1,313 @@
+import re
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from enum import Enum
+from typing import NamedTuple, Optional
+
+from bos_price import TICKS
+
+# Nagłówek wymagany przez NOL3 w każdej wiadomości FIXML.
+FIXML_OPEN = '<FIXML v="5.0" r="20080317" s="20080314">'
+FIXML_CLOSE = '</FIXML>'
+
+# Typy danych rynkowych zamawiane przy dodawaniu instrumentu do filtra.
+MARKET_DATA_TYPES = ('0', '1', '2', 'B', 'C', '3', '4', '5', '7', 'r', '8')
+
+
+# Pierwszy element wewnątrz <FIXML ...> wyznacza typ komunikatu.
+_FIRST_TAG = re.compile(r'<FIXML\b[^>]*>\s*<([A-Za-z][\w.-]*)')
+_FIRST_TAG_BYTES = re.compile(rb'<FIXML\b[^>]*>\s*<([A-Za-z][\w.-]*)')
+_TYPE_WINDOW = 256
+
+
+def message_type(message):
+    """Return the tag of the first element inside <FIXML>, e.g. 'ExecRpt', or None.
+
+    Accepts str or raw bytes and only looks at the start of the message.
+    """
+    if isinstance(message, str):
+        match = _FIRST_TAG.search(message, 0, _TYPE_WINDOW)
+        return match.group(1) if match else None
+    match = _FIRST_TAG_BYTES.search(message, 0, _TYPE_WINDOW)
+    return match.group(1).decode('ascii') if match else None
+
+
+def side_code(direction):
+    """Map the GUI direction ("Kupno"/"Sprzedaż") to the FIXML Side code."""
+    return '1' if direction == "Kupno" else '2'
+
+
+def build_login_request(request_id, username, password):
+    return f'{FIXML_OPEN}<UserReq UserReqID="{request_id}" UserReqTyp="1" Username="{username}" Password="{password}"/>{FIXML_CLOSE}'
+
+
+def build_limit_order(order_id, account, side, quantity, price, isin, ticks=TICKS):
+    """Day limit order; price is in integer ticks of the instrument."""
+    trade_date = datetime.now().strftime('%Y%m%d')
+    transact_time = datetime.now().strftime('%Y%m%d-%H:%M:%S')
+    order_type = 'L'
+    time_in_force = '0'
+    return f'{FIXML_OPEN}<Order ID="{order_id}" TrdDt="{trade_date}" Acct="{account}" Side="{side}" TxnTm="{transact_time}" OrdTyp="{order_type}" Px="{ticks.format(isin, price)}" Ccy="PLN" TmInForce="{time_in_force}"><Instrmt ID="{isin}" Src="4"/><OrdQty Qty="{quantity}"/></Order>{FIXML_CLOSE}'
+
+
+def build_cancel_request(cancel_id, order_id, account, side, quantity, isin):
+    txn_time = datetime.now().strftime('%Y%m%d-%H:%M:%S')
+    return f'{FIXML_OPEN}<OrdCxlReq ID="{cancel_id}" OrdID="{order_id}" Acct="{account}" Side="{side}" TxnTm="{txn_time}"><Instrmt ID="{isin}" Src="4"/><OrdQty Qty="{quantity}"/></OrdCxlReq>{FIXML_CLOSE}'
+
+
+def build_filter_add(request_id, isin):
+    req_types = ''.join(f'<req Typ="{typ}"/>' for typ in MARKET_DATA_TYPES)
+    return f'{FIXML_OPEN}<MktDataReq ReqID="{request_id}" SubReqTyp="1" MktDepth="0">{req_types}<InstReq><Instrmt ID="{isin}" Src="4"/></InstReq></MktDataReq>{FIXML_CLOSE}'
+
+
+def build_filter_clear(request_id):
+    return f'{FIXML_OPEN}<MktDataReq ReqID="{request_id}" SubReqTyp="2"></MktDataReq>{FIXML_CLOSE}'
+
+
+def parse_login_status(xml_data):
+    """Return UserStat of a UserRsp message, None if there is no UserRsp."""
+    user_rsp = ET.fromstring(xml_data).find('UserRsp')
+    return user_rsp.get('UserStat') if user_rsp is not None else None
+
+
+class OrdStatus(str, Enum):
+    """FIX OrdStatus (ExecRpt@Stat); members compare equal to their code, e.g. '2'."""
+    NEW = '0'
+    PARTIALLY_FILLED = '1'
+    FILLED = '2'
+    DONE_FOR_DAY = '3'
+    CANCELED = '4'
+    REPLACED = '5'
+    PENDING_CANCEL = '6'
+    STOPPED = '7'
+    REJECTED = '8'
+    SUSPENDED = '9'
+    PENDING_NEW = 'A'
+    CALCULATED = 'B'
+    EXPIRED = 'C'
+    ACCEPTED_FOR_BIDDING = 'D'
+    PENDING_REPLACE = 'E'
+
+
+class Side(str, Enum):
+    """FIX Side; members compare equal to their code ('1'/'2')."""
+    BUY = '1'
+    SELL = '2'
+
+    @property
+    def label(self):
+        return "Kupno" if self is Side.BUY else "Sprzedaż"
+
+
+_STATUS_BY_CODE = {status.value: status for status in OrdStatus}
+_SIDE_BY_CODE = {side.value: side for side in Side}
+
+
+class ExecReport(NamedTuple):
+    """One parsed ExecRpt, immutable and shared by the manager, the GUI and recorders.
+
+    status and side are None for codes outside the enums; status_code keeps
+    the raw Stat. Prices are integer ticks; missing quantities and prices are None.
+    """
+    order_id: str
+    client_id: str
+    status: Optional[OrdStatus]
+    status_code: str
+    side: Optional[Side]
+    symbol: str
+    isin: str
+    quantity: Optional[int]
+    leaves_qty: Optional[int]
+    cum_qty: Optional[int]
+    price: Optional[int]
+    last_px: Optional[int]
+    transact_time: Optional[datetime]
+
+
+def _int_or_none(value):
+    return int(float(value)) if value else None
+
+
+def _ticks_or_none(ticks, isin, value):
+    return ticks.to_ticks(isin, value) if value else None
+
+
+def parse_transact_time(value):
+    """Parse TxnTm ('YYYYMMDD-HH:MM:SS[.fff]') without strptime, None if malformed."""
+    if not value or len(value) < 17 or value[8] != '-':
+        return None
+    try:
+        microsecond = int(value[18:24].ljust(6, '0')) if len(value) > 18 and value[17] == '.' else 0
+        return datetime(int(value[0:4]), int(value[4:6]), int(value[6:8]), int(value[9:11]), int(value[12:14]), int(value[15:17]), microsecond)
+    except ValueError:
+        return None
+
+
+def parse_execution_report(xml_data, ticks=TICKS):
+    """Return the ExecReport of an ExecRpt message, None if absent."""
+    exec_rpt = ET.fromstring(xml_data).find('ExecRpt')
+    if exec_rpt is None: return None
+    attrs = exec_rpt.attrib
+    instrument = exec_rpt.find('Instrmt')
+    instrument_attrs = instrument.attrib if instrument is not None else {}
+    order_qty = exec_rpt.find('.//OrdQty')
+    status_code = attrs.get('Stat', '')
+    isin = instrument_attrs.get('ID', '')
+    return ExecReport(
+        order_id=attrs.get('OrdID', ''),
+        client_id=attrs.get('ID', ''),
+        status=_STATUS_BY_CODE.get(status_code),
+        status_code=status_code,
+        side=_SIDE_BY_CODE.get(attrs.get('Side', '')),
+        symbol=instrument_attrs.get('Sym', 'N/A'),
+        isin=isin,
+        quantity=_int_or_none(order_qty.get('Qty')) if order_qty is not None else None,
+        leaves_qty=_int_or_none(attrs.get('LeavesQty')),
+        cum_qty=_int_or_none(attrs.get('CumQty')),
+        price=_ticks_or_none(ticks, isin, attrs.get('Px')),
+        last_px=_ticks_or_none(ticks, isin, attrs.get('LastPx')),
+        transact_time=parse_transact_time(attrs.get('TxnTm')),
+    )
+
+
+def _apply_quote(market_data, isin, entry_type, price_str, size_str, ticks):
+    quote = market_data.get(isin)
+    if quote is None: quote = market_data[isin] = {}
+    if price_str:
+        price = ticks.to_ticks(isin, price_str)
+        if entry_type == '0': quote['bid'] = price
+        elif entry_type == '1': quote['ask'] = price
+        elif entry_type == '2': quote['last_price'] = price
+    if size_str and entry_type == 'C':
+        quote['lop'] = int(float(size_str))
+
+
+def apply_market_data_tree(xml_data, market_data, ticks=TICKS):
+    """ElementTree version of apply_market_data, used for shapes the scanner does not handle."""
+    updated = set()
+    for inc_element in ET.fromstring(xml_data).findall('.//Inc'):
+        instrument = inc_element.find('Instrmt')
+        if instrument is not None:
+            isin = instrument.get('ID')
+            _apply_quote(market_data, isin, inc_element.get('Typ'), inc_element.get('Px'), inc_element.get('Sz'), ticks)
+            updated.add(isin)
+    return updated
+
+
+# Kanoniczny kształt <Inc> z NOL3: Typ, opcjonalnie Px i Sz w tej kolejności, inne atrybuty
+# po nich, a pierwszym dzieckiem <Instrmt ... ID="...">. Px/Sz w innym miejscu nie pasują.
+_INC_CANONICAL = re.compile(r'<Inc\s+Typ="([^"]*)"(?:\s+Px="([^"]*)")?(?:\s+Sz="([^"]*)")?(?:\s+(?!Px=|Sz=)[\w:]+="[^"]*")*\s*>\s*<Instrmt\s(?:[^>]*?\s)?ID="([^"]*)"')
+
+
+def _scan_market_data(xml_data):
+    """Return [(Typ, Px, Sz, ISIN), ...] or None if the message needs the full parser."""
+    if "'" in xml_data or '<![CDATA[' in xml_data:
+        return None
+    entries = _INC_CANONICAL.findall(xml_data)
+    # Każdy <Inc musi zostać rozpoznany, inaczej decyduje ElementTree.
+    if len(entries) != xml_data.count('<Inc'):
+        return None
+    return entries
+
+
+def market_data_entries(xml_data):
+    """Return [(Typ, Px, Sz, ISIN), ...] for every <Inc> of a MktDataInc message.
+
+    Only these fields are read, by one regex pass without building a tree;
+    messages of any other shape go through ElementTree. A missing Px or Sz
+    is '' on both paths.
+    """
+    entries = _scan_market_data(xml_data)
+    if entries is None:
+        entries = []
+        for inc_element in ET.fromstring(xml_data).findall('.//Inc'):
+            instrument = inc_element.find('Instrmt')
+            if instrument is not None:
+                entries.append((inc_element.get('Typ'), inc_element.get('Px', ''), inc_element.get('Sz', ''), instrument.get('ID')))
+    return entries
+
+
+# <Inc> w kanonicznym kształcie: Typ, opcjonalnie Px, Sz i Tm w tej kolejności, bez poziomu arkusza.
+_INC_FULL_CANONICAL = re.compile(r'<Inc\s+Typ="([^"]*)"(?:\s+Px="([^"]*)")?(?:\s+Sz="([^"]*)")?(?:\s+Tm="([^"]*)")?(?:\s+(?!Px=|Sz=|Tm=|MDPxLvl=|UpdtAct=)[\w:]+="[^"]*")*\s*>\s*<Instrmt\s(?:[^>]*?\s)?ID="([^"]*)"')
+# <Inc> z arkusza (MktDepth > 0) ma UpdtAct i MDPxLvl w dowolnej kolejności - atrybuty czytane po nazwie.
+_INC_ANY = re.compile(r'<Inc\s([^>]*?)/?>\s*<Instrmt\s(?:[^>]*?\s)?ID="([^"]*)"')
+_ATTRIBUTE = re.compile(r'([\w:]+)="([^"]*)"')
+
+
+def inc_entries(xml_data):
+    """Return [(UpdtAct, Typ, MDPxLvl, Px, Sz, Tm, ISIN), ...] for every <Inc>; missing values are None.
+
+    One parse of a MktDataInc message gives everything the client routes
+    from it: quotes, order book levels and trades. Canonical messages take a
+    single regex pass, attributes in any order a second one, and anything
+    else goes through ElementTree.
+    """
+    if "'" not in xml_data and '<![CDATA[' not in xml_data:
+        count = xml_data.count('<Inc')
+        # Arkusz nigdy nie pasuje do kształtu kanonicznego - od razu odczyt po nazwie.
+        matches = _INC_FULL_CANONICAL.findall(xml_data) if 'MDPxLvl=' not in xml_data else ()
+        if len(matches) == count:
+            return [(None, entry_type, None, px or None, sz or None, tm or None, isin) for entry_type, px, sz, tm, isin in matches]
+        matches = _INC_ANY.findall(xml_data)
+        if len(matches) == count:
+            entries = []
+            for attributes, isin in matches:
+                get = dict(_ATTRIBUTE.findall(attributes)).get
+                entries.append((get('UpdtAct'), get('Typ'), get('MDPxLvl'), get('Px'), get('Sz'), get('Tm'), isin))
+            return entries
+    entries = []
+    for inc_element in ET.fromstring(xml_data).findall('.//Inc'):
+        instrument = inc_element.find('Instrmt')
+        if instrument is not None:
+            get = inc_element.get
+            entries.append((get('UpdtAct'), get('Typ'), get('MDPxLvl'), get('Px'), get('Sz'), get('Tm'), instrument.get('ID')))
+    return entries
+
+
+def market_depth_entries(xml_data):
+    """Return [(UpdtAct, Typ, MDPxLvl, Px, Sz, ISIN), ...] for every <Inc>; missing values are None."""
+    return [(action, entry_type, level, px, sz, isin) for action, entry_type, level, px, sz, _, isin in inc_entries(xml_data)]
+
+
+def trade_entries(xml_data):
+    """Return [(Px, Sz, Tm, ISIN), ...] for the trade entries (Typ="2") of a MktDataInc message.
+
+    Tm is the exchange time of the trade ('HH:MM:SS'), None when absent.
+    """
+    return [(px, sz, tm, isin) for _, entry_type, _, px, sz, tm, isin in inc_entries(xml_data) if entry_type == '2']
+
+
+def apply_market_data(xml_data, market_data, ticks=TICKS):
+    """Apply a MktDataInc message to the per-ISIN quote dicts (prices in ticks), return updated ISINs."""
+    entries = _scan_market_data(xml_data)
+    if entries is None:
+        return apply_market_data_tree(xml_data, market_data, ticks)
+    updated = set()
+    for entry_type, price_str, size_str, isin in entries:
+        _apply_quote(market_data, isin, entry_type, price_str, size_str, ticks)
+        updated.add(isin)
+    return updated
+
+
+def _position_data(position):
+    instrument = position.find('Instrmt')
+    return {'symbol': instrument.get('Sym'), 'isin': instrument.get('ID'), 'quantity': int(position.get('Acc110')), 'blocked_quantity': position.get('Acc120')}
+
+
+def parse_portfolio(xml_data):
+    """Return {account: {'funds': {...}, 'positions': [...]}} for a Statement message."""
+    parsed_portfolio = {}
+    for statement in ET.fromstring(xml_data).findall('Statement'):
+        account_id = statement.get('Acct')
+        parsed_portfolio[account_id] = {'funds': {}, 'positions': []}
+        for fund in statement.findall('Fund'):
+            parsed_portfolio[account_id]['funds'][fund.get('name')] = fund.get('value')
+        for position in statement.findall('.//Position'):
+            parsed_portfolio[account_id]['positions'].append(_position_data(position))
+    return parsed_portfolio
+
+
+def parse_appl_msg_text(xml_data):
+    """Return the Txt attribute of an ApplMsgRpt message, None if absent."""
+    appl_msg = ET.fromstring(xml_data).find('ApplMsgRpt')
+    return appl_msg.get('Txt') if appl_msg is not None else None
@@ -0,0 +1,297 @@
+import math
+from collections import deque
+from typing import NamedTuple
+
+try:
+    import numpy as np
+except ImportError:  # backfill wymaga NumPy; aktualizacje strumieniowe działają bez niego
+    np = None
+
+
+def ema_array(values, alpha, initial):
+    """Vectorized y[i] = y[i-1] + alpha * (x[i] - y[i-1]) with y[-1] = ``initial``.
+
+    Within a block y[j] = w**(j+1) * (initial + alpha * cumsum(x[k] / w**(k+1))[j])
+    with w = 1 - alpha, so each block is a few array operations. Blocks are
+    as long as w**-block stays far from float overflow; the scaling cancels,
+    so precision is that of the cumulative sum.
+    """
+    x = np.asarray(values, np.float64)
+    out = np.empty_like(x)
+    w = 1.0 - alpha
+    if w <= 0.0:
+        out[:] = x
+        return out
+    block = max(1, int(600 / -math.log(w)))
+    powers = w ** np.arange(1, min(block, len(x)) + 1, dtype=np.float64)
+    previous = initial
+    for start in range(0, len(x), block):
+        chunk = x[start:start + block]
+        scale = powers[:len(chunk)]
+        out[start:start + len(chunk)] = scale * (previous + alpha * np.cumsum(chunk / scale))
+        previous = out[start + len(chunk) - 1]
+    return out
+
+
+def _nan(count):
+    return np.full(count, np.nan)
+
+
+class SMA:
+    """Simple moving average over the last ``period`` values with a running sum."""
+
+    __slots__ = ('period', 'value', '_window', '_sum')
+
+    def __init__(self, period):
+        self.period = period
+        self.value = None
+        self._window = deque(maxlen=period)
+        self._sum = 0.0
+
+    def update(self, x):
+        """Add one value, return the average (None until ``period`` values were seen)."""
+        window = self._window
+        if len(window) == self.period:
+            self._sum -= window[0]
+        window.append(x)
+        self._sum += x
+        if len(window) == self.period:
+            self.value = self._sum / self.period
+        return self.value
+
+    def peek(self, x):
+        """The average if ``x`` were added now, without adding it."""
+        window = self._window
+        if len(window) == self.period:
+            return (self._sum - window[0] + x) / self.period
+        return (self._sum + x) / self.period if len(window) == self.period - 1 else None
+
+    def backfill(self, values):
+        """Reset to the state after ``values``; return the averages as an array (NaN while warming up)."""
+        x = np.asarray(values, np.float64)
+        out = _nan(len(x))
+        if len(x) >= self.period:
+            cumulative = np.concatenate(([0.0], np.cumsum(x)))
+            out[self.period - 1:] = (cumulative[self.period:] - cumulative[:-self.period]) / self.period
+        self._window = deque(x[-self.period:].tolist(), maxlen=self.period)
+        self._sum = math.fsum(self._window)
+        self.value = float(out[-1]) if len(x) >= self.period else None
+        return out
+
+
+class EMA:
+    """Exponential moving average, alpha = 2 / (period + 1), seeded with the SMA of the first ``period`` values."""
+
+    __slots__ = ('period', 'alpha', 'value', '_count', '_sum')
+
+    def __init__(self, period, alpha=None):
+        self.period = period
+        self.alpha = 2.0 / (period + 1) if alpha is None else alpha
+        self.value = None
+        self._count = 0
+        self._sum = 0.0
+
+    def update(self, x):
+        if self.value is not None:
+            self.value += self.alpha * (x - self.value)
+            return self.value
+        self._count += 1
+        self._sum += x
+        if self._count == self.period:
+            self.value = self._sum / self.period
+        return self.value
+
+    def peek(self, x):
+        if self.value is not None:
+            return self.value + self.alpha * (x - self.value)
+        return (self._sum + x) / self.period if self._count == self.period - 1 else None
+
+    def backfill(self, values):
+        x = np.asarray(values, np.float64)
+        period = self.period
+        out = _nan(len(x))
+        if len(x) < period:
+            self._count, self._sum, self.value = len(x), float(x.sum()), None
+            return out
+        seed = float(x[:period].mean())
+        out[period - 1] = seed
+        out[period:] = ema_array(x[period:], self.alpha, seed)
+        self._count, self._sum, self.value = period, 0.0, float(out[-1])
+        return out
+
+
+def _rsi(gain, loss):
+    if loss == 0.0:
+        return 100.0 if gain > 0.0 else 50.0
+    return 100.0 - 100.0 / (1.0 + gain / loss)
+
+
+class RSI:
+    """Relative strength index with Wilder smoothing (alpha = 1 / period).
+
+    The first value comes after ``period`` changes, from their plain
+    average gain and loss; later ones smooth each new change in.
+    """
+
+    __slots__ = ('period', 'value', '_previous', '_gain', '_loss', '_count')
+
+    def __init__(self, period=14):
+        self.period = period
+        self.value = None
+        self._previous = None
+        self._gain = 0.0
+        self._loss = 0.0
+        self._count = 0
+
+    def update(self, x):
+        previous, self._previous = self._previous, x
+        if previous is None:
+            return None
+        change = x - previous
+        gain, loss = (change, 0.0) if change > 0 else (0.0, -change)
+        period = self.period
+        if self._count < period:
+            self._count += 1
+            self._gain += gain
+            self._loss += loss
+            if self._count < period:
+                return None
+            self._gain /= period
+            self._loss /= period
+        else:
+            self._gain += (gain - self._gain) / period
+            self._loss += (loss - self._loss) / period
+        self.value = _rsi(self._gain, self._loss)
+        return self.value
+
+    def peek(self, x):
+        if self._previous is None or self._count < self.period - 1:
+            return None
+        change = x - self._previous
+        gain, loss = (change, 0.0) if change > 0 else (0.0, -change)
+        period = self.period
+        if self._count < period:
+            return _rsi((self._gain + gain) / period, (self._loss + loss) / period)
+        return _rsi(self._gain + (gain - self._gain) / period, self._loss + (loss - self._loss) / period)
+
+    def backfill(self, values):
+        x = np.asarray(values, np.float64)
+        period = self.period
+        out = _nan(len(x))
+        self._previous = float(x[-1]) if len(x) else None
+        changes = np.diff(x)
+        gains = np.maximum(changes, 0.0)
+        losses = np.maximum(-changes, 0.0)
+        if len(changes) < period:
+            self._count, self._gain, self._loss, self.value = len(changes), float(gains.sum()), float(losses.sum()), None
+            return out
+        gain = ema_array(gains[period:], 1.0 / period, gains[:period].mean())
+        loss = ema_array(losses[period:], 1.0 / period, losses[:period].mean())
+        gain = np.concatenate(([gains[:period].mean()], gain))
+        loss = np.concatenate(([losses[:period].mean()], loss))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = 100.0 - 100.0 / (1.0 + gain / loss)
+        rsi[loss == 0.0] = np.where(gain[loss == 0.0] > 0.0, 100.0, 50.0)
+        out[period:] = rsi
+        self._count, self._gain, self._loss = period, float(gain[-1]), float(loss[-1])
+        self.value = float(out[-1])
+        return out
+
+
+class MACDValue(NamedTuple):
+    macd: float
+    signal: float      # None do rozgrzania linii sygnału
+    histogram: float   # macd - signal, None razem z signal
+
+
+class MACD:
+    """MACD line (fast EMA - slow EMA), its signal EMA and the histogram."""
+
+    __slots__ = ('fast', 'slow', 'signal', 'value')
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.signal = EMA(signal)
+        self.value = None
+
+    def update(self, x):
+        fast, slow = self.fast.update(x), self.slow.update(x)
+        if slow is None or fast is None:
+            return None
+        line = fast - slow
+        signal = self.signal.update(line)
+        self.value = MACDValue(line, signal, None if signal is None else line - signal)
+        return self.value
+
+    def peek(self, x):
+        fast, slow = self.fast.peek(x), self.slow.peek(x)
+        if slow is None or fast is None:
+            return None
+        line = fast - slow
+        signal = self.signal.peek(line)
+        return MACDValue(line, signal, None if signal is None else line - signal)
+
+    def backfill(self, values):
+        """Reset to the state after ``values``; return MACDValue of arrays (NaN while warming up)."""
+        line = self.fast.backfill(values) - self.slow.backfill(values)
+        ready = np.flatnonzero(~np.isnan(line))
+        signal = _nan(len(line))
+        # Linia sygnału liczona od pierwszej wartości MACD, jak przy aktualizacjach.
+        start = ready[0] if len(ready) else len(line)
+        signal[start:] = self.signal.backfill(line[start:])
+        self.value = None
+        if len(ready) and ready[-1] == len(line) - 1:
+            last = self.signal.value
+            self.value = MACDValue(float(line[-1]), last, None if last is None else float(line[-1]) - last)
+        return MACDValue(line, signal, line - signal)
+
+
+# Nazwy wskaźników jak w zakładce wykresów -> konstruktor z domyślnymi parametrami.
+INDICATORS = {'SMA': lambda: SMA(20), 'EMA': lambda: EMA(20), 'RSI': RSI, 'MACD': MACD}
+
+
+class IndicatorSet:
+    """Named indicators fed with the same values, e.g. the closes of one bar series.
+
+    ``backfill`` computes every indicator over a history at once and leaves
+    each in the state streaming would have reached, so ``update`` then
+    continues with new values in O(1). ``peek`` gives the values for a bar
+    still forming without changing any state.
+    """
+
+    def __init__(self, **indicators):
+        self.indicators = indicators
+
+    @classmethod
+    def default(cls, sma=20, ema=20, rsi=14, macd=(12, 26, 9)):
+        return cls(SMA=SMA(sma), EMA=EMA(ema), RSI=RSI(rsi), MACD=MACD(*macd))
+
+    def __getitem__(self, name):
+        return self.indicators[name]
+
+    def __contains__(self, name):
+        return name in self.indicators
+
+    def update(self, x):
+        return {name: indicator.update(x) for name, indicator in self.indicators.items()}
+
+    def peek(self, x):
+        return {name: indicator.peek(x) for name, indicator in self.indicators.items()}
+
+    def values(self):
+        return {name: indicator.value for name, indicator in self.indicators.items()}
+
+    def backfill(self, values):
+        return {name: indicator.backfill(values) for name, indicator in self.indicators.items()}
+
+
+def format_values(values, digits=2):
+    """One-line text of indicator values, e.g. 'SMA=2501.20 MACD=1.20/0.80/0.40'; '-' while warming up."""
+    def text(value):
+        if isinstance(value, MACDValue):
+            return '/'.join(text(part) for part in value)
+        if value is None or value != value:
+            return '-'
+        return f"{value:.{digits}f}"
+    return ' '.join(f"{name}={text(value)}" for name, value in values.items())
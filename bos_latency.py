@@ -0,0 +1,148 @@
+import threading
+import time
+from collections import OrderedDict
+
+# Etapy ścieżki tick-to-trade, w kolejności występowania. 'wake' stemplują tylko
+# decyzje z pętli odpytującej (trailing stop): czas od ticka do wybudzenia to
+# oczekiwanie na odpytanie, a nie opóźnienie wewnętrzne.
+STAGES = ('recv', 'parsed', 'wake', 'decision', 'built', 'sent', 'ack')
+RECV, PARSED, WAKE, DECISION, BUILT, SENT, ACK = range(len(STAGES))
+
+# Odcinki, dla których prowadzone są histogramy: nazwa -> (etap początkowy, etap końcowy).
+# Odcinki obejmujące parsed>wake nie zawierają oczekiwania na odpytanie - ma ono własny histogram.
+SPANS = {
+    'recv>parsed': (RECV, PARSED),
+    'poll_wait': (PARSED, WAKE),
+    'parsed>decision': (PARSED, DECISION),
+    'decision>built': (DECISION, BUILT),
+    'built>sent': (BUILT, SENT),
+    'sent>ack': (SENT, ACK),
+    'tick_to_trade': (RECV, SENT),
+    'tick_to_ack': (RECV, ACK),
+}
+
+
+def span_ns(record, start, end):
+    """Duration between two stamped stages of a record in ns, None if either is missing.
+
+    A span reaching past 'wake' excludes the parsed>wake polling wait.
+    """
+    if not record[start] or not record[end]:
+        return None
+    duration = record[end] - record[start]
+    if record[WAKE] and record[PARSED] and start <= PARSED and end > WAKE:
+        duration -= record[WAKE] - record[PARSED]
+    return duration
+
+
+def span_us(record, start, end):
+    """Like span_ns, in µs."""
+    duration = span_ns(record, start, end)
+    return None if duration is None else duration / 1000
+
+
+class LatencyHistogram:
+    """Log2 histogram of nanosecond durations; bucket i counts [2**(i-1), 2**i) µs."""
+
+    __slots__ = ('counts', 'count', 'total_ns', 'max_ns')
+    BUCKETS = 32
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, duration_ns):
+        if duration_ns < 0:
+            duration_ns = 0
+        self.counts[min((duration_ns // 1000).bit_length(), self.BUCKETS - 1)] += 1
+        self.count += 1
+        self.total_ns += duration_ns
+        if duration_ns > self.max_ns:
+            self.max_ns = duration_ns
+
+    def percentile_us(self, percent):
+        """Upper bound in µs of the bucket holding the given percentile, capped at the max."""
+        if not self.count:
+            return None
+        target = percent / 100 * self.count
+        cumulative = 0
+        for bucket, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return min(1 << bucket, round(self.max_ns / 1000, 1))
+        return round(self.max_ns / 1000, 1)
+
+    def snapshot(self):
+        if not self.count:
+            return {'count': 0}
+        buckets = {f'<{1 << i}us': count for i, count in enumerate(self.counts) if count}
+        return {'count': self.count, 'mean_us': round(self.total_ns / self.count / 1000, 1), 'p50_us': self.percentile_us(50), 'p99_us': self.percentile_us(99), 'max_us': round(self.max_ns / 1000, 1), 'buckets': buckets}
+
+
+class LatencyTracker:
+    """Per-order perf_counter_ns stamps for each stage of the tick-to-trade path.
+
+    An order's record is a plain list indexed by stage, opened when its FIXML
+    is built (carrying the stamps of the tick and decision that caused it),
+    stamped on send and closed by the first ExecRpt for its client ID. Closed
+    records feed one histogram per span; at most ``max_open`` records are kept
+    for orders that never get an ack.
+    """
+
+    def __init__(self, max_open=1024):
+        self.max_open = max_open
+        self.histograms = {name: LatencyHistogram() for name in SPANS}
+        self.completed = 0
+        self.last = None
+        self._open = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, order_id, trigger=None):
+        """Open a record stamped 'built' now; trigger holds earlier (recv, parsed, wake, decision) stamps."""
+        record = [0] * len(STAGES)
+        if trigger:
+            record[:len(trigger)] = trigger
+        record[BUILT] = time.perf_counter_ns()
+        with self._lock:
+            self._open[order_id] = record
+            if len(self._open) > self.max_open:
+                self._open.popitem(last=False)
+
+    def stamp(self, order_id, stage):
+        record = self._open.get(order_id)
+        if record is not None and not record[stage]:
+            record[stage] = time.perf_counter_ns()
+
+    def ack(self, order_id):
+        """Close the record of an acknowledged order, return it or None if not tracked."""
+        now = time.perf_counter_ns()
+        with self._lock:
+            record = self._open.pop(order_id, None)
+            if record is None:
+                return None
+            record[ACK] = now
+            for name, (start, end) in SPANS.items():
+                duration = span_ns(record, start, end)
+                if duration is not None:
+                    self.histograms[name].record(duration)
+            self.completed += 1
+            self.last = record
+        return record
+
+    def report(self):
+        with self._lock:
+            return {name: histogram.snapshot() for name, histogram in self.histograms.items()}
+
+    def format_report(self, width=30):
+        """Text histograms of every span that has samples."""
+        lines = []
+        for name, snapshot in self.report().items():
+            if not snapshot['count']:
+                continue
+            lines.append(f"{name}: n={snapshot['count']} śr={snapshot['mean_us']}µs p50≤{snapshot['p50_us']}µs p99≤{snapshot['p99_us']}µs max={snapshot['max_us']}µs")
+            peak = max(snapshot['buckets'].values())
+            for bucket, count in snapshot['buckets'].items():
+                lines.append(f"  {bucket:>12} {'#' * max(1, count * width // peak)} {count}")
+        return "\n".join(lines) if lines else "brak pomiarów"
@@ -0,0 +1,126 @@
+import threading
+import time
+
+from bos_fixml import message_type
+from bos_transport import decode_frame
+
+
+class RingBuffer:
+    """Bounded FIFO over a preallocated list of slots, safe across threads.
+
+    ``put`` blocks while the buffer is full, which pushes back on the socket
+    reader instead of dropping frames. Depth, high-water mark and the number
+    of times a producer had to wait are kept as metrics.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._slots = [None] * capacity
+        self._head = 0
+        self._size = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.high_water = 0
+        self.total = 0
+        self.full_waits = 0
+
+    def __len__(self):
+        return self._size
+
+    def put(self, item):
+        with self._cond:
+            if self._size == self.capacity:
+                self.full_waits += 1
+                while self._size == self.capacity and not self._closed:
+                    self._cond.wait()
+            if self._closed:
+                return False
+            self._slots[(self._head + self._size) % self.capacity] = item
+            self._size += 1
+            self.total += 1
+            if self._size > self.high_water:
+                self.high_water = self._size
+            self._cond.notify_all()
+            return True
+
+    def get(self):
+        """Return the oldest item; None once the buffer is closed and drained."""
+        with self._cond:
+            while self._size == 0:
+                if self._closed:
+                    return None
+                self._cond.wait()
+            item = self._slots[self._head]
+            self._slots[self._head] = None
+            self._head = (self._head + 1) % self.capacity
+            self._size -= 1
+            self._cond.notify_all()
+            return item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {'depth': self._size, 'high_water': self.high_water, 'capacity': self.capacity, 'total': self.total, 'full_waits': self.full_waits}
+
+
+# Typ komunikatu -> tor; wszystko inne trafia do 'other'.
+LANE_BY_TYPE = {'ExecRpt': 'exec', 'MktDataInc': 'market'}
+
+
+class AsyncMessagePipeline:
+    """Hands raw async-channel frames from the socket reader to parser threads.
+
+    The reader only frames bytes and calls ``feed``; each lane has its own
+    ring buffer and worker thread, so execution reports are never queued
+    behind market data or a slow Statement parse. Each frame is classified
+    once by its first tag and the handler is called as
+    ``handler(message, message_type, received_ns)``, with the perf_counter_ns
+    receive stamp.
+    """
+
+    LANES = ('exec', 'market', 'other')
+
+    def __init__(self, handler, on_error=None, capacity=4096, lane_by_type=LANE_BY_TYPE):
+        self.handler = handler
+        self.on_error = on_error
+        self.lane_by_type = lane_by_type
+        self.lanes = {lane: RingBuffer(capacity) for lane in self.LANES}
+        self._workers = []
+
+    def start(self):
+        for lane, ring in self.lanes.items():
+            worker = threading.Thread(target=self._work, args=(ring,), name=f"async-{lane}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def feed(self, frame, received_ns=None):
+        """Queue one frame (bytes, not a view into the reader's buffer)."""
+        if received_ns is None:
+            received_ns = time.perf_counter_ns()
+        frame_type = message_type(frame)
+        return self.lanes[self.lane_by_type.get(frame_type, 'other')].put((frame, frame_type, received_ns))
+
+    def close(self, timeout=1.0):
+        for ring in self.lanes.values():
+            ring.close()
+        for worker in self._workers:
+            worker.join(timeout)
+
+    def stats(self):
+        return {lane: ring.stats() for lane, ring in self.lanes.items()}
+
+    def _work(self, ring):
+        while True:
+            item = ring.get()
+            if item is None:
+                return
+            frame, frame_type, received_ns = item
+            try:
+                self.handler(decode_frame(frame), frame_type, received_ns)
+            except Exception as e:
+                if self.on_error:
+                    self.on_error(e)
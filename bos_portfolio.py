@@ -0,0 +1,75 @@
+import threading
+
+import bos_fixml
+
+_MISSING = object()
+
+
+def _diff(previous, current):
+    """Entries of ``current`` that are new or differ from ``previous``; removed keys map to None."""
+    changed = {key: value for key, value in current.items() if previous.get(key, _MISSING) != value}
+    for key in previous.keys() - current.keys():
+        changed[key] = None
+    return changed
+
+
+class PortfolioState:
+    """Last known funds and positions per account, diffed against each Statement.
+
+    ``apply`` takes a portfolio as ``bos_fixml.parse_portfolio`` returns it
+    and returns only what changed::
+
+        {account: {'funds': {name: value | None}, 'positions': {isin: position | None}}}
+
+    None marks a fund or position that disappeared; an account missing from
+    the Statement maps to None itself. An unchanged Statement yields ``{}``.
+    """
+
+    def __init__(self):
+        self.accounts = {}
+        self.statements = 0
+        self.unchanged = 0
+        self._last_statement = None
+        self._lock = threading.Lock()
+
+    def apply_statement(self, xml_data):
+        """Parse and apply a Statement push; return (portfolio, changes), or (None, {}) for a repeat.
+
+        NOL3 resends identical Statements, so a message equal to the previous
+        one is counted and dropped without being parsed.
+        """
+        with self._lock:
+            if xml_data == self._last_statement:
+                self.statements += 1
+                self.unchanged += 1
+                return None, {}
+            self._last_statement = xml_data
+        portfolio = bos_fixml.parse_portfolio(xml_data)
+        return portfolio, self.apply(portfolio)
+
+    def apply(self, portfolio):
+        changes = {}
+        with self._lock:
+            self.statements += 1
+            for account, data in portfolio.items():
+                funds = data['funds']
+                positions = {position['isin']: position for position in data['positions']}
+                previous = self.accounts.get(account)
+                if previous is None:
+                    changes[account] = {'funds': dict(funds), 'positions': dict(positions)}
+                else:
+                    fund_changes = _diff(previous['funds'], funds)
+                    position_changes = _diff(previous['positions'], positions)
+                    if fund_changes or position_changes:
+                        changes[account] = {'funds': fund_changes, 'positions': position_changes}
+                self.accounts[account] = {'funds': funds, 'positions': positions}
+            for account in self.accounts.keys() - portfolio.keys():
+                del self.accounts[account]
+                changes[account] = None
+            if not changes:
+                self.unchanged += 1
+        return changes
+
+    def stats(self):
+        with self._lock:
+            return {'statements': self.statements, 'unchanged': self.unchanged, 'accounts': len(self.accounts)}
@@ -0,0 +1,103 @@
+# Liczba miejsc po przecinku w Px wysyłanym do NOL3 (wcześniej f"{price:.2f}").
+PRICE_DECIMALS = 2
+
+
+def parse_units(text, decimals):
+    """Parse a decimal string into an integer count of 10**-decimals, without float.
+
+    Digits beyond ``decimals`` are rounded half away from zero.
+    """
+    text = text.strip()
+    negative = text[:1] == '-'
+    if text[:1] in '+-':
+        text = text[1:]
+    whole, _, frac = text.partition('.')
+    if not whole.isdigit() and not (whole == '' and frac):
+        raise ValueError(f"Niepoprawna cena: {text!r}")
+    units = int(whole or '0') * 10 ** decimals
+    if frac:
+        if not frac.isdigit():
+            raise ValueError(f"Niepoprawna cena: {text!r}")
+        if len(frac) > decimals:
+            units += int(frac[:decimals] or '0') + (frac[decimals] >= '5')
+        else:
+            units += int(frac) * 10 ** (decimals - len(frac))
+    return -units if negative else units
+
+
+class TickSize:
+    """Price grid of one instrument: converts between price strings and integer ticks.
+
+    A price is held as an int number of ticks; the tick itself is an int
+    number of 10**-decimals units, so conversions are pure integer work.
+    """
+
+    __slots__ = ('tick', 'decimals', 'scale', 'units')
+
+    def __init__(self, tick='0.01', decimals=PRICE_DECIMALS):
+        self.tick = tick
+        self.decimals = max(decimals, len(tick.partition('.')[2].rstrip('0')))
+        self.scale = 10 ** self.decimals
+        self.units = parse_units(tick, self.decimals)
+        if self.units <= 0:
+            raise ValueError(f"Niepoprawny krok notowań: {tick!r}")
+
+    def to_ticks(self, text):
+        """'2500.00' -> ticks; prices off the grid are rounded to the nearest tick."""
+        whole, _, frac = text.partition('.')
+        # Typowa cena z NOL3 ma dokładnie `decimals` cyfr po kropce - jedno int().
+        if len(frac) == self.decimals and whole.isdigit() and frac.isdigit():
+            units = int(whole + frac)
+        else:
+            units = parse_units(text, self.decimals)
+        if self.units == 1:
+            return units
+        ticks, rest = divmod(units, self.units)
+        if 2 * rest >= self.units:
+            ticks += 1
+        return ticks
+
+    def to_units(self, text):
+        """'1.25' -> count of 10**-decimals, for amounts that need not lie on the grid."""
+        return parse_units(text, self.decimals)
+
+    def format(self, ticks):
+        """Ticks -> price string with ``decimals`` places, e.g. for FIXML Px."""
+        return self.format_units(ticks * self.units)
+
+    def format_units(self, units):
+        """10**-decimals units -> string with ``decimals`` places."""
+        whole, frac = divmod(abs(units), self.scale)
+        sign = '-' if units < 0 else ''
+        return f"{sign}{whole}.{frac:0{self.decimals}d}" if self.decimals else f"{sign}{whole}"
+
+    def to_float(self, ticks):
+        """For display and statistics only; never used on the order path."""
+        return ticks * self.units / self.scale
+
+    def __repr__(self):
+        return f"TickSize({self.tick!r})"
+
+
+class TickTable:
+    """Tick sizes per ISIN, with a default for instruments not listed."""
+
+    def __init__(self, sizes=None, default='0.01'):
+        self.default = TickSize(default)
+        self._sizes = {isin: TickSize(tick) for isin, tick in (sizes or {}).items()}
+
+    def set(self, isin, tick):
+        self._sizes[isin] = TickSize(tick)
+
+    def get(self, isin):
+        return self._sizes.get(isin, self.default)
+
+    def to_ticks(self, isin, text):
+        return self._sizes.get(isin, self.default).to_ticks(text)
+
+    def format(self, isin, ticks):
+        return self._sizes.get(isin, self.default).format(ticks)
+
+
+# Tabela używana przez parsery i budowniczych FIXML, gdy nie podano własnej.
+TICKS = TickTable()
@@ -0,0 +1,250 @@
+import sys
+import threading
+import time
+from array import array
+from typing import NamedTuple
+
+from bos_fixml import inc_entries
+from bos_price import TICKS
+
+# Pola notowań: ceny w tickach i wielkości, wszystkie jako int64 (MISSING = brak).
+PRICE_FIELDS = ('bid', 'ask', 'last_price')
+SIZE_FIELDS = ('bid_size', 'ask_size', 'last_size', 'lop')
+FIELDS = PRICE_FIELDS + SIZE_FIELDS
+
+# Typ wpisu MktDataInc -> (pole ceny, pole wielkości).
+_ENTRY_FIELDS = {'0': ('bid', 'bid_size'), '1': ('ask', 'ask_size'), '2': ('last_price', 'last_size'), 'C': (None, 'lop')}
+
+MISSING = -(1 << 63)
+
+
+def _read(column, slot):
+    value = column[slot]
+    return None if value == MISSING else value
+
+
+class QuoteSnapshot(NamedTuple):
+    """Point-in-time copy of a QuoteStore: slot-indexed arrays plus the ISIN <-> slot maps."""
+    isins: tuple
+    slots: dict
+    columns: dict
+
+    def get(self, isin, field, default=None):
+        slot = self.slots.get(isin)
+        if slot is None: return default
+        value = _read(self.columns[field], slot)
+        return default if value is None else value
+
+    def quote(self, isin):
+        slot = self.slots.get(isin)
+        if slot is None: return None
+        return _quote_dict(isin, self.columns, slot)
+
+
+def _quote_dict(isin, columns, slot):
+    quote = {'isin': isin}
+    for field in FIELDS:
+        value = _read(columns[field], slot)
+        if value is not None:
+            quote[field] = value
+    return quote
+
+
+class QuoteStore:
+    """Latest quotes for every subscribed instrument in preallocated typed arrays.
+
+    Each ISIN (interned) gets an integer slot on first sight; every field is
+    an int64 ``array`` column indexed by slot, so reads are one dict lookup
+    and one index, and memory per instrument is a fixed number of bytes.
+    Prices are integer ticks from ``ticks``. Columns grow by doubling.
+    ``seq[slot]`` counts updates of an instrument. Writes come from the market
+    data thread; slot allocation is locked so readers on other threads never
+    see a half-grown store.
+    """
+
+    def __init__(self, capacity=64, ticks=TICKS, history=None, clock=time.time_ns):
+        self.capacity = capacity
+        self.ticks = ticks
+        self.history = history
+        self.clock = clock  # źródło znaczników historii (ns); w odtwarzaniu czas sesji
+        self.isins = []
+        self._slots = {}
+        self._lock = threading.Lock()
+        self.columns = {field: array('q', [MISSING]) * capacity for field in FIELDS}
+        self.seq = array('Q', [0]) * capacity
+
+    def __len__(self):
+        return len(self.isins)
+
+    def __contains__(self, isin):
+        return isin in self._slots
+
+    def slot(self, isin):
+        """Return the slot of an instrument, allocating one if needed."""
+        slot = self._slots.get(isin)
+        if slot is not None:
+            return slot
+        with self._lock:
+            slot = self._slots.get(isin)
+            if slot is None:
+                slot = len(self.isins)
+                if slot == self.capacity:
+                    self._grow()
+                isin = sys.intern(isin)
+                self.isins.append(isin)
+                self._slots[isin] = slot
+            return slot
+
+    def slot_of(self, isin):
+        """Slot of a known instrument, None if it has never been quoted."""
+        return self._slots.get(isin)
+
+    def _grow(self):
+        for column in self.columns.values():
+            column.extend(array('q', [MISSING]) * self.capacity)
+        self.seq.extend(array('Q', [0]) * self.capacity)
+        self.capacity *= 2
+
+    def get(self, isin, field, default=None):
+        """O(1) read of one field, e.g. get(isin, 'ask'); default when missing."""
+        slot = self._slots.get(isin)
+        if slot is None: return default
+        value = _read(self.columns[field], slot)
+        return default if value is None else value
+
+    def quote(self, isin):
+        """Dict of the present fields of one instrument (plus 'isin'), None if unknown."""
+        slot = self._slots.get(isin)
+        if slot is None: return None
+        return _quote_dict(isin, self.columns, slot)
+
+    def quote_text(self, isin):
+        """Like quote(), with prices formatted as strings for display."""
+        quote = self.quote(isin)
+        if quote is None: return None
+        tick = self.ticks.get(isin)
+        for field in PRICE_FIELDS:
+            if field in quote:
+                quote[field] = tick.format(quote[field])
+        return quote
+
+    def apply_entry(self, entry_type, price_str, size_str, isin, timestamp_ns=None):
+        """Apply one <Inc> (Typ, Px, Sz, ISIN), return the instrument's slot."""
+        slot = self.slot(isin)
+        price_field, size_field = _ENTRY_FIELDS.get(entry_type, (None, None))
+        size = int(float(size_str)) if size_str else 0
+        if price_field and price_str:
+            price = self.columns[price_field][slot] = self.ticks.to_ticks(isin, price_str)
+            if self.history is not None:
+                self.history.record(isin, timestamp_ns or self.clock(), entry_type, price, size)
+        if size_field and size_str:
+            self.columns[size_field][slot] = size
+        self.seq[slot] += 1
+        return slot
+
+    def update(self, isin, fields):
+        """Set several fields of one instrument at once (None clears a field), return its slot."""
+        slot = self.slot(isin)
+        columns = self.columns
+        for field, value in fields.items():
+            columns[field][slot] = MISSING if value is None else value
+        self.seq[slot] += 1
+        return slot
+
+    def apply_market_data(self, xml_data):
+        """Apply a MktDataInc message, return the set of updated ISINs."""
+        return self.apply_entries(inc_entries(xml_data))
+
+    def apply_entries(self, entries):
+        """Apply the parsed <Inc> entries of one message (see bos_fixml.inc_entries), return updated ISINs.
+
+        With a ``history`` every priced entry (bid, ask, trade) is also
+        appended to the instrument's tick ring, stamped with one ``clock()``
+        time per message.
+        """
+        # apply_entry rozwinięte w pętli - to najgorętsza ścieżka klienta.
+        updated = set()
+        slots, columns, seq, ticks, history = self._slots, self.columns, self.seq, self.ticks, self.history
+        now = self.clock() if history is not None else 0
+        for _, entry_type, _, price_str, size_str, _, isin in entries:
+            slot = slots.get(isin)
+            if slot is None: slot = self.slot(isin)
+            price_field, size_field = _ENTRY_FIELDS.get(entry_type, (None, None))
+            if price_field and price_str:
+                price = columns[price_field][slot] = ticks.to_ticks(isin, price_str)
+                if history is not None:
+                    history.record(isin, now, entry_type, price, int(float(size_str)) if size_str else 0)
+            if size_field and size_str:
+                columns[size_field][slot] = int(float(size_str))
+            seq[slot] += 1
+            updated.add(isin)
+        return updated
+
+    def snapshot(self):
+        """Copy of all columns (one memcpy each) for whole-universe reads."""
+        with self._lock:
+            count = len(self.isins)
+            return QuoteSnapshot(tuple(self.isins), dict(self._slots), {field: column[:count] for field, column in self.columns.items()})
+
+    def nbytes(self):
+        """Bytes held by the columns, for memory checks."""
+        return sum(column.itemsize * len(column) for column in self.columns.values()) + self.seq.itemsize * len(self.seq)
+
+
+class QuoteConflator:
+    """Forwards the latest quote of each updated instrument at most ``rate_hz`` times a second.
+
+    The market data thread calls ``mark`` for every tick (the store itself is
+    always current, so the trade manager sees every update); a timer thread
+    publishes one formatted snapshot per dirty ISIN. Ticks folded into a
+    pending snapshot are counted as conflated.
+    """
+
+    def __init__(self, store, publish, rate_hz=10.0):
+        self.store = store
+        self.publish = publish
+        self.interval = 1.0 / rate_hz
+        self.received = 0
+        self.published = 0
+        self.conflated = 0
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def mark(self, isins):
+        with self._lock:
+            for isin in isins:
+                self.received += 1
+                if isin in self._dirty:
+                    self.conflated += 1
+                else:
+                    self._dirty.add(isin)
+
+    def flush(self):
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            self.published += len(dirty)
+        for isin in dirty:
+            self.publish(self.store.quote_text(isin))
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="quote-conflator", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {'received': self.received, 'published': self.published, 'conflated': self.conflated, 'pending': len(self._dirty)}
@@ -0,0 +1,219 @@
+import bisect
+import queue
+import struct
+import threading
+import time
+from typing import NamedTuple
+
+# Kierunek ramki w zapisie sesji.
+ASYNC_IN, SYNC_OUT, SYNC_IN = 0, 1, 2
+DIRECTIONS = {ASYNC_IN: 'async<', SYNC_OUT: 'sync>', SYNC_IN: 'sync<'}
+
+FILE_MAGIC = b'BOSFEED1'
+INDEX_MAGIC = b'BOSIDX01'
+# Nagłówek rekordu: znacznik czasu (ns od epoki), kierunek, długość treści ramki.
+RECORD_HEADER = struct.Struct('<qBI')
+# Wpis indeksu: znacznik czasu pierwszego rekordu i jego pozycja w pliku zapisu.
+INDEX_ENTRY = struct.Struct('<qQ')
+
+
+class Record(NamedTuple):
+    timestamp_ns: int
+    direction: int
+    payload: bytes
+
+
+def index_path(path):
+    return f"{path}.idx"
+
+
+class FeedRecorder:
+    """Appends raw FIXML frames of a session to a binary capture file.
+
+    ``record`` only stamps the frame and puts it on an unbounded queue, so
+    socket readers never wait on disk; a writer thread drains whatever has
+    accumulated and writes it with one ``write`` per batch. Every record is
+    ``RECORD_HEADER`` (time.time_ns(), direction, length) followed by the
+    frame body as received or sent. Frames stamped on two threads (async
+    listener, sync channel) can be queued out of order and the wall clock
+    can step back, so the writer raises a stamp older than the previous
+    record's to that time (counted as ``reordered``): timestamps in the
+    file never decrease, as FeedReader's seek and ``end_ns`` rely on. At
+    most every ``index_interval`` seconds of capture time the writer
+    appends (timestamp, byte offset) of a record to the side index
+    ``<path>.idx``, which ``FeedReader.seek`` searches. With more than
+    ``max_pending`` records queued further frames are dropped and counted
+    rather than blocking the caller.
+    """
+
+    def __init__(self, path, index_interval=1.0, max_pending=1_000_000, batch_size=4096):
+        self.path = path
+        self.index_interval_ns = int(index_interval * 1_000_000_000)
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.records = 0
+        self.bytes = 0
+        self.batches = 0
+        self.max_batch = 0
+        self.dropped = 0
+        self.reordered = 0
+        self._queue = queue.SimpleQueue()
+        self._file = open(path, 'wb')
+        self._index = open(index_path(path), 'wb')
+        self._file.write(FILE_MAGIC)
+        self._index.write(INDEX_MAGIC)
+        self._offset = len(FILE_MAGIC)
+        self._next_index_ns = 0
+        self._last_ns = 0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._write_loop, name="feed-recorder", daemon=True)
+        self._thread.start()
+        return self
+
+    def record(self, direction, payload, timestamp_ns=None):
+        """Queue one frame body (bytes or memoryview of immutable bytes) for writing."""
+        if self._queue.qsize() >= self.max_pending:
+            self.dropped += 1
+            return
+        self._queue.put((time.time_ns() if timestamp_ns is None else timestamp_ns, direction, payload))
+
+    def close(self, timeout=5.0):
+        """Write everything queued so far, then close both files."""
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+            self._thread = None
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+                self._index.close()
+
+    def stats(self):
+        return {'records': self.records, 'bytes': self.bytes, 'batches': self.batches, 'max_batch': self.max_batch, 'pending': self._queue.qsize(), 'dropped': self.dropped, 'reordered': self.reordered}
+
+    def _write_loop(self):
+        get, get_nowait = self._queue.get, self._queue.get_nowait
+        pack = RECORD_HEADER.pack
+        while True:
+            item = get()
+            batch = bytearray()
+            index = bytearray()
+            count = 0
+            stop = False
+            offset = self._offset
+            last_ns = self._last_ns
+            while True:
+                if item is None:
+                    stop = True
+                    break
+                timestamp_ns, direction, payload = item
+                if timestamp_ns < last_ns:
+                    timestamp_ns = last_ns
+                    self.reordered += 1
+                last_ns = timestamp_ns
+                if timestamp_ns >= self._next_index_ns:
+                    index += INDEX_ENTRY.pack(timestamp_ns, offset + len(batch))
+                    self._next_index_ns = timestamp_ns + self.index_interval_ns
+                batch += pack(timestamp_ns, direction, len(payload))
+                batch += payload
+                count += 1
+                if count >= self.batch_size:
+                    break
+                try:
+                    item = get_nowait()
+                except queue.Empty:
+                    break
+            with self._lock:
+                if self._file.closed:
+                    return
+                if batch:
+                    self._file.write(batch)
+                    self._file.flush()
+                if index:
+                    self._index.write(index)
+                    self._index.flush()
+            self._offset = offset + len(batch)
+            self._last_ns = last_ns
+            self.records += count
+            self.bytes += len(batch)
+            if count:
+                self.batches += 1
+                self.max_batch = max(self.max_batch, count)
+            if stop:
+                return
+
+
+def read_index(path):
+    """Return ([timestamps], [offsets]) of a capture's side index, empty lists if missing."""
+    timestamps, offsets = [], []
+    try:
+        with open(index_path(path), 'rb') as f:
+            data = f.read()
+    except FileNotFoundError:
+        return timestamps, offsets
+    if not data.startswith(INDEX_MAGIC):
+        raise ValueError(f"Niepoprawny indeks zapisu: {index_path(path)}")
+    usable = len(data) - (len(data) - len(INDEX_MAGIC)) % INDEX_ENTRY.size
+    for timestamp_ns, offset in INDEX_ENTRY.iter_unpack(memoryview(data)[len(INDEX_MAGIC):usable]):
+        timestamps.append(timestamp_ns)
+        offsets.append(offset)
+    return timestamps, offsets
+
+
+class FeedReader:
+    """Sequential reader of a FeedRecorder capture, with time-based seek.
+
+    A record cut short at the end of the file (e.g. after a crash) ends the
+    iteration instead of raising.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        if self._file.read(len(FILE_MAGIC)) != FILE_MAGIC:
+            self._file.close()
+            raise ValueError(f"To nie jest plik zapisu sesji: {path}")
+        self._index = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._file.close()
+
+    def __iter__(self):
+        return self.records()
+
+    def records(self, start_ns=None, end_ns=None):
+        """Yield Records from the current position, or from ``start_ns`` up to ``end_ns``."""
+        if start_ns is not None:
+            self.seek(start_ns)
+        read = self._file.read
+        size = RECORD_HEADER.size
+        while True:
+            header = read(size)
+            if len(header) < size:
+                return
+            timestamp_ns, direction, length = RECORD_HEADER.unpack(header)
+            payload = read(length)
+            if len(payload) < length:
+                return
+            if start_ns is not None and timestamp_ns < start_ns:
+                continue
+            if end_ns is not None and timestamp_ns > end_ns:
+                return
+            yield Record(timestamp_ns, direction, payload)
+
+    def seek(self, timestamp_ns):
+        """Position at the last indexed record stamped at or before ``timestamp_ns``."""
+        if self._index is None:
+            self._index = read_index(self.path)
+        timestamps, offsets = self._index
+        i = bisect.bisect_right(timestamps, timestamp_ns) - 1
+        self._file.seek(offsets[i] if i >= 0 else len(FILE_MAGIC))
@@ -0,0 +1,240 @@
+import argparse
+import heapq
+import itertools
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+import bos_fixml
+from bos_bot import BossaAPIClient, BotState, DEFAULT_INSTRUMENT
+from bos_clock import ReplayClock, SYSTEM_CLOCK
+from bos_recorder import FeedReader, ASYNC_IN
+from bos_simulator import NOL3Simulator, SimulatedInstrument
+from bos_transport import encode_frame, decode_frame
+
+
+class ReplayExchange(NOL3Simulator):
+    """Simulator order handling matched against the replayed quotes.
+
+    Orders are acknowledged, cancelled and rejected exactly as by
+    NOL3Simulator; a resting order fills when the client's own quote store
+    shows an ask at or below a buy limit, or a bid at or above a sell limit.
+    Nothing is served on sockets.
+    """
+
+    def __init__(self, quotes, ticks, account='00-22-000000', clock=SYSTEM_CLOCK):
+        super().__init__(account=account, instruments={}, clock=clock)
+        self.quotes = quotes
+        self.ticks = ticks
+        self.fills = 0
+
+    def refresh(self, isins):
+        """Copy the current best prices of ``isins`` from the quote store."""
+        for isin in isins:
+            inst = self.instruments.get(isin)
+            if inst is None:
+                inst = self.instruments[isin] = SimulatedInstrument(isin, isin, 0.0, 0.0)
+            tick = self.ticks.get(isin)
+            bid, ask, last = (self.quotes.get(isin, field) for field in ('bid', 'ask', 'last_price'))
+            inst.bid = tick.to_float(bid) if bid is not None else float('-inf')
+            inst.ask = tick.to_float(ask) if ask is not None else float('inf')
+            if last is not None: inst.last = tick.to_float(last)
+
+    def match(self):
+        """Fill resting orders crossed by the current quotes; return the ExecRpt messages."""
+        with self._lock:
+            isins = {order['isin'] for order in self.orders.values()}
+        if not isins:
+            return []
+        self.refresh(isins)
+        reports = [decode_frame(memoryview(frame)[4:]) for frame in self._fill_orders()]
+        self.fills += len(reports)
+        return reports
+
+    def _new_order(self, message):
+        instrument = message.find('Instrmt')
+        if instrument is not None:
+            self.refresh((instrument.get('ID'),))
+        return super()._new_order(message)
+
+
+class ReplayChannel:
+    """Stand-in for PipelinedSyncChannel answering every request from a ReplayExchange."""
+
+    def __init__(self, exchange):
+        self.exchange = exchange
+        self.tap = None
+        self.requests = 0
+
+    def submit(self, message):
+        return self.submit_many([message])[0]
+
+    def submit_many(self, messages):
+        futures = []
+        for message in messages:
+            future = Future()
+            future.set_result(self.exchange.handle_request(decode_frame(memoryview(encode_frame(message))[4:])))
+            futures.append(future)
+        self.requests += len(messages)
+        return futures
+
+    def results(self, futures, timeout=None):
+        return [future.result(timeout) for future in futures]
+
+    def stats(self):
+        return {'requests': self.requests, 'resting': len(self.exchange.orders), 'fills': self.exchange.fills}
+
+    def close(self):
+        pass
+
+
+class ReplayEvents:
+    """GUI queue replacement: counts events and keeps the log lines with replay time."""
+
+    LOG_EVENTS = ('LOG', 'BOT_LOG')
+
+    def __init__(self, clock, echo=None):
+        self.clock = clock
+        self.echo = echo
+        self.counts = Counter()
+        self.log = []
+
+    def put(self, event):
+        message_type, data = event
+        self.counts[message_type] += 1
+        if message_type in self.LOG_EVENTS:
+            line = (self.clock.now(), message_type, data)
+            self.log.append(line)
+            if self.echo is not None:
+                self.echo(line)
+
+
+class SessionReplay:
+    """Replays a FeedRecorder capture through a real BossaAPIClient.
+
+    Recorded async frames go through ``_handle_async_message`` and so the
+    same parsers, quote store, subscriptions and trade manager as live. The
+    client runs on a ReplayClock set to each frame's capture time, so the
+    trailing stop loop's ``clock.sleep`` and all timestamps follow the
+    session, and its sync requests are answered by a ReplayExchange whose
+    fills arrive as async ExecRpt. ``speed`` is a multiple of real time
+    (1.0 = as recorded); None replays as fast as possible. Recorded ExecRpt
+    belong to the orders of the original session and are skipped unless
+    ``recorded_executions`` is set. Actions scheduled with ``at`` run on the
+    replay thread at a given offset from the start of the capture.
+    """
+
+    def __init__(self, path, speed=None, instrument=DEFAULT_INSTRUMENT, book_depth=0, account='00-22-000000', recorded_executions=False, echo=None):
+        self.path = path
+        self.speed = speed
+        self.recorded_executions = recorded_executions
+        self.clock = ReplayClock()
+        self.events = ReplayEvents(self.clock, echo)
+        self.client = BossaAPIClient('', '', self.events, gui_rate_hz=None, instrument=instrument, book_depth=book_depth, clock=self.clock)
+        self.exchange = ReplayExchange(self.client.market_data, self.client.ticks, account, self.clock)
+        self.client.sync_channel = ReplayChannel(self.exchange)
+        self.client.is_logged_in = True
+        self.client.manager_state = BotState.IDLE
+        self.counts = Counter()
+        self._actions = []
+        self._order = itertools.count()
+        self._first_ns = None
+        self._started = None
+
+    def at(self, offset, action):
+        """Run ``action(client)`` once replay time is ``offset`` seconds past the first frame."""
+        heapq.heappush(self._actions, (int(offset * 1_000_000_000), next(self._order), action))
+
+    def run(self, start_ns=None, end_ns=None):
+        """Replay the capture (optionally only [start_ns, end_ns]) and return stats()."""
+        self._started = time.perf_counter()
+        with FeedReader(self.path) as reader:
+            for record in reader.records(start_ns, end_ns):
+                if record.direction != ASYNC_IN:
+                    continue
+                if self._first_ns is None:
+                    self._first_ns = record.timestamp_ns
+                    self.clock.advance(record.timestamp_ns)
+                self._advance(record.timestamp_ns)
+                self._deliver(record.payload)
+        self._finish()
+        return self.stats()
+
+    def stats(self):
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        span = (self.clock.time_ns() - self._first_ns) / 1e9 if self._first_ns else 0.0
+        return {'messages': dict(self.counts), 'session_s': round(span, 1), 'elapsed_s': round(elapsed, 3), 'speedup': round(span / elapsed, 1) if elapsed else None,
+                'wakeups': self.clock.wakeups, 'exchange': self.client.sync_channel.stats(), 'daily_profit': self.client._amount(self.client.daily_profit)}
+
+    def _advance(self, timestamp_ns):
+        while self._actions and self._first_ns + self._actions[0][0] <= timestamp_ns:
+            offset, _, action = heapq.heappop(self._actions)
+            self._pace(self._first_ns + offset)
+            self.clock.advance(self._first_ns + offset, self._match)
+            action(self.client)
+            self.clock.settle([self.client.manager_thread])
+            self._match()
+        self._pace(timestamp_ns)
+        self.clock.advance(timestamp_ns, self._match)
+
+    def _pace(self, timestamp_ns):
+        if not self.speed:
+            return
+        delay = self._started + (timestamp_ns - self._first_ns) / 1e9 / self.speed - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _deliver(self, payload):
+        message = decode_frame(payload)
+        message_type = bos_fixml.message_type(message)
+        if message_type == 'ExecRpt' and not self.recorded_executions:
+            self.counts['ExecRpt (pominięte)'] += 1
+            return
+        self.counts[message_type] += 1
+        self.client._handle_async_message(message, message_type, time.perf_counter_ns())
+        if message_type == 'MktDataInc':
+            self._match()
+
+    def _match(self):
+        for report in self.exchange.match():
+            self.client._handle_async_message(report, 'ExecRpt', time.perf_counter_ns())
+
+    def _finish(self):
+        self.client.manager_stop_event.set()
+        self.clock.close()
+        if self.client.manager_thread:
+            self.client.manager_thread.join(timeout=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Odtwarzanie nagranej sesji przez klienta i menedżera transakcji')
+    parser.add_argument('path', help='Plik nagrania (bos_recorder)')
+    parser.add_argument('--speed', default='max', help='Wielokrotność czasu rzeczywistego (1 = jak nagrano) albo "max"')
+    parser.add_argument('--instrument', default=DEFAULT_INSTRUMENT, help='ISIN menedżera transakcji')
+    parser.add_argument('--book-depth', type=int, default=0, help='Głębokość arkusza, jak przy nagraniu')
+    parser.add_argument('--side', choices=('Kupno', 'Sprzedaż'), help='Otwórz pozycję menedżerem po --entry-after sekundach')
+    parser.add_argument('--entry-after', type=float, default=10.0, help='Sekundy od początku nagrania do otwarcia pozycji')
+    parser.add_argument('--trailing-stop', type=int, default=10, help='Odległość stop-lossa (pkt)')
+    parser.add_argument('--commission', default='1', help='Prowizja (pkt, także ułamkowa, np. 1.25)')
+    parser.add_argument('--account', default='00-22-000000', help='Rachunek zleceń')
+    parser.add_argument('--indicators', metavar='INTERWAŁ', help='Loguj wskaźniki z tego interwału świec przy wejściu, np. 1m')
+    parser.add_argument('--recorded-executions', action='store_true', help='Odtwarzaj także nagrane ExecRpt')
+    parser.add_argument('--debug', action='store_true', help='Pokaż także komunikaty DBG menedżera')
+    args = parser.parse_args()
+
+    def echo(line):
+        now, _, text = line
+        if args.debug or not str(text).startswith('DBG'):
+            print(f"{now:%H:%M:%S.%f} - {text}")
+
+    replay = SessionReplay(args.path, None if args.speed == 'max' else float(args.speed), args.instrument, args.book_depth, args.account, args.recorded_executions, echo)
+    if args.side:
+        params = {'account': args.account, 'trailing_stop': args.trailing_stop, 'daily_goal': 0, 'commission': args.commission, 'indicator_timeframe': args.indicators}
+        replay.at(args.entry_after, lambda client: client.start_trade_manager(params, args.side))
+    stats = replay.run()
+    print(f"Odtworzono {stats['session_s']} s sesji w {stats['elapsed_s']} s ({stats['speedup']}x): {stats['messages']}")
+    print(f"Giełda: {stats['exchange']}, wybudzenia menedżera: {stats['wakeups']}, zysk dzienny: {stats['daily_profit']}")
+
+
+if __name__ == "__main__":
+    main()
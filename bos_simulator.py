@@ -0,0 +1,372 @@
+import argparse
+import itertools
+import logging
+import random
+import socket
+import threading
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+from bos_clock import SYSTEM_CLOCK
+from bos_transport import FrameReader, encode_frame
+
+FIXML_OPEN = '<FIXML v="5.0" r="20080317" s="20080314">'
+FIXML_CLOSE = '</FIXML>'
+
+# ISIN -> (symbol, cena początkowa, krok notowań)
+DEFAULT_INSTRUMENTS = {
+    'PL0GF0031252': ('FW20Z2520', 2500.0, 1.0),
+    'PL0GF0031880': ('FW20H2620', 2510.0, 1.0),
+}
+
+
+class SimulatedInstrument:
+    def __init__(self, isin, symbol, price, tick):
+        self.isin = isin
+        self.symbol = symbol
+        self.tick = tick
+        self.last = price
+        self.bid = price - tick
+        self.ask = price + tick
+        self.lop = 1000
+
+    def step(self, rng):
+        self.last += rng.choice((-self.tick, 0.0, self.tick))
+        spread = self.tick * rng.choice((1, 1, 2))
+        self.bid = self.last - spread
+        self.ask = self.last + spread
+        self.lop += rng.choice((-1, 0, 1))
+
+
+class NOL3Simulator:
+    """Local stand-in for the NOL3 terminal's sync and async FIXML ports.
+
+    The sync port answers UserReq, Order, OrdCxlReq and MktDataReq. Every
+    connected async client receives MktDataInc for subscribed instruments at
+    ``rate`` messages per second, plus periodic Heartbeat, ApplMsgRpt and
+    Statement messages and ExecRpt fills of resting limit orders. Sync
+    responses can be delayed by ``latency`` seconds +/- ``jitter``.
+    """
+
+    def __init__(self, host='127.0.0.1', sync_port=0, async_port=0, rate=10.0, latency=0.0, jitter=0.0,
+                 heartbeat_interval=1.0, statement_interval=5.0, account='00-22-000000', instruments=None, seed=None, clock=SYSTEM_CLOCK):
+        self.host = host
+        self.sync_port = sync_port
+        self.async_port = async_port
+        self.rate = rate
+        self.latency = latency
+        self.jitter = jitter
+        self.heartbeat_interval = heartbeat_interval
+        self.statement_interval = statement_interval
+        self.account = account
+        self.clock = clock  # czas TxnTm raportów wykonania
+        self.rng = random.Random(seed)
+        self.instruments = {isin: SimulatedInstrument(isin, *spec) for isin, spec in (instruments or DEFAULT_INSTRUMENTS).items()}
+        self.subscribed = set()
+        self.depth = 0
+        self.orders = {}
+        self.positions = {}
+        self.running = False
+        self.sent_async = 0
+        self._order_ids = itertools.count(100000)
+        self._lock = threading.Lock()
+        self._async_clients = []
+        self._servers = []
+        self._threads = []
+        self._sync_sessions = {}  # gniazdo sesji sync -> jej wątek
+        self.log = logging.getLogger(__name__)
+
+    def start(self):
+        """Bind both ports (0 picks a free one) and start serving."""
+        self.running = True
+        sync_server = self._listen(self.sync_port)
+        async_server = self._listen(self.async_port)
+        self.sync_port = sync_server.getsockname()[1]
+        self.async_port = async_server.getsockname()[1]
+        self._spawn(self._accept_loop, sync_server, self._serve_sync)
+        self._spawn(self._accept_loop, async_server, self._register_async)
+        self._spawn(self._push_loop)
+        self.log.info(f"Symulator NOL3: Sync={self.sync_port}, Async={self.async_port}, {self.rate:g} msg/s")
+        return self
+
+    def stop(self):
+        self.running = False
+        with self._lock:
+            clients, self._async_clients = self._async_clients, []
+            sessions, self._sync_sessions = self._sync_sessions, {}
+        # shutdown budzi wątki zablokowane w accept/recv; samo close nie.
+        for sock in self._servers + clients + list(sessions):
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            sock.close()
+        for thread in self._threads + list(sessions.values()):
+            thread.join(timeout=1)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _listen(self, port):
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind((self.host, port))
+        server.listen(16)
+        self._servers.append(server)
+        return server
+
+    def _spawn(self, target, *args):
+        thread = threading.Thread(target=target, args=args, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _accept_loop(self, server, handler):
+        while self.running:
+            try:
+                client_sock, _ = server.accept()
+            except OSError:
+                break
+            client_sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            handler(client_sock)
+
+    # --- kanał synchroniczny ---
+
+    def _serve_sync(self, client_sock):
+        thread = threading.Thread(target=self._sync_session, args=(client_sock,), daemon=True)
+        with self._lock:
+            self._sync_sessions[client_sock] = thread
+        thread.start()
+
+    def _sync_session(self, client_sock):
+        reader = FrameReader(client_sock)
+        try:
+            while self.running:
+                request = reader.read_message()
+                if request is None:
+                    break
+                response = self.handle_request(request)
+                delay = self.latency + (self.rng.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+                if delay > 0:
+                    time.sleep(delay)
+                client_sock.sendall(encode_frame(response))
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                self._sync_sessions.pop(client_sock, None)
+            client_sock.close()
+
+    def handle_request(self, request):
+        """Return the FIXML response to one sync-channel request."""
+        try:
+            message = ET.fromstring(request)[0]
+        except (ET.ParseError, IndexError):
+            return self._wrap('<BizMsgRej Txt="Niepoprawny FIXML"/>')
+        if message.tag == 'UserReq':
+            return self._wrap(f'<UserRsp UserReqID="{message.get("UserReqID")}" Username="{message.get("Username")}" UserStat="1"/>')
+        if message.tag == 'Order':
+            return self._new_order(message)
+        if message.tag == 'OrdCxlReq':
+            return self._cancel_order(message)
+        if message.tag == 'MktDataReq':
+            return self._market_data_request(message)
+        return self._wrap(f'<BizMsgRej Txt="Nieobsługiwany komunikat {message.tag}"/>')
+
+    def _new_order(self, message):
+        instrument = message.find('Instrmt')
+        qty = message.find('OrdQty')
+        order = {
+            'ID': message.get('ID'), 'OrdID': str(next(self._order_ids)), 'Acct': message.get('Acct', self.account),
+            'Side': message.get('Side'), 'Px': float(message.get('Px', '0')), 'Qty': int(qty.get('Qty', '0')) if qty is not None else 0,
+            'isin': instrument.get('ID') if instrument is not None else '',
+        }
+        if order['isin'] not in self.instruments:
+            return self._exec_report(order, '8', txt="Nieznany instrument")
+        with self._lock:
+            self.orders[order['OrdID']] = order
+        return self._exec_report(order, '0')
+
+    def _cancel_order(self, message):
+        with self._lock:
+            order = self.orders.pop(message.get('OrdID'), None)
+        if order is None:
+            rejected = {'ID': message.get('ID'), 'OrdID': message.get('OrdID'), 'Acct': message.get('Acct'), 'Side': message.get('Side'), 'Px': 0.0, 'Qty': 0, 'isin': ''}
+            return self._exec_report(rejected, '8', txt="Nieznane zlecenie")
+        return self._exec_report(dict(order, ID=message.get('ID')), '4')
+
+    def _market_data_request(self, message):
+        req_id = message.get('ReqID')
+        if message.get('SubReqTyp') == '2':
+            # Z listą InstReq usuwa tylko te instrumenty, bez niej czyści cały filtr.
+            isins = {instrmt.get('ID') for instrmt in message.iter('Instrmt')}
+            with self._lock:
+                if isins:
+                    self.subscribed -= isins
+                else:
+                    self.subscribed.clear()
+            return self._wrap(f'<MktDataFull ReqID="{req_id}"/>')
+        entries = []
+        self.depth = int(message.get('MktDepth') or 0)
+        for instrmt in message.iter('Instrmt'):
+            isin = instrmt.get('ID')
+            inst = self.instruments.get(isin)
+            if inst is None:
+                continue
+            with self._lock:
+                self.subscribed.add(isin)
+            entries.append(f'<Full Typ="0" Px="{inst.bid:.2f}" Sz="1"/><Full Typ="1" Px="{inst.ask:.2f}" Sz="1"/><Full Typ="2" Px="{inst.last:.2f}" Sz="1"/><Full Typ="C" Sz="{inst.lop}"/><Instrmt ID="{isin}" Sym="{inst.symbol}" Src="4"/>')
+        return self._wrap(f'<MktDataFull ReqID="{req_id}">{"".join(entries)}</MktDataFull>')
+
+    def _exec_report(self, order, status, last_px=None, txt=None):
+        now = self.clock.now().strftime('%Y%m%d-%H:%M:%S')
+        filled = order['Qty'] if status == '2' else 0
+        leaves = 0 if status in ('2', '4', '8') else order['Qty']
+        symbol = self.instruments[order['isin']].symbol if order['isin'] in self.instruments else ''
+        extra = (f' LastPx="{last_px:.2f}" LastQty="{filled}"' if last_px is not None else '') + (f' Txt="{txt}"' if txt else '')
+        return self._wrap(f'<ExecRpt ID="{order["ID"]}" OrdID="{order["OrdID"]}" Stat="{status}" ExecTyp="F" Acct="{order["Acct"]}" Side="{order["Side"]}" Px="{order["Px"]:.2f}" LeavesQty="{leaves}" CumQty="{filled}" TxnTm="{now}"{extra}><Instrmt ID="{order["isin"]}" Sym="{symbol}" Src="4"/><OrdQty Qty="{order["Qty"]}"/></ExecRpt>')
+
+    @staticmethod
+    def _wrap(body):
+        return f'{FIXML_OPEN}{body}{FIXML_CLOSE}'
+
+    # --- kanał asynchroniczny ---
+
+    def push(self, *messages):
+        """Send ready FIXML messages to every async client (tests, benchmarks)."""
+        self._broadcast([encode_frame(message) for message in messages])
+
+    def _register_async(self, client_sock):
+        with self._lock:
+            self._async_clients.append(client_sock)
+        self._broadcast([encode_frame(self._statement())])
+
+    def _broadcast(self, frames):
+        if not frames:
+            return
+        data = b''.join(frames)
+        with self._lock:
+            clients = list(self._async_clients)
+        for client in clients:
+            try:
+                client.sendall(data)
+            except OSError:
+                with self._lock:
+                    if client in self._async_clients:
+                        self._async_clients.remove(client)
+                client.close()
+        with self._lock:
+            self.sent_async += len(frames)
+
+    def _push_loop(self):
+        start = time.perf_counter()
+        market_sent = 0
+        next_heartbeat = start + self.heartbeat_interval
+        next_statement = start + self.statement_interval
+        while self.running:
+            time.sleep(0.005)
+            now = time.perf_counter()
+            frames = []
+            with self._lock:
+                active = bool(self.subscribed) and bool(self._async_clients)
+            if active:
+                due = int((now - start) * self.rate) - market_sent
+                if due > 0:
+                    frames.extend(self._market_data_frames(due))
+                    market_sent += due
+            else:
+                market_sent = int((now - start) * self.rate)
+            frames.extend(self._fill_orders())
+            if now >= next_heartbeat:
+                next_heartbeat = now + self.heartbeat_interval
+                frames.append(encode_frame(self._wrap('<Heartbeat/>')))
+                frames.append(encode_frame(self._wrap(f'<ApplMsgRpt ApplRepTyp="3" Txt="{self.latency * 1000:.0f} ms"/>')))
+            if now >= next_statement:
+                next_statement = now + self.statement_interval
+                frames.append(encode_frame(self._statement()))
+            self._broadcast(frames)
+
+    def _market_data_frames(self, count):
+        rng = self.rng
+        with self._lock:
+            instruments = [self.instruments[isin] for isin in self.subscribed]
+        frames = []
+        if not instruments:
+            # Filtr wyczyszczony między sprawdzeniem a migawką.
+            return frames
+        for _ in range(count):
+            inst = rng.choice(instruments)
+            inst.step(rng)
+            typ = rng.choice('0122')
+            if self.depth and typ in '01':
+                body = self._depth_entries(inst, typ)
+            elif typ == '0':
+                body = f'<Inc Typ="0" Px="{inst.bid:.2f}" Sz="{rng.randint(1, 20)}"><Instrmt ID="{inst.isin}" Src="4"/></Inc><Inc Typ="1" Px="{inst.ask:.2f}" Sz="{rng.randint(1, 20)}"><Instrmt ID="{inst.isin}" Src="4"/></Inc>'
+            elif typ == '1':
+                body = f'<Inc Typ="1" Px="{inst.ask:.2f}" Sz="{rng.randint(1, 20)}"><Instrmt ID="{inst.isin}" Src="4"/></Inc><Inc Typ="C" Sz="{inst.lop}"><Instrmt ID="{inst.isin}" Src="4"/></Inc>'
+            else:
+                body = f'<Inc Typ="2" Px="{inst.last:.2f}" Sz="{rng.randint(1, 5)}" Tm="{datetime.now().strftime("%H:%M:%S")}"><Instrmt ID="{inst.isin}" Src="4"/></Inc>'
+            frames.append(encode_frame(f'{FIXML_OPEN}<MktDataInc>{body}</MktDataInc>{FIXML_CLOSE}'))
+        return frames
+
+    def _depth_entries(self, inst, typ):
+        # Arkusz: cała strona od najlepszej ceny, poziom po poziomie, jako zmiany poziomów.
+        best, step = (inst.bid, -inst.tick) if typ == '0' else (inst.ask, inst.tick)
+        rng = self.rng
+        return ''.join(f'<Inc UpdtAct="1" Typ="{typ}" Px="{best + level * step:.2f}" Sz="{rng.randint(1, 20)}" MDPxLvl="{level + 1}"><Instrmt ID="{inst.isin}" Src="4"/></Inc>' for level in range(self.depth))
+
+    def _fill_orders(self):
+        fills = []
+        with self._lock:
+            for ord_id, order in list(self.orders.items()):
+                inst = self.instruments[order['isin']]
+                if order['Side'] == '1' and order['Px'] >= inst.ask:
+                    fills.append((order, inst.ask))
+                elif order['Side'] == '2' and order['Px'] <= inst.bid:
+                    fills.append((order, inst.bid))
+                else:
+                    continue
+                del self.orders[ord_id]
+                signed = order['Qty'] if order['Side'] == '1' else -order['Qty']
+                self.positions[order['isin']] = self.positions.get(order['isin'], 0) + signed
+        return [encode_frame(self._exec_report(order, '2', last_px=fill_px)) for order, fill_px in fills]
+
+    def _statement(self):
+        with self._lock:
+            positions = ''.join(f'<Position Acc110="{qty}" Acc120="0"><Instrmt ID="{isin}" Sym="{self.instruments[isin].symbol}"/></Position>' for isin, qty in self.positions.items())
+        return self._wrap(f'<Statement Acct="{self.account}"><Fund name="SaldoGot" value="100000.00"/><Fund name="Depozyt" value="0.00"/>{positions}</Statement>')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Symulator terminala NOL3 (porty sync/async FIXML)')
+    parser.add_argument('--host', default='127.0.0.1', help='Interfejs nasłuchu (domyślnie 127.0.0.1)')
+    parser.add_argument('--sync-port', type=int, default=24444, help='Port synchroniczny')
+    parser.add_argument('--async-port', type=int, default=24445, help='Port asynchroniczny')
+    parser.add_argument('--rate', type=float, default=10.0, help='Komunikaty MktDataInc na sekundę (do 100000)')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Opóźnienie odpowiedzi synchronicznych [ms]')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='Losowy rozrzut opóźnienia [ms]')
+    parser.add_argument('--heartbeat', type=float, default=1.0, help='Okres Heartbeat/ApplMsgRpt [s]')
+    parser.add_argument('--statement', type=float, default=5.0, help='Okres komunikatu Statement [s]')
+    parser.add_argument('--seed', type=int, help='Ziarno generatora cen')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    simulator = NOL3Simulator(host=args.host, sync_port=args.sync_port, async_port=args.async_port, rate=args.rate,
+                              latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+                              heartbeat_interval=args.heartbeat, statement_interval=args.statement, seed=args.seed)
+    simulator.start()
+    print(f"Symulator działa. Uruchom klienta z NOL3_SYNC_PORT={simulator.sync_port} NOL3_ASYNC_PORT={simulator.async_port}. Ctrl+C kończy.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("\nZamykanie...")
+    finally:
+        simulator.stop()
+
+
+if __name__ == "__main__":
+    main()
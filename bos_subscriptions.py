@@ -0,0 +1,147 @@
+import threading
+
+# Najwięcej InstReq w jednym MktDataReq; większe zbiory idą kilkoma żądaniami w jednym zapisie.
+MAX_BATCH = 100
+
+
+class SubscriptionManager:
+    """Set of instruments in the NOL3 market data filter, with per-instrument consumers.
+
+    ``add``, ``remove`` and ``set`` compare the requested instruments with
+    the current filter and send only the difference: new ones in MktDataReq
+    SubReqTyp="1" requests, dropped ones in SubReqTyp="2" requests listing
+    just those InstReq entries, up to ``batch_size`` instruments each. All
+    requests of one change are written together through ``send_many`` (a
+    callable taking a list of requests and returning their responses in
+    order, None for a failed one). With ``partial_remove=False`` a removal
+    instead clears the filter and re-adds what is left, for servers that
+    only understand the empty SubReqTyp="2". ``depth`` is sent as MktDepth
+    (0 = best prices only).
+
+    ``dispatch`` is called by the market data handler with the ISINs an
+    MktDataInc touched and calls each instrument's consumers as
+    ``consumer(isin, received_ns)`` on the parsing thread. Consumers are
+    independent of the filter: they stay registered across remove and clear
+    until ``remove_consumer``.
+    """
+
+    def __init__(self, encoder, send_many, next_request_id, batch_size=MAX_BATCH, partial_remove=True, depth=0):
+        self.encoder = encoder
+        self.depth = depth
+        self.send_many = send_many
+        self.next_request_id = next_request_id
+        self.batch_size = batch_size
+        self.partial_remove = partial_remove
+        self._subscribed = set()
+        # isin -> krotka konsumentów; podmieniana w całości, więc dispatch czyta bez blokady.
+        self._consumers = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+
+    @property
+    def instruments(self):
+        return frozenset(self._subscribed)
+
+    def __contains__(self, isin):
+        return isin in self._subscribed
+
+    def __len__(self):
+        return len(self._subscribed)
+
+    def add(self, isins, consumer=None):
+        """Subscribe instruments not yet in the filter; return the set confirmed by the server."""
+        isins = _as_set(isins)
+        if consumer is not None:
+            for isin in isins:
+                self.add_consumer(isin, consumer)
+        with self._lock:
+            new = sorted(isins - self._subscribed)
+            if not new:
+                return set()
+            confirmed = self._send(self._filter_add, new)
+            self._subscribed |= confirmed
+            return confirmed
+
+    def remove(self, isins):
+        """Unsubscribe instruments; return the set removed from the filter."""
+        isins = _as_set(isins)
+        with self._lock:
+            gone = sorted(isins & self._subscribed)
+            if not gone:
+                return set()
+            if self.partial_remove:
+                removed = self._send(self.encoder.filter_remove, gone)
+            else:
+                removed = set(gone) if self._resubscribe(self._subscribed - set(gone)) else set()
+            self._subscribed -= removed
+            return removed
+
+    def set(self, isins):
+        """Make the filter equal to ``isins``; return (added, removed)."""
+        isins = _as_set(isins)
+        removed = self.remove(self._subscribed - isins)
+        return self.add(isins), removed
+
+    def clear(self):
+        """Empty the filter, return True on success."""
+        with self._lock:
+            response, = self._request([self.encoder.filter_clear(self.next_request_id())])
+            if not _confirmed(response):
+                return False
+            self._subscribed.clear()
+            return True
+
+    def add_consumer(self, isin, consumer):
+        with self._lock:
+            consumers = self._consumers.get(isin, ())
+            if consumer not in consumers:
+                self._consumers[isin] = consumers + (consumer,)
+
+    def remove_consumer(self, isin, consumer):
+        with self._lock:
+            consumers = tuple(c for c in self._consumers.get(isin, ()) if c != consumer)
+            if consumers:
+                self._consumers[isin] = consumers
+            else:
+                self._consumers.pop(isin, None)
+
+    def dispatch(self, isins, received_ns=None):
+        consumers = self._consumers
+        for isin in isins:
+            for consumer in consumers.get(isin, ()):
+                consumer(isin, received_ns)
+
+    def stats(self):
+        return {'instruments': len(self._subscribed), 'with_consumers': len(self._consumers), 'requests': self.requests}
+
+    def _send(self, build, isins):
+        """Send ``build(request_id, batch)`` per batch in one write; return the ISINs of confirmed batches."""
+        batches = [isins[i:i + self.batch_size] for i in range(0, len(isins), self.batch_size)]
+        responses = self._request([build(self.next_request_id(), batch) for batch in batches])
+        confirmed = set()
+        for batch, response in zip(batches, responses):
+            if _confirmed(response):
+                confirmed.update(batch)
+        return confirmed
+
+    def _resubscribe(self, remaining):
+        remaining = sorted(remaining)
+        batches = [remaining[i:i + self.batch_size] for i in range(0, len(remaining), self.batch_size)]
+        requests = [self.encoder.filter_clear(self.next_request_id())]
+        requests += [self._filter_add(self.next_request_id(), batch) for batch in batches]
+        return all(_confirmed(response) for response in self._request(requests))
+
+    def _filter_add(self, request_id, isins):
+        return self.encoder.filter_add(request_id, isins, self.depth)
+
+    def _request(self, requests):
+        self.requests += len(requests)
+        return self.send_many(requests)
+
+
+def _as_set(isins):
+    return {isins} if isinstance(isins, str) else set(isins)
+
+
+def _confirmed(response):
+    return bool(response) and '<MktDataFull' in response
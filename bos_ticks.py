@@ -0,0 +1,150 @@
+import threading
+import time
+from typing import NamedTuple
+
+try:
+    import numpy as np
+except ImportError:  # historia ticków wymaga NumPy; klient działa bez niej
+    np = None
+
+# Kolumna 'type' trzyma kod ASCII Typ z MktDataInc: oferta kupna, sprzedaży, transakcja.
+BID, ASK, TRADE = ord('0'), ord('1'), ord('2')
+
+# Domyślna liczba ticków pamiętanych na instrument (25 B na tick).
+DEFAULT_CAPACITY = 100_000
+
+
+class TickWindow(NamedTuple):
+    """Ticks of one query in chronological order, one NumPy array per column."""
+    timestamps: "np.ndarray"  # int64, ns od epoki
+    prices: "np.ndarray"      # int64, ticki
+    sizes: "np.ndarray"       # int64
+    types: "np.ndarray"       # uint8, BID/ASK/TRADE
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def of_type(self, entry_type):
+        """Only the ticks of one type, e.g. ``window.of_type(TRADE).prices``."""
+        mask = self.types == entry_type
+        return TickWindow(self.timestamps[mask], self.prices[mask], self.sizes[mask], self.types[mask])
+
+
+class TickRing:
+    """Last ``capacity`` ticks of one instrument in preallocated NumPy columns.
+
+    Appends overwrite the oldest tick once the ring is full, so memory is
+    fixed at 25 bytes per slot for the whole session. Queries return copies
+    in chronological order; ``since`` binary-searches the timestamps, which
+    are expected to be non-decreasing. ``clock`` returns the current time in
+    ns for ``last_seconds``; pass the client's (e.g. ReplayClock.time_ns) so
+    windows follow replayed time.
+    """
+
+    __slots__ = ('capacity', 'timestamps', 'prices', 'sizes', 'types', 'written', 'clock', '_lock')
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, clock=time.time_ns):
+        if np is None:
+            raise ImportError("Historia ticków wymaga pakietu numpy.")
+        self.capacity = capacity
+        self.timestamps = np.zeros(capacity, np.int64)
+        self.prices = np.zeros(capacity, np.int64)
+        self.sizes = np.zeros(capacity, np.int64)
+        self.types = np.zeros(capacity, np.uint8)
+        self.written = 0
+        self.clock = clock
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.written, self.capacity)
+
+    def append(self, timestamp_ns, price, size, entry_type):
+        with self._lock:
+            i = self.written % self.capacity
+            self.timestamps[i] = timestamp_ns
+            self.prices[i] = price
+            self.sizes[i] = size
+            self.types[i] = entry_type
+            self.written += 1
+
+    def last(self, count):
+        """The newest ``count`` ticks (fewer if the ring holds fewer)."""
+        with self._lock:
+            return self._window(max(0, min(count, self.written, self.capacity)))
+
+    def since(self, timestamp_ns):
+        """Ticks stamped at or after ``timestamp_ns``."""
+        with self._lock:
+            held = min(self.written, self.capacity)
+            end = self.written % self.capacity
+            newer = self.timestamps[:end]
+            count = end - int(np.searchsorted(newer, timestamp_ns, 'left'))
+            if count == end and held > end:
+                older = self.timestamps[end:held]
+                count += len(older) - int(np.searchsorted(older, timestamp_ns, 'left'))
+            return self._window(count)
+
+    def last_seconds(self, seconds, now_ns=None):
+        """Ticks of the last ``seconds`` seconds before ``now_ns`` (default: now by ``clock``)."""
+        if now_ns is None:
+            now_ns = self.clock()
+        return self.since(now_ns - int(seconds * 1_000_000_000))
+
+    def nbytes(self):
+        return self.timestamps.nbytes + self.prices.nbytes + self.sizes.nbytes + self.types.nbytes
+
+    def _window(self, count):
+        end = self.written % self.capacity
+        start = end - count
+        columns = (self.timestamps, self.prices, self.sizes, self.types)
+        if start >= 0 and (end or not count):
+            return TickWindow(*(column[start:end].copy() for column in columns))
+        # Okno zawija się przez koniec tablic: starsza część z końca, nowsza z początku.
+        return TickWindow(*(np.concatenate((column[self.capacity + start:], column[:end])) for column in columns))
+
+
+class TickHistory:
+    """Per-instrument TickRings, filled from MktDataInc by the quote store.
+
+    Rings are created on an instrument's first tick, each ``capacity``
+    ticks long, so memory is bounded by the number of subscribed
+    instruments and never grows with session length. ``clock`` is handed
+    to every ring, see TickRing.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, clock=time.time_ns):
+        if np is None:
+            raise ImportError("Historia ticków wymaga pakietu numpy.")
+        self.capacity = capacity
+        self.clock = clock
+        self.rings = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, isin):
+        return isin in self.rings
+
+    def ring(self, isin):
+        ring = self.rings.get(isin)
+        if ring is None:
+            with self._lock:
+                ring = self.rings.get(isin)
+                if ring is None:
+                    ring = self.rings[isin] = TickRing(self.capacity, self.clock)
+        return ring
+
+    def record(self, isin, timestamp_ns, entry_type, price, size):
+        """Append one tick; entry_type is the Typ string of the <Inc>, e.g. '2'."""
+        ring = self.rings.get(isin)
+        if ring is None: ring = self.ring(isin)
+        ring.append(timestamp_ns, price, size, ord(entry_type))
+
+    def last_ticks(self, isin, count):
+        ring = self.rings.get(isin)
+        return ring.last(count) if ring is not None else None
+
+    def last_seconds(self, isin, seconds, now_ns=None):
+        ring = self.rings.get(isin)
+        return ring.last_seconds(seconds, now_ns) if ring is not None else None
+
+    def nbytes(self):
+        return sum(ring.nbytes() for ring in list(self.rings.values()))
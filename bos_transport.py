@@ -0,0 +1,490 @@
+import re
+import socket
+import struct
+import threading
+import queue
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import NamedTuple, Optional
+
+# Każda wiadomość FIXML jest poprzedzona 4-bajtową długością (little-endian).
+FRAME_HEADER = struct.Struct('<I')
+
+
+class EncodedMessage(NamedTuple):
+    """A request already framed for the socket, with the ID its response will carry."""
+    frame: bytes
+    key: Optional[str]
+
+
+def encode_frame(message):
+    """Return header and UTF-8 payload of one FIXML message as a single buffer."""
+    if isinstance(message, EncodedMessage):
+        return message.frame
+    payload = message.encode('utf-8')
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+def send_frame(sock, message):
+    """Send one length-prefixed FIXML message with a single sendall."""
+    sock.sendall(encode_frame(message))
+
+
+class SendStats:
+    """Thread-safe counters of socket writes and their duration."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.sends = 0
+        self.frames = 0
+        self.bytes = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, frames, nbytes, elapsed_ns):
+        with self._lock:
+            self.sends += 1
+            self.frames += frames
+            self.bytes += nbytes
+            self.total_ns += elapsed_ns
+            if elapsed_ns > self.max_ns:
+                self.max_ns = elapsed_ns
+
+    def snapshot(self):
+        with self._lock:
+            avg_us = self.total_ns / self.sends / 1000 if self.sends else 0.0
+            return {'sends': self.sends, 'frames': self.frames, 'bytes': self.bytes, 'avg_send_us': round(avg_us, 1), 'max_send_us': round(self.max_ns / 1000, 1)}
+
+
+class FrameWriter:
+    """Writer that emits every frame, or a batch of frames, in one syscall.
+
+    Header and payload are built in one buffer instead of two ``sendall``
+    calls, and TCP_NODELAY is set so a small order is not held back by
+    Nagle's algorithm waiting for a delayed ACK. Frames added with ``queue``
+    are coalesced and written together by ``flush``.
+    """
+
+    def __init__(self, sock, stats=None):
+        self.sock = sock
+        self.stats = stats if stats is not None else SendStats()
+        self._pending = []
+        try:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        except OSError:
+            pass  # np. gniazdo AF_UNIX w testach
+
+    def send(self, message):
+        self._write([encode_frame(message)])
+
+    def queue(self, message):
+        self._pending.append(encode_frame(message))
+
+    def flush(self):
+        if self._pending:
+            frames, self._pending = self._pending, []
+            self._write(frames)
+
+    def send_many(self, messages):
+        self._write([encode_frame(message) for message in messages])
+
+    def send_frames(self, frames):
+        """Write already encoded, length-prefixed frames in one syscall."""
+        self._write(frames)
+
+    def _write(self, frames):
+        data = frames[0] if len(frames) == 1 else b''.join(frames)
+        start = time.perf_counter_ns()
+        self.sock.sendall(data)
+        self.stats.record(len(frames), len(data), time.perf_counter_ns() - start)
+
+
+_CORRELATION_ATTR = re.compile(r'\s(?:ID|ReqID|UserReqID)="([^"]*)"')
+
+
+def correlation_id(message):
+    """Return ID/ReqID/UserReqID of the first element inside <FIXML>, or None."""
+    if isinstance(message, EncodedMessage):
+        return message.key
+    start = message.find('<', message.find('>') + 1)
+    if start < 0: return None
+    match = _CORRELATION_ATTR.search(message, start, message.find('>', start))
+    return match.group(1) if match else None
+
+
+_STRIP_BYTES = frozenset(b' \t\r\n\x00')
+
+
+def decode_frame(view):
+    """Decode a frame body, dropping surrounding whitespace and NUL padding."""
+    end = len(view)
+    while end and view[end - 1] in _STRIP_BYTES:
+        end -= 1
+    start = 0
+    while start < end and view[start] in _STRIP_BYTES:
+        start += 1
+    return str(view[start:end], 'utf-8', 'replace')
+
+
+class FrameReader:
+    """Incremental reader of length-prefixed frames from a stream socket.
+
+    Data is received with ``recv_into`` into one reusable buffer, so a single
+    large ``recv`` may yield many frames and a frame body is never assembled
+    by concatenation. ``read_frame`` returns a memoryview into that buffer
+    which stays valid only until the next read.
+    """
+
+    def __init__(self, sock, buffer_size=65536):
+        self.sock = sock
+        self._buf = bytearray(buffer_size)
+        self._view = memoryview(self._buf)
+        self._start = 0
+        self._end = 0
+
+    def buffered(self):
+        """Number of received bytes not yet handed out as frames."""
+        return self._end - self._start
+
+    def read_frame(self):
+        """Return the next frame body as a memoryview, None on clean EOF."""
+        while True:
+            available = self._end - self._start
+            if available >= 4:
+                length = FRAME_HEADER.unpack_from(self._buf, self._start)[0]
+                if available - 4 >= length:
+                    body_start = self._start + 4
+                    self._start = body_start + length
+                    return self._view[body_start:self._start]
+                needed = 4 + length
+            else:
+                needed = 4
+            if not self._fill(needed):
+                return None
+
+    def read_bytes(self):
+        frame = self.read_frame()
+        return None if frame is None else bytes(frame)
+
+    def read_message(self):
+        """Return the next frame decoded to text, None on clean EOF."""
+        frame = self.read_frame()
+        return None if frame is None else decode_frame(frame)
+
+    def _fill(self, needed):
+        if self._start + needed > len(self._buf):
+            self._make_room(needed)
+        received = self.sock.recv_into(self._view[self._end:])
+        if received == 0:
+            if self._end != self._start:
+                raise ConnectionError("Przerwano połączenie.")
+            return False
+        self._end += received
+        return True
+
+    def _make_room(self, needed):
+        pending = self._end - self._start
+        if needed > len(self._buf):
+            # Ramka większa niż bufor (np. duży Statement) - nowy, większy bufor.
+            new_buf = bytearray(max(needed, 2 * len(self._buf)))
+            new_buf[:pending] = self._view[self._start:self._end]
+            self._buf = new_buf
+            self._view = memoryview(new_buf)
+        else:
+            self._view[:pending] = self._view[self._start:self._end]
+        self._start = 0
+        self._end = pending
+
+
+class _PooledConnection:
+    __slots__ = ('sock', 'reader', 'writer')
+
+    def __init__(self, sock, send_stats):
+        self.sock = sock
+        self.reader = FrameReader(sock, buffer_size=16384)
+        self.writer = FrameWriter(sock, send_stats)
+
+
+class SyncConnectionPool:
+    """Pool of warm TCP connections to the NOL3 synchronous port.
+
+    Idle connections are kept on a LIFO stack so the most recently used one
+    is handed out first. Before reuse each socket is checked for a pending
+    EOF; dead sockets are replaced transparently. Requests themselves go
+    through PipelinedSyncChannel, which never resends: after a failed or
+    partial write an order may already have reached the exchange.
+    """
+
+    def __init__(self, host, port, size=2, timeout=None):
+        self.host = host
+        self.port = port
+        self.size = size
+        self.timeout = timeout
+        self.send_stats = SendStats()
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.created = 0
+        self.reused = 0
+        self.recreated = 0
+        self.failed = 0
+
+    def start(self):
+        """Pre-open connections up to the pool size, return how many are ready."""
+        opened = 0
+        for _ in range(self.size - self._idle.qsize()):
+            try:
+                self._idle.put(self._connect())
+                opened += 1
+            except OSError:
+                break
+        return opened
+
+    def acquire(self):
+        """Check out a healthy connection; return it with release() or discard()."""
+        if self._closed:
+            raise ConnectionError("Pula połączeń jest zamknięta.")
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+        if self._is_healthy(conn):
+            with self._lock:
+                self.reused += 1
+            return conn
+        self._close(conn)
+        return self._replace()
+
+    def release(self, conn):
+        if self._closed:
+            self._close(conn)
+        else:
+            self._idle.put(conn)
+
+    def discard(self, conn):
+        """Drop a connection that failed while in use."""
+        with self._lock:
+            self.failed += 1
+        self._close(conn)
+
+    def stats(self):
+        with self._lock:
+            stats = {'created': self.created, 'reused': self.reused, 'recreated': self.recreated, 'failed': self.failed, 'idle': self._idle.qsize()}
+        stats.update(self.send_stats.snapshot())
+        return stats
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._close(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        with self._lock:
+            self.created += 1
+        return _PooledConnection(sock, self.send_stats)
+
+    def _replace(self):
+        conn = self._connect()
+        with self._lock:
+            self.recreated += 1
+        return conn
+
+    def _is_healthy(self, conn):
+        # Bezczynne połączenie nie powinno mieć nic do odczytu: EOF oznacza
+        # zamknięcie przez NOL3, a zaległe bajty rozsynchronizowanie ramek.
+        if conn.reader.buffered():
+            return False
+        sock = conn.sock
+        try:
+            sock.setblocking(False)
+            try:
+                sock.recv(1, socket.MSG_PEEK)
+                return False
+            except (BlockingIOError, InterruptedError):
+                return True
+            finally:
+                sock.settimeout(self.timeout)
+        except OSError:
+            return False
+
+    @staticmethod
+    def _close(conn):
+        # shutdown budzi wątek zablokowany w recv na tym gnieździe; samo close nie.
+        try:
+            conn.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        try:
+            conn.sock.close()
+        except OSError:
+            pass
+
+
+class PipelinedSyncChannel:
+    """Sync channel with many requests in flight on one pooled connection.
+
+    Requests are written back to back without waiting for earlier answers.
+    A reader thread matches each response to its caller's Future by the
+    ID/ReqID/UserReqID of the response; a response without a known ID
+    resolves the oldest pending request, as NOL3 answers in order.
+    ``results`` waits with a timeout; requests that time out are dropped
+    from the pending set and their late answers are discarded, so they
+    cannot resolve another caller.
+
+    ``tap``, if set, is called as ``tap(outgoing, body)`` with the raw body
+    of every request written and every response read (e.g. to record the
+    session); it runs on the sending and the reader thread respectively.
+    """
+
+    MAX_EXPIRED = 1024
+
+    def __init__(self, pool):
+        self.pool = pool
+        self._lock = threading.RLock()
+        self._conn = None
+        self._pending = OrderedDict()
+        self.max_in_flight = 0
+        self.unmatched = 0
+        self.timed_out = 0
+        self.late = 0
+        self._expired = OrderedDict()  # ID żądań po czasie -> None, aby odrzucić spóźnione odpowiedzi
+        self._expired_unkeyed = 0      # żądania bez ID po czasie, których odpowiedź jeszcze nie przyszła
+        self.tap = None
+
+    def submit(self, message):
+        """Send a request and return a Future resolved with its response."""
+        return self.submit_many([message])[0]
+
+    def submit_many(self, messages):
+        """Send several requests in one write, return their Futures in order."""
+        futures = [Future() for _ in messages]
+        with self._lock:
+            conn = self._connection()
+            keys = []
+            for message, future in zip(messages, futures):
+                # Żądanie bez ID dostaje unikalny klucz i czeka w kolejce FIFO.
+                key = correlation_id(message) or object()
+                self._pending[key] = future
+                keys.append(key)
+            self.max_in_flight = max(self.max_in_flight, len(self._pending))
+            frames = [encode_frame(message) for message in messages]
+            tap = self.tap
+            if tap is not None:
+                # Przed zapisem, aby żądanie trafiło do nagrania przed odpowiedzią.
+                for frame in frames:
+                    tap(True, memoryview(frame)[4:])
+            try:
+                conn.writer.send_frames(frames)
+            except OSError as e:
+                for key in keys:
+                    self._pending.pop(key, None)
+                self._fail(conn, e)
+                raise
+        return futures
+
+    def request(self, message, timeout=None):
+        return self.results([self.submit(message)], timeout)[0]
+
+    def request_many(self, messages, timeout=None):
+        return self.results(self.submit_many(messages), timeout)
+
+    def results(self, futures, timeout=None):
+        """Wait for ``futures`` at most ``timeout`` seconds in total and return their results.
+
+        On timeout the requests still unanswered stop being pending and
+        concurrent.futures.TimeoutError is raised (an alias of the builtin
+        TimeoutError only since Python 3.11).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            return [future.result(None if deadline is None else max(0.0, deadline - time.monotonic())) for future in futures]
+        except FutureTimeoutError:
+            self._expire(futures)
+            raise FutureTimeoutError(f"Brak odpowiedzi synchronicznej w ciągu {timeout} s.") from None
+
+    def stats(self):
+        with self._lock:
+            stats = {'in_flight': len(self._pending), 'max_in_flight': self.max_in_flight, 'unmatched': self.unmatched, 'timed_out': self.timed_out, 'late': self.late}
+        stats.update(self.pool.stats())
+        return stats
+
+    def close(self):
+        with self._lock:
+            conn, self._conn = self._conn, None
+            pending, self._pending = self._pending, OrderedDict()
+        for future in pending.values():
+            future.set_exception(ConnectionError("Kanał synchroniczny zamknięty."))
+        self.pool.close()
+        if conn is not None:
+            self.pool.release(conn)
+
+    def _connection(self):
+        if self._conn is None:
+            self._conn = self.pool.acquire()
+            threading.Thread(target=self._read_loop, args=(self._conn,), daemon=True).start()
+        return self._conn
+
+    def _read_loop(self, conn):
+        try:
+            while True:
+                frame = conn.reader.read_frame()
+                if frame is None:
+                    raise ConnectionError("Serwer zamknął połączenie synchroniczne.")
+                tap = self.tap
+                if tap is not None:
+                    tap(False, bytes(frame))
+                self._dispatch(decode_frame(frame))
+        except Exception as e:
+            self._fail(conn, e)
+
+    def _expire(self, futures):
+        waiting = {id(future) for future in futures if not future.done()}
+        with self._lock:
+            for key, future in list(self._pending.items()):
+                if id(future) not in waiting:
+                    continue
+                del self._pending[key]
+                self.timed_out += 1
+                if isinstance(key, str):
+                    self._expired[key] = None
+                    if len(self._expired) > self.MAX_EXPIRED:
+                        self._expired.popitem(last=False)
+                else:
+                    self._expired_unkeyed += 1
+        for future in futures:
+            future.cancel()
+
+    def _dispatch(self, response):
+        key = correlation_id(response)
+        with self._lock:
+            future = self._pending.pop(key, None)
+            if future is None:
+                if key in self._expired:
+                    del self._expired[key]
+                    self.late += 1
+                    return
+                if self._expired_unkeyed:
+                    # Odpowiedź bez znanego ID należy do najstarszego żądania, a to już przepadło.
+                    self._expired_unkeyed -= 1
+                    self.late += 1
+                    return
+                if self._pending:
+                    self.unmatched += 1
+                    _, future = self._pending.popitem(last=False)
+        if future is not None:
+            future.set_result(response)
+
+    def _fail(self, conn, error):
+        with self._lock:
+            if self._conn is not conn:
+                return
+            self._conn = None
+            pending, self._pending = self._pending, OrderedDict()
+        self.pool.discard(conn)
+        for future in pending.values():
+            future.set_exception(ConnectionError(f"Połączenie synchroniczne przerwane: {error}"))
@@ -21,6 +21,9 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtCore import QTimer, Qt
 from PyQt6.QtGui import QFont
 
+import bos_indicators
+from bos_indicators import INDICATORS, IndicatorSet, format_values
+
 class BotState(Enum):
     STOPPED = 0
     IDLE = 1
@@ -371,6 +374,11 @@ class BossaAppPyQt(QMainWindow):
         indicators_layout.addWidget(self.ema_checkbox)
         indicators_layout.addWidget(self.rsi_checkbox)
         indicators_layout.addWidget(self.macd_checkbox)
+        self.indicator_checkboxes = {'SMA': self.sma_checkbox, 'EMA': self.ema_checkbox, 'RSI': self.rsi_checkbox, 'MACD': self.macd_checkbox}
+        for checkbox in self.indicator_checkboxes.values():
+            checkbox.toggled.connect(self.refresh_chart_indicators)
+        self.indicator_values_label = QLabel("")
+        indicators_layout.addWidget(self.indicator_values_label)
         indicators_layout.addStretch()
         
         charts_layout.addWidget(indicators_group)
@@ -379,6 +387,7 @@ class BossaAppPyQt(QMainWindow):
         
         # Initialize chart data storage
         self.chart_data = []
+        self.chart_indicators = None
         self.current_symbol = ""
         self.live_update_timer = QTimer(self)
         self.live_update_timer.timeout.connect(self.update_live_data)
@@ -486,6 +495,24 @@ class BossaAppPyQt(QMainWindow):
             summary_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
             self.chart_widget.layout().addWidget(summary_label)
 
+        self.refresh_chart_indicators()
+
+    def refresh_chart_indicators(self):
+        """Rebuild the checked indicators over the loaded bars; new bars then update them in O(1)."""
+        selected = [name for name, checkbox in self.indicator_checkboxes.items() if checkbox.isChecked()]
+        if not selected or not self.chart_data:
+            self.chart_indicators = None
+            self.indicator_values_label.setText("")
+            return
+        self.chart_indicators = IndicatorSet(**{name: INDICATORS[name]() for name in selected})
+        closes = [bar['close'] for bar in self.chart_data]
+        if bos_indicators.np is not None:
+            self.chart_indicators.backfill(closes)
+        else:
+            for close in closes:
+                self.chart_indicators.update(close)
+        self.indicator_values_label.setText(format_values(self.chart_indicators.values()))
+
     def start_live_updates(self):
         """Start receiving live market data updates"""
         self.chart_status_label.setText("Live updates started - waiting for market data...")
@@ -507,6 +534,8 @@ class BossaAppPyQt(QMainWindow):
             last_bar['volume'] = random.randint(1, 10)
             
             self.chart_data.append(last_bar)
+            if self.chart_indicators is not None:
+                self.indicator_values_label.setText(format_values(self.chart_indicators.update(last_bar['close'])))
             
             # Update chart with new data
             # TODO: Replace with actual lightweight-charts update
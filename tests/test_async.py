@@ -0,0 +1,88 @@
+import asyncio
+import queue
+
+import pytest
+
+from bos_async import AsyncBossaAPIClient, ThreadedBossaAPIClient, read_frame
+from bos_bot import TICK_SIZES
+from bos_fixml import FIXML_OPEN, FIXML_CLOSE, OrdStatus
+from bos_price import TickTable
+from bos_simulator import NOL3Simulator
+from bos_transport import encode_frame
+
+ISIN = 'PL0GF0031252'
+ACCOUNT = '00-22-000000'
+
+
+def trade(price):
+    return f'{FIXML_OPEN}<MktDataInc><Inc Typ="2" Px="{price:.2f}" Sz="1"><Instrmt ID="{ISIN}" Src="4"/></Inc></MktDataInc>{FIXML_CLOSE}'
+
+
+def test_async_client_orders_and_quotes_in_client_ticks():
+    async def session(simulator):
+        client = AsyncBossaAPIClient('BOS', 'BOS', simulator.sync_port, simulator.async_port, ticks=TickTable(TICK_SIZES))
+        try:
+            assert await client.login()
+            assert await client.add_to_filter(ISIN)
+            report = await client.send_limit_order(ACCOUNT, 'Kupno', 1, 2400, ISIN)
+            assert report.status == OrdStatus.NEW and report.price == 2400
+            cancelled = await client.cancel_order({'id_dm': report.order_id, 'k_s_text': 'Kupno', 'ilosc': 1, 'rachunek': ACCOUNT}, ISIN)
+            assert cancelled.status == OrdStatus.CANCELED
+            events = client.events()
+            async for message_type, _ in events:
+                if message_type == 'PORTFOLIO_UPDATE':
+                    break
+            simulator.push(trade(2512))
+            async for message_type, data in events:
+                if message_type == 'MARKET_DATA_UPDATE':
+                    return data
+        finally:
+            await client.close()
+
+    with NOL3Simulator(rate=0, heartbeat_interval=3600, statement_interval=3600) as simulator:
+        quotes = asyncio.run(asyncio.wait_for(session(simulator), 10))
+    # FW20 w punktach, jak w BossaAPIClient, a nie w groszach domyślnej tabeli.
+    assert quotes[ISIN]['last_price'] == 2512
+
+
+def test_threaded_facade_forwards_events_to_the_queue():
+    events = queue.Queue()
+    with NOL3Simulator(rate=0, heartbeat_interval=3600, statement_interval=3600) as simulator:
+        client = ThreadedBossaAPIClient('BOS', 'BOS', simulator.sync_port, simulator.async_port, events, ticks=TickTable(TICK_SIZES))
+        assert client.login()
+        assert events.get(timeout=5)[0] == 'PORTFOLIO_UPDATE'
+        simulator.push(trade(2499))
+        assert events.get(timeout=5) == ('MARKET_DATA_UPDATE', {ISIN: {'last_price': 2499}})
+        client.disconnect()
+    assert events.get(timeout=5) == ('DISCONNECTED', None)
+
+
+def test_read_frame_matches_the_sync_framing():
+    async def frames(data):
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        result = []
+        while (message := await read_frame(reader)) is not None:
+            result.append(message)
+        return result
+
+    padded = b'  <FIXML/>\x00\x00'
+    data = encode_frame('<FIXML a="1"/>') + len(padded).to_bytes(4, 'little') + padded + encode_frame('')
+    assert asyncio.run(frames(data)) == ['<FIXML a="1"/>', '<FIXML/>', '']
+    with pytest.raises(ConnectionError):
+        asyncio.run(frames(encode_frame('<FIXML/>')[:-2]))
+
+
+def test_threaded_facade_logs_listener_errors():
+    events = queue.Queue()
+    client = ThreadedBossaAPIClient('BOS', 'BOS', 1, 1, events)
+
+    async def broken():
+        raise ConnectionError("zerwane")
+        yield
+
+    client.client.events = broken
+    asyncio.run_coroutine_threadsafe(client._forward_events(), client.loop).result(5)
+    assert events.get_nowait() == ('LOG', 'Błąd w wątku asynchronicznym: zerwane')
+    client.disconnect()
@@ -0,0 +1,116 @@
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from bos_bars import TIMEFRAMES, DEFAULT_TIMEFRAMES, SECOND_NS, BarEngine, BarSeries, aggregate, rollup, exchange_time_ns
+
+ISIN = 'PL0GF0031252'
+START_NS = 1_760_000_000 * SECOND_NS
+
+
+def make_trades(count, seed=1):
+    rng = random.Random(seed)
+    timestamps, prices, sizes = [], [], []
+    t, price = START_NS, 2500
+    for _ in range(count):
+        # Zwykle sekundy między transakcjami, czasem przerwa na godziny (puste okresy bez świec).
+        t += int(rng.expovariate(1 / 20) * SECOND_NS) if rng.random() > 0.002 else rng.randint(1, 30) * 3600 * SECOND_NS
+        price += rng.randint(-3, 3)
+        timestamps.append(t)
+        prices.append(price)
+        sizes.append(rng.randint(1, 20))
+    return timestamps, prices, sizes
+
+
+def naive_bars(timestamps, prices, sizes, period, utc_offset=0):
+    """Reference OHLCV: a dict of buckets filled trade by trade in time order."""
+    buckets = {}
+    for t, price, size in sorted(zip(timestamps, prices, sizes), key=lambda trade: trade[0]):
+        start = (t + utc_offset * SECOND_NS) // (period * SECOND_NS) * period * SECOND_NS - utc_offset * SECOND_NS
+        bar = buckets.get(start)
+        if bar is None:
+            buckets[start] = [start, price, price, price, price, size, 1]
+        else:
+            bar[2] = max(bar[2], price)
+            bar[3] = min(bar[3], price)
+            bar[4] = price
+            bar[5] += size
+            bar[6] += 1
+    return [tuple(bar) for bar in buckets.values()]
+
+
+def rows(bars):
+    return list(zip(*(column.tolist() for column in bars)))
+
+
+@pytest.mark.parametrize('utc_offset', [0, 7200])
+@pytest.mark.parametrize('timeframe', DEFAULT_TIMEFRAMES)
+def test_aggregate_matches_naive_reference(timeframe, utc_offset):
+    trades = make_trades(5000)
+    assert rows(aggregate(*trades, TIMEFRAMES[timeframe], utc_offset)) == naive_bars(*trades, TIMEFRAMES[timeframe], utc_offset)
+
+
+def test_aggregate_sorts_unordered_trades():
+    timestamps, prices, sizes = make_trades(500)
+    order = list(range(500))
+    random.Random(2).shuffle(order)
+    shuffled = [[column[i] for i in order] for column in (timestamps, prices, sizes)]
+    assert rows(aggregate(*shuffled, 60)) == naive_bars(timestamps, prices, sizes, 60)
+
+
+@pytest.mark.parametrize('timeframe', DEFAULT_TIMEFRAMES[1:])
+def test_rollup_of_minute_bars_equals_direct_aggregation(timeframe):
+    trades = make_trades(5000)
+    minutes = aggregate(*trades, 60, 3600)
+    assert rows(rollup(minutes, TIMEFRAMES[timeframe], 3600)) == rows(aggregate(*trades, TIMEFRAMES[timeframe], 3600))
+
+
+def test_streaming_engine_matches_reference_for_every_timeframe():
+    trades = make_trades(5000)
+    engine = BarEngine(capacity=10_000, utc_offset=3600)
+    closed = {timeframe: 0 for timeframe in DEFAULT_TIMEFRAMES}
+    for t, price, size in zip(*trades):
+        for timeframe, bar in engine.update(ISIN, t, price, size):
+            closed[timeframe] += 1
+    for timeframe in DEFAULT_TIMEFRAMES:
+        expected = naive_bars(*trades, TIMEFRAMES[timeframe], 3600)
+        assert rows(engine.bars(ISIN, timeframe)) == expected, timeframe
+        assert tuple(engine.current(ISIN, timeframe)) == expected[-1]
+        assert closed[timeframe] == len(expected) - 1
+        assert rows(engine.bars(ISIN, timeframe, include_open=False)) == expected[:-1]
+
+
+def test_backfill_then_streaming_matches_full_stream():
+    timestamps, prices, sizes = make_trades(5000)
+    half = 2500
+    engine = BarEngine(capacity=10_000, utc_offset=0)
+    counts = engine.backfill(ISIN, np.array(timestamps[:half]), np.array(prices[:half]), np.array(sizes[:half]))
+    for timeframe in DEFAULT_TIMEFRAMES:
+        assert counts[timeframe] == len(naive_bars(timestamps[:half], prices[:half], sizes[:half], TIMEFRAMES[timeframe]))
+    for t, price, size in zip(timestamps[half:], prices[half:], sizes[half:]):
+        engine.update(ISIN, t, price, size)
+    for timeframe in DEFAULT_TIMEFRAMES:
+        assert rows(engine.bars(ISIN, timeframe)) == naive_bars(timestamps, prices, sizes, TIMEFRAMES[timeframe]), timeframe
+
+
+def test_series_ring_keeps_only_the_newest_closed_bars():
+    series = BarSeries(60, capacity=5)
+    for minute in range(12):
+        series.update(START_NS + minute * 60 * SECOND_NS, 100 + minute, 1)
+    bars = series.bars()
+    assert len(bars) == 6
+    assert bars.open.tolist() == [106, 107, 108, 109, 110, 111]
+    assert series.bars(3, include_open=False).open.tolist() == [108, 109, 110]
+
+
+def test_exchange_time_uses_local_date_and_previous_day_for_late_tm():
+    now_ns = START_NS  # 2025-10-09 08:53:20 UTC
+    assert exchange_time_ns('10:53:20', now_ns, 7200) == now_ns
+    assert exchange_time_ns('10:53:20.5', now_ns, 7200) == now_ns + SECOND_NS // 2
+    local_midnight = now_ns - (10 * 3600 + 53 * 60 + 20) * SECOND_NS
+    # Tm ponad 12 h po teraz to transakcja z poprzedniego dnia.
+    assert exchange_time_ns('23:59:59', now_ns, 7200) == local_midnight - SECOND_NS
+    assert exchange_time_ns('22:00:00', now_ns, 7200) == local_midnight + 22 * 3600 * SECOND_NS
+    assert exchange_time_ns('xx', now_ns, 7200) == now_ns
@@ -0,0 +1,109 @@
+import random
+
+from bos_book import BookSide, OrderBook, NEW, CHANGE, DELETE
+
+
+class ListSide:
+    """Naive reference of BookSide: a Python list of [price, size] levels."""
+
+    def __init__(self, depth):
+        self.depth = depth
+        self.levels = []
+
+    def insert(self, level, price, size):
+        i = min(level, len(self.levels) + 1) - 1
+        if 0 <= i < self.depth:
+            self.levels.insert(i, [price, size])
+            del self.levels[self.depth:]
+
+    def change(self, level, price, size):
+        i = level - 1
+        if i < 0:
+            return
+        if i >= len(self.levels):
+            if price is not None: self.insert(level, price, size)
+            return
+        if price is not None: self.levels[i][0] = price
+        self.levels[i][1] = size
+
+    def delete(self, level):
+        if 0 < level <= len(self.levels):
+            del self.levels[level - 1]
+
+    def cumulative(self, level):
+        return sum(size for _, size in self.levels[:max(level, 0)])
+
+
+def test_insert_shifts_levels_down_and_drops_the_last_at_full_depth():
+    side = BookSide(3)
+    side.insert(1, 100, 1)
+    side.insert(1, 101, 2)
+    side.insert(2, 102, 3)
+    assert side.levels() == [(101, 2), (102, 3), (100, 1)]
+    side.insert(1, 103, 4)
+    assert side.levels() == [(103, 4), (101, 2), (102, 3)]
+    side.insert(9, 104, 5)  # poza głębokością przy pełnym arkuszu
+    assert len(side) == 3 and side.levels()[-1] == (102, 3)
+
+
+def test_delete_shifts_levels_up_and_change_keeps_price_when_none():
+    side = BookSide(5)
+    for level, price in enumerate((100, 99, 98), 1):
+        side.insert(level, price, level)
+    side.delete(1)
+    assert side.levels() == [(99, 2), (98, 3)]
+    side.change(2, None, 7)
+    assert side.levels() == [(99, 2), (98, 7)]
+    side.delete(5)
+    assert side.best() == (99, 2)
+    side.clear()
+    assert side.best() is None and side.cumulative(5) == 0
+
+
+def test_cumulative_is_rebuilt_from_the_first_changed_level():
+    side = BookSide(4)
+    for level in range(1, 5):
+        side.insert(level, 100 - level, level)
+    assert [side.cumulative(n) for n in range(1, 6)] == [1, 3, 6, 10, 10]
+    side.change(3, None, 30)
+    assert side.cumulative(2) == 3
+    assert side.cumulative(4) == 37
+    side.delete(1)
+    assert side.cumulative(3) == 36
+
+
+def test_random_updates_match_list_reference():
+    rng = random.Random(3)
+    for depth in (1, 2, 5, 10):
+        side, reference = BookSide(depth), ListSide(depth)
+        for _ in range(5000):
+            action = rng.choice((NEW, NEW, CHANGE, CHANGE, DELETE))
+            level = rng.randint(0, depth + 2)
+            price = rng.choice((None, rng.randint(1, 1000))) if action == CHANGE else rng.randint(1, 1000)
+            size = rng.randint(1, 50)
+            if action == NEW:
+                side.insert(level, price, size)
+                reference.insert(level, price, size)
+            elif action == CHANGE:
+                side.change(level, price, size)
+                reference.change(level, price, size)
+            else:
+                side.delete(level)
+                reference.delete(level)
+            assert side.levels() == [tuple(entry) for entry in reference.levels]
+            if rng.random() < 0.3:
+                n = rng.randint(0, depth + 1)
+                assert side.cumulative(n) == reference.cumulative(n)
+
+
+def test_order_book_routes_sides_and_reports_spread():
+    book = OrderBook('PL0GF0031252', 5)
+    assert book.spread() is None
+    book.apply(NEW, '0', 1, 2500, 3)
+    book.apply(NEW, '1', 1, 2502, 4)
+    book.apply(NEW, '0', 1, 2501, 1)
+    assert book.best_bid() == (2501, 1) and book.best_ask() == (2502, 4)
+    assert book.spread() == 1
+    book.apply(DELETE, '0', 1, None, None)
+    assert book.spread() == 2
+    assert book.seq == 4
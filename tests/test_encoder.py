@@ -0,0 +1,80 @@
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+import pytest
+
+import bos_fixml
+from bos_encoder import FixmlEncoder, TimestampCache, escape_attr
+from bos_price import TickTable
+from bos_transport import decode_frame, encode_frame
+
+NOW = 1_700_000_123.75
+TICKS = TickTable({'PL0GF0031252': '1'})
+
+
+class FrozenDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return datetime.fromtimestamp(int(NOW), tz)
+
+
+@pytest.fixture
+def encoder(monkeypatch):
+    # build_* biorą czas z datetime.now(), koder z zegara - oba zamrożone na tej samej sekundzie.
+    monkeypatch.setattr(bos_fixml, 'datetime', FrozenDatetime)
+    return FixmlEncoder(TICKS, clock=lambda: NOW)
+
+
+def test_login_matches_reference(encoder):
+    message = encoder.login(7, 'BOS', 'haslo')
+    assert message.frame == encode_frame(bos_fixml.build_login_request(7, 'BOS', 'haslo'))
+    assert message.key == '7'
+
+
+@pytest.mark.parametrize('isin, price', [('PL0GF0031252', 2501), ('PLPKO0000016', 4567)])
+def test_limit_order_matches_reference(encoder, isin, price):
+    message = encoder.limit_order(12, '00-22-000000', '1', 3, price, isin)
+    assert message.frame == encode_frame(bos_fixml.build_limit_order(12, '00-22-000000', '1', 3, price, isin, TICKS))
+    assert message.key == '12'
+
+
+def test_cancel_matches_reference(encoder):
+    message = encoder.cancel(13, '445566', '00-22-000000', '2', 1, 'PL0GF0031252')
+    assert message.frame == encode_frame(bos_fixml.build_cancel_request(13, '445566', '00-22-000000', '2', 1, 'PL0GF0031252'))
+
+
+def test_filter_requests_match_reference(encoder):
+    assert encoder.filter_add(5, 'PL0GF0031252').frame == encode_frame(bos_fixml.build_filter_add(5, 'PL0GF0031252'))
+    assert encoder.filter_add(5, ['PL0GF0031252']).frame == encoder.filter_add(5, 'PL0GF0031252').frame
+    assert encoder.filter_clear(6).frame == encode_frame(bos_fixml.build_filter_clear(6))
+
+
+def test_filter_add_batches_instruments_in_one_request(encoder):
+    root = ET.fromstring(decode_frame(encoder.filter_add(8, ['PL0GF0031252', 'PLPKO0000016'], depth=5).frame[4:]))
+    request = root.find('MktDataReq')
+    assert request.get('MktDepth') == '5'
+    assert [instrument.get('ID') for instrument in request.iter('Instrmt')] == ['PL0GF0031252', 'PLPKO0000016']
+    removal = ET.fromstring(decode_frame(encoder.filter_remove(9, 'PLPKO0000016').frame[4:])).find('MktDataReq')
+    assert removal.get('SubReqTyp') == '2'
+    assert [instrument.get('ID') for instrument in removal.iter('Instrmt')] == ['PLPKO0000016']
+
+
+@pytest.mark.parametrize('value', ['a&b', '<x>', 'say "hi"', "it's", 'tab\there', 'line\nbreak\r', 'zażółć'])
+def test_attribute_values_are_escaped(encoder, value):
+    assert ET.fromstring(f'<a v="{escape_attr(value)}"/>').get('v') == value
+    root = ET.fromstring(decode_frame(encoder.login(1, value, value).frame[4:]))
+    user_req = root.find('UserReq')
+    assert user_req.get('Username') == value
+    assert user_req.get('Password') == value
+
+
+def test_timestamps_are_formatted_once_per_second():
+    now = [NOW]
+    cache = TimestampCache(lambda: now[0])
+    first = cache.now()
+    formatted = cache._current
+    now[0] += 0.2
+    assert cache.now() == first
+    assert cache._current is formatted
+    now[0] += 1
+    assert cache.now()[1] != first[1]
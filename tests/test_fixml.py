@@ -0,0 +1,105 @@
+import random
+import xml.etree.ElementTree as ET
+
+import pytest
+
+import bos_fixml
+from bos_fixml import FIXML_OPEN, FIXML_CLOSE
+from bos_price import TickTable
+
+TICKS = TickTable({'PL0GF0031252': '1'})
+
+
+def mkt_data_inc(*incs):
+    return f'{FIXML_OPEN}<MktDataInc>{"".join(incs)}</MktDataInc>{FIXML_CLOSE}'
+
+
+def tree_entries(xml_data):
+    """Reference: every <Inc> with an <Instrmt> read by ElementTree, missing Px/Sz as ''."""
+    entries = []
+    for inc in ET.fromstring(xml_data).iter('Inc'):
+        instrument = inc.find('Instrmt')
+        if instrument is not None:
+            entries.append((inc.get('Typ'), inc.get('Px', ''), inc.get('Sz', ''), instrument.get('ID')))
+    return entries
+
+
+SHAPES = {
+    'canonical': mkt_data_inc('<Inc Typ="0" Px="2501" Sz="3"><Instrmt ID="PL0GF0031252" Src="4"/></Inc>',
+                              '<Inc Typ="1" Px="2502" Sz="7"><Instrmt ID="PL0GF0031252" Src="4"/></Inc>'),
+    'trade with time': mkt_data_inc('<Inc Typ="2" Px="2501" Sz="1" Tm="10:15:02"><Instrmt ID="PL0GF0031252" Src="4"/></Inc>'),
+    'no price': mkt_data_inc('<Inc Typ="C" Sz="51234"><Instrmt ID="PL0GF0031252" Src="4"/></Inc>'),
+    'no size': mkt_data_inc('<Inc Typ="2" Px="12.34"><Instrmt Src="4" ID="PLPKO0000016"/></Inc>'),
+    'size before price': mkt_data_inc('<Inc Typ="0" Sz="3" Px="2501"><Instrmt ID="PL0GF0031252"/></Inc>'),
+    'type not first': mkt_data_inc('<Inc Px="2501" Typ="1" Sz="3"><Instrmt ID="PL0GF0031252"/></Inc>'),
+    'single quotes': mkt_data_inc("<Inc Typ='2' Px='2503' Sz='2'><Instrmt ID='PL0GF0031252'/></Inc>"),
+    'whitespace and newlines': mkt_data_inc('\n <Inc  Typ="0"\n Px="2501"  Sz="3" >\n  <Instrmt ID="PL0GF0031252"/>\n </Inc>\n'),
+    'instrument not first child': mkt_data_inc('<Inc Typ="0" Px="2501" Sz="3"><Extra/><Instrmt ID="PL0GF0031252"/></Inc>'),
+    'several instruments': mkt_data_inc('<Inc Typ="2" Px="2501" Sz="1"><Instrmt ID="PL0GF0031252"/></Inc>',
+                                        '<Inc Typ="2" Px="45.67" Sz="100"><Instrmt ID="PLPKO0000016"/></Inc>'),
+    'empty': mkt_data_inc(),
+}
+
+
+@pytest.mark.parametrize('xml_data', SHAPES.values(), ids=SHAPES.keys())
+def test_market_data_entries_match_element_tree(xml_data):
+    assert [tuple(entry) for entry in bos_fixml.market_data_entries(xml_data)] == tree_entries(xml_data)
+
+
+@pytest.mark.parametrize('xml_data', SHAPES.values(), ids=SHAPES.keys())
+def test_apply_market_data_matches_tree_fallback(xml_data):
+    scanned, tree = {}, {}
+    assert bos_fixml.apply_market_data(xml_data, scanned, TICKS) == bos_fixml.apply_market_data_tree(xml_data, tree, TICKS)
+    assert scanned == tree
+
+
+def test_canonical_message_does_not_need_the_tree():
+    assert bos_fixml._scan_market_data(SHAPES['canonical']) is not None
+    assert bos_fixml._scan_market_data(SHAPES['size before price']) is None
+
+
+def test_random_messages_match_element_tree():
+    rng = random.Random(7)
+    isins = ['PL0GF0031252', 'PLPKO0000016']
+    for _ in range(500):
+        incs = []
+        for _ in range(rng.randint(0, 5)):
+            attrs = [('Typ', rng.choice('0122C'))]
+            if rng.random() < 0.9: attrs.append(('Px', f'{rng.randint(1, 5000)}.{rng.randint(0, 99):02d}'))
+            if rng.random() < 0.9: attrs.append(('Sz', str(rng.randint(1, 500))))
+            if rng.random() < 0.3: attrs.append(('Tm', '10:00:00'))
+            if rng.random() < 0.2: rng.shuffle(attrs)
+            instrument = [('ID', rng.choice(isins)), ('Src', '4')]
+            if rng.random() < 0.3: instrument.reverse()
+            incs.append('<Inc {}><Instrmt {}/></Inc>'.format(' '.join(f'{k}="{v}"' for k, v in attrs), ' '.join(f'{k}="{v}"' for k, v in instrument)))
+        xml_data = mkt_data_inc(*incs)
+        assert [tuple(entry) for entry in bos_fixml.market_data_entries(xml_data)] == tree_entries(xml_data), xml_data
+        scanned, tree = {}, {}
+        bos_fixml.apply_market_data(xml_data, scanned, TICKS)
+        bos_fixml.apply_market_data_tree(xml_data, tree, TICKS)
+        assert scanned == tree, xml_data
+
+
+def tree_inc_entries(xml_data):
+    """Reference for inc_entries: ElementTree with missing (or empty) values as None."""
+    entries = []
+    for inc in ET.fromstring(xml_data).iter('Inc'):
+        instrument = inc.find('Instrmt')
+        if instrument is not None:
+            entries.append(tuple(inc.get(name) or None for name in ('UpdtAct', 'Typ', 'MDPxLvl', 'Px', 'Sz', 'Tm')) + (instrument.get('ID'),))
+    return entries
+
+
+INC_SHAPES = dict(SHAPES, **{
+    'depth level': mkt_data_inc('<Inc UpdtAct="0" Typ="0" MDPxLvl="1" Px="2501" Sz="3"><Instrmt ID="PL0GF0031252"/></Inc>'),
+    'level after size': mkt_data_inc('<Inc Typ="1" Px="2502" Sz="7" MDPxLvl="2" UpdtAct="1"><Instrmt ID="PL0GF0031252"/></Inc>'),
+    'depth and trade': mkt_data_inc('<Inc UpdtAct="2" Typ="0" MDPxLvl="3"><Instrmt ID="PL0GF0031252"/></Inc>',
+                                    '<Inc Typ="2" Px="2501" Sz="1" Tm="10:15:02"><Instrmt ID="PL0GF0031252"/></Inc>'),
+})
+
+
+@pytest.mark.parametrize('xml_data', INC_SHAPES.values(), ids=INC_SHAPES.keys())
+def test_inc_entries_match_element_tree(xml_data):
+    entries = bos_fixml.inc_entries(xml_data)
+    assert entries == tree_inc_entries(xml_data)
+    assert bos_fixml.trade_entries(xml_data) == [(px, sz, tm, isin) for _, typ, _, px, sz, tm, isin in entries if typ == '2']
@@ -0,0 +1,157 @@
+import math
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from bos_indicators import INDICATORS, SMA, EMA, RSI, MACD, IndicatorSet, MACDValue, ema_array, format_values
+
+
+def closes(count, seed=1):
+    rng = random.Random(seed)
+    values, price = [], 2500.0
+    for _ in range(count):
+        price += rng.randint(-5, 5)
+        values.append(price)
+    return values
+
+
+def naive_sma(values, period):
+    return [None if i + 1 < period else sum(values[i + 1 - period:i + 1]) / period for i in range(len(values))]
+
+
+def naive_ema(values, period, alpha=None):
+    alpha = 2 / (period + 1) if alpha is None else alpha
+    out, value = [], None
+    for i, x in enumerate(values):
+        if i + 1 == period:
+            value = sum(values[:period]) / period
+        elif value is not None:
+            value = value + alpha * (x - value)
+        out.append(value)
+    return out
+
+
+def naive_rsi(values, period):
+    out, gain, loss = [None] * min(1, len(values)), 0.0, 0.0
+    for i in range(1, len(values)):
+        change = values[i] - values[i - 1]
+        up, down = max(change, 0.0), max(-change, 0.0)
+        if i < period:
+            gain, loss = gain + up, loss + down
+            out.append(None)
+            continue
+        if i == period:
+            gain, loss = (gain + up) / period, (loss + down) / period
+        else:
+            gain, loss = (gain * (period - 1) + up) / period, (loss * (period - 1) + down) / period
+        out.append(100.0 if loss == 0 and gain > 0 else 50.0 if loss == 0 else 100 - 100 / (1 + gain / loss))
+    return out
+
+
+def naive_macd(values, fast, slow, signal):
+    line = [None if f is None or s is None else f - s for f, s in zip(naive_ema(values, fast), naive_ema(values, slow))]
+    first = next((i for i, x in enumerate(line) if x is not None), len(line))
+    sig = [None] * first + naive_ema(line[first:], signal)
+    return line, sig
+
+
+def assert_series(actual, expected):
+    assert len(actual) == len(expected)
+    for i, (a, e) in enumerate(zip(actual, expected)):
+        if e is None:
+            assert a is None or math.isnan(a), i
+        else:
+            assert a == pytest.approx(e, rel=1e-9, abs=1e-9), i
+
+
+@pytest.mark.parametrize('alpha', [0.5, 2 / 21, 1 / 14, 0.001])
+def test_ema_array_matches_recursion_across_blocks(alpha):
+    values = closes(20_000)
+    expected, y = [], 2400.0
+    for x in values:
+        y += alpha * (x - y)
+        expected.append(y)
+    assert ema_array(values, alpha, 2400.0) == pytest.approx(expected, rel=1e-9)
+
+
+CASES = {
+    'SMA(20)': (lambda: SMA(20), lambda values: naive_sma(values, 20)),
+    'EMA(20)': (lambda: EMA(20), lambda values: naive_ema(values, 20)),
+    'RSI(14)': (lambda: RSI(14), lambda values: naive_rsi(values, 14)),
+    'RSI(2)': (lambda: RSI(2), lambda values: naive_rsi(values, 2)),
+}
+
+
+@pytest.mark.parametrize('name', CASES)
+@pytest.mark.parametrize('count', [0, 1, 13, 20, 21, 3000])
+def test_update_and_backfill_match_naive_reference(name, count):
+    make, naive = CASES[name]
+    values = closes(count)
+    expected = naive(values)
+    indicator = make()
+    assert_series([indicator.update(x) for x in values], expected)
+    assert_series(make().backfill(np.array(values)).tolist(), expected)
+
+
+@pytest.mark.parametrize('name', CASES)
+@pytest.mark.parametrize('split', [0, 5, 19, 20, 1500])
+def test_streaming_continues_from_backfilled_state(name, split):
+    make, naive = CASES[name]
+    values = closes(3000)
+    indicator = make()
+    indicator.backfill(np.array(values[:split]))
+    assert_series([indicator.update(x) for x in values[split:]], naive(values)[split:])
+
+
+@pytest.mark.parametrize('name', CASES)
+def test_peek_equals_update_without_changing_state(name):
+    make, _ = CASES[name]
+    indicator = make()
+    for x in closes(200):
+        peeked = indicator.peek(x)
+        assert indicator.peek(x) == peeked
+        assert indicator.update(x) == peeked
+
+
+def test_macd_matches_naive_reference_streaming_and_backfilled():
+    values = closes(3000)
+    line, signal = naive_macd(values, 12, 26, 9)
+    macd = MACD()
+    streamed = [macd.update(x) for x in values]
+    assert_series([None if v is None else v.macd for v in streamed], line)
+    assert_series([None if v is None else v.signal for v in streamed], signal)
+    filled = MACD().backfill(np.array(values))
+    assert_series(filled.macd.tolist(), line)
+    assert_series(filled.signal.tolist(), signal)
+    assert_series(filled.histogram.tolist(), [None if s is None else m - s for m, s in zip(line, signal)])
+
+    for split in (10, 30, 1500):
+        continued = MACD()
+        continued.backfill(np.array(values[:split]))
+        tail = [continued.update(x) for x in values[split:]]
+        assert_series([None if v is None else v.macd for v in tail], line[split:])
+        assert_series([None if v is None else v.signal for v in tail], signal[split:])
+
+
+def test_indicator_set_feeds_every_indicator():
+    values = closes(100)
+    indicators = IndicatorSet.default()
+    assert set(indicators.indicators) == {'SMA', 'EMA', 'RSI', 'MACD'} and 'RSI' in indicators
+    indicators.backfill(np.array(values[:50]))
+    for x in values[50:]:
+        latest = indicators.update(x)
+    assert latest == indicators.values()
+    assert latest['SMA'] == pytest.approx(naive_sma(values, 20)[-1])
+    assert latest['RSI'] == pytest.approx(naive_rsi(values, 14)[-1])
+    assert indicators['EMA'].value == pytest.approx(naive_ema(values, 20)[-1])
+
+
+def test_chart_indicators_build_with_defaults_and_format():
+    indicators = IndicatorSet(**{name: factory() for name, factory in INDICATORS.items()})
+    assert format_values(indicators.values()) == 'SMA=- EMA=- RSI=- MACD=-'
+    for close in range(100, 160):
+        values = indicators.update(float(close))
+    assert values['SMA'] == sum(range(140, 160)) / 20
+    assert format_values({'RSI': 100.0, 'MACD': MACDValue(1.5, None, None)}) == 'RSI=100.00 MACD=1.50/-/-'
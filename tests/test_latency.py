@@ -0,0 +1,36 @@
+import time
+
+from bos_latency import ACK, BUILT, DECISION, PARSED, RECV, SENT, WAKE, LatencyTracker, span_us
+
+
+def record(recv, parsed, wake, decision, built, sent, ack):
+    return [recv, parsed, wake, decision, built, sent, ack]
+
+
+def test_event_driven_span_covers_the_whole_path():
+    rec = record(1_000, 2_000, 0, 3_000, 4_000, 5_000, 9_000)
+    assert span_us(rec, RECV, SENT) == 4.0
+    assert span_us(rec, PARSED, DECISION) == 1.0
+    assert span_us(rec, PARSED, WAKE) is None
+
+
+def test_polling_wait_is_excluded_from_tick_to_trade():
+    # Tick sparsowany w 2 µs, pętla obudziła się dopiero po 1.5 s.
+    wake = 2_000 + 1_500_000_000
+    rec = record(1_000, 2_000, wake, wake + 1_000, wake + 2_000, wake + 3_000, wake + 10_000)
+    assert span_us(rec, RECV, SENT) == 4.0
+    assert span_us(rec, PARSED, DECISION) == 1.0
+    assert span_us(rec, PARSED, WAKE) == 1_500_000.0
+    assert span_us(rec, BUILT, ACK) == 8.0
+
+
+def test_tracker_keeps_polling_wait_in_its_own_histogram():
+    tracker = LatencyTracker()
+    now = time.perf_counter_ns()
+    tracker.start('1', (now - 1_000_003_000, now - 1_000_002_000, now - 2_000, now - 1_000))
+    tracker.stamp('1', SENT)
+    assert tracker.ack('1') is not None
+    report = tracker.report()
+    assert report['poll_wait']['count'] == 1
+    assert report['poll_wait']['max_us'] == 1_000_000.0
+    assert report['tick_to_trade']['max_us'] < report['poll_wait']['max_us']
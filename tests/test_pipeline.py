@@ -0,0 +1,59 @@
+import threading
+
+from bos_pipeline import RingBuffer
+
+
+def test_items_come_out_in_order_across_wraparound():
+    ring = RingBuffer(3)
+    expected = []
+    for item in range(10):
+        assert ring.put(item)
+        if len(ring) == 2:
+            expected.append(ring.get())
+    while len(ring):
+        expected.append(ring.get())
+    assert expected == list(range(10))
+    assert ring.stats() == {'depth': 0, 'high_water': 2, 'capacity': 3, 'total': 10, 'full_waits': 0}
+
+
+def test_slots_are_released_after_get():
+    ring = RingBuffer(2)
+    for item in ('a', 'b', 'c'):
+        ring.put(item)
+        ring.get()
+    assert ring._slots == [None, None]
+
+
+def test_full_buffer_blocks_the_producer_until_a_get():
+    ring = RingBuffer(2)
+    ring.put(1)
+    ring.put(2)
+    done = threading.Event()
+    producer = threading.Thread(target=lambda: (ring.put(3), done.set()))
+    producer.start()
+    assert not done.wait(0.05)
+    assert ring.get() == 1
+    assert done.wait(1)
+    producer.join()
+    assert [ring.get(), ring.get()] == [2, 3]
+    assert ring.stats()['full_waits'] == 1
+
+
+def test_close_drains_then_ends():
+    ring = RingBuffer(2)
+    ring.put('x')
+    ring.close()
+    assert not ring.put('y')
+    assert ring.get() == 'x'
+    assert ring.get() is None
+
+
+def test_close_wakes_a_blocked_producer():
+    ring = RingBuffer(1)
+    ring.put(1)
+    result = []
+    producer = threading.Thread(target=lambda: result.append(ring.put(2)))
+    producer.start()
+    ring.close()
+    producer.join(1)
+    assert result == [False]
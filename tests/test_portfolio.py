@@ -0,0 +1,59 @@
+from bos_fixml import FIXML_OPEN, FIXML_CLOSE
+from bos_portfolio import PortfolioState
+
+ACCOUNT = '00-22-000000'
+
+
+def statement(funds, positions, account=ACCOUNT):
+    fund_xml = ''.join(f'<Fund name="{name}" value="{value}"/>' for name, value in funds.items())
+    position_xml = ''.join(f'<Position Acc110="{quantity}" Acc120="0"><Instrmt Sym="{isin[2:6]}" ID="{isin}"/></Position>' for isin, quantity in positions.items())
+    return f'{FIXML_OPEN}<Statement Acct="{account}" type="normal">{fund_xml}{position_xml}</Statement>{FIXML_CLOSE}'
+
+
+def position(isin, quantity):
+    return {'symbol': isin[2:6], 'isin': isin, 'quantity': quantity, 'blocked_quantity': '0'}
+
+
+def test_first_statement_reports_everything():
+    state = PortfolioState()
+    portfolio, changes = state.apply_statement(statement({'SaldoGot': '1000.00'}, {'PL0GF0031252': 2}))
+    assert portfolio[ACCOUNT]['positions'] == [position('PL0GF0031252', 2)]
+    assert changes == {ACCOUNT: {'funds': {'SaldoGot': '1000.00'}, 'positions': {'PL0GF0031252': position('PL0GF0031252', 2)}}}
+
+
+def test_positions_are_diffed_by_isin():
+    state = PortfolioState()
+    state.apply_statement(statement({'SaldoGot': '1000.00'}, {'PL0GF0031252': 2, 'PLPKO0000016': 100}))
+    _, changes = state.apply_statement(statement({'SaldoGot': '1000.00'}, {'PL0GF0031252': 3, 'PLPZU0000011': 10}))
+    assert changes == {ACCOUNT: {'funds': {}, 'positions': {
+        'PL0GF0031252': position('PL0GF0031252', 3),
+        'PLPZU0000011': position('PLPZU0000011', 10),
+        'PLPKO0000016': None,
+    }}}
+    assert set(state.accounts[ACCOUNT]['positions']) == {'PL0GF0031252', 'PLPZU0000011'}
+
+
+def test_fund_changes_and_removals():
+    state = PortfolioState()
+    state.apply_statement(statement({'SaldoGot': '1000.00', 'Depozyt': '50.00'}, {}))
+    _, changes = state.apply_statement(statement({'SaldoGot': '990.00'}, {}))
+    assert changes == {ACCOUNT: {'funds': {'SaldoGot': '990.00', 'Depozyt': None}, 'positions': {}}}
+
+
+def test_repeated_statement_is_dropped_without_parsing():
+    state = PortfolioState()
+    xml_data = statement({'SaldoGot': '1000.00'}, {'PL0GF0031252': 2})
+    state.apply_statement(xml_data)
+    assert state.apply_statement(xml_data) == (None, {})
+    # Ten sam stan w innym tekście jest parsowany, ale nie daje zmian.
+    portfolio, changes = state.apply_statement(xml_data.replace('type="normal"', 'type="normal" '))
+    assert portfolio is not None and changes == {}
+    assert state.stats() == {'statements': 3, 'unchanged': 2, 'accounts': 1}
+
+
+def test_missing_account_maps_to_none():
+    state = PortfolioState()
+    state.apply({ACCOUNT: {'funds': {}, 'positions': []}, '00-22-111111': {'funds': {}, 'positions': []}})
+    changes = state.apply({ACCOUNT: {'funds': {}, 'positions': []}})
+    assert changes == {'00-22-111111': None}
+    assert list(state.accounts) == [ACCOUNT]
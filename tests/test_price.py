@@ -0,0 +1,87 @@
+import random
+from decimal import Decimal, ROUND_HALF_UP
+
+import pytest
+
+from bos_price import TickSize, TickTable, parse_units
+
+
+def reference_ticks(text, tick, decimals=2):
+    """Decimal reference: round to ``decimals`` places, then to the nearest tick, halves up."""
+    price = Decimal(text).quantize(Decimal(1).scaleb(-decimals), ROUND_HALF_UP)
+    return int((price / Decimal(tick)).quantize(Decimal(1), ROUND_HALF_UP))
+
+
+@pytest.mark.parametrize('text, units', [
+    ('2500.00', 250000), ('12.3', 1230), ('12', 1200), ('.5', 50), ('0.01', 1),
+    ('12.344', 1234), ('12.345', 1235), ('12.3449', 1234), ('-12.345', -1235), ('+1.00', 100),
+])
+def test_parse_units_rounds_half_away_from_zero(text, units):
+    assert parse_units(text, 2) == units
+
+
+@pytest.mark.parametrize('text', ['', 'abc', '1.2.3', '1,5', '.', '-'])
+def test_parse_units_rejects_malformed_prices(text):
+    with pytest.raises(ValueError):
+        parse_units(text, 2)
+
+
+@pytest.mark.parametrize('tick', ['0', '-1', '0.001x'])
+def test_tick_size_rejects_bad_ticks(tick):
+    with pytest.raises(ValueError):
+        TickSize(tick)
+
+
+def test_fw20_prices_are_whole_points():
+    fw20 = TickSize('1')
+    assert fw20.to_ticks('2500.00') == 2500
+    assert fw20.to_ticks('2500.49') == 2500
+    assert fw20.to_ticks('2500.50') == 2501
+    assert fw20.to_ticks('2500') == 2500
+    assert fw20.format(2500) == '2500.00'
+    assert fw20.to_float(2500) == 2500.0
+
+
+def test_off_grid_prices_round_to_nearest_tick():
+    nickel = TickSize('0.05')
+    assert nickel.to_ticks('10.02') == 200
+    assert nickel.to_ticks('10.03') == 201
+    assert nickel.to_ticks('10.025') == 201  # najpierw do groszy (10.03), potem do ticka
+    assert nickel.format(201) == '10.05'
+
+
+def test_finer_tick_widens_decimals():
+    fine = TickSize('0.0001')
+    assert fine.decimals == 4
+    assert fine.to_ticks('1.2345') == 12345
+    assert fine.format(12345) == '1.2345'
+
+
+@pytest.mark.parametrize('tick', ['0.01', '0.05', '0.1', '0.5', '1', '2.5', '10'])
+def test_random_prices_match_decimal_reference(tick):
+    rng = random.Random(tick)
+    size = TickSize(tick)
+    for _ in range(2000):
+        text = f"{rng.randint(0, 99999)}.{rng.randint(0, 999):03d}"[:rng.choice((-4, -2, -1, None))]
+        expected = reference_ticks(text, tick)
+        assert size.to_ticks(text) == expected, text
+        on_grid = size.format(expected)
+        assert size.to_ticks(on_grid) == expected
+        assert Decimal(on_grid) == expected * Decimal(tick)
+
+
+def test_table_falls_back_to_default_tick():
+    table = TickTable({'PL0GF0031252': '1'})
+    assert table.to_ticks('PL0GF0031252', '2500.00') == 2500
+    assert table.to_ticks('PLPKO0000016', '45.67') == 4567
+    table.set('PLPKO0000016', '0.05')
+    assert table.to_ticks('PLPKO0000016', '45.67') == 913
+    assert table.format('PLPKO0000016', 913) == '45.65'
+
+
+def test_amounts_keep_precision_finer_than_the_tick():
+    fw20 = TickSize('1')
+    commission = fw20.to_units('1.25')
+    assert commission == 125
+    assert fw20.format_units(2500 * fw20.units + 2 * commission) == '2502.50'
+    assert fw20.format_units(-commission) == '-1.25'
@@ -0,0 +1,94 @@
+import pytest
+
+from bos_recorder import FILE_MAGIC, ASYNC_IN, SYNC_OUT, SYNC_IN, FeedRecorder, FeedReader, Record, index_path, read_index
+
+SECOND_NS = 1_000_000_000
+START_NS = 1_760_000_000 * SECOND_NS
+
+
+def write_capture(path, records, **kwargs):
+    recorder = FeedRecorder(path, **kwargs).start()
+    for timestamp_ns, direction, payload in records:
+        recorder.record(direction, payload, timestamp_ns)
+    recorder.close()
+    return recorder
+
+
+def sample_records(count=2000):
+    directions = (ASYNC_IN, ASYNC_IN, ASYNC_IN, SYNC_OUT, SYNC_IN)
+    return [Record(START_NS + i * 10_000_000, directions[i % 5], f'<FIXML><Heartbeat n="{i}"/></FIXML>'.encode()) for i in range(count)]
+
+
+def test_records_round_trip_unchanged(tmp_path):
+    path = str(tmp_path / 'session.feed')
+    records = sample_records()
+    recorder = write_capture(path, records)
+    assert recorder.stats()['records'] == len(records) and recorder.stats()['dropped'] == 0
+    with FeedReader(path) as reader:
+        assert list(reader) == records
+
+
+@pytest.mark.parametrize('start_s, end_s', [(0, 20), (3.3, 7.7), (5, 5), (19.99, 40), (-5, 2.5)])
+def test_time_range_queries_use_the_index(tmp_path, start_s, end_s):
+    path = str(tmp_path / 'session.feed')
+    records = sample_records()
+    write_capture(path, records, index_interval=1.0)
+    timestamps, offsets = read_index(path)
+    assert len(timestamps) == 20 and timestamps == sorted(timestamps)
+    start_ns, end_ns = START_NS + int(start_s * SECOND_NS), START_NS + int(end_s * SECOND_NS)
+    with FeedReader(path) as reader:
+        assert list(reader.records(start_ns, end_ns)) == [r for r in records if start_ns <= r.timestamp_ns <= end_ns]
+
+
+def test_out_of_order_stamps_are_raised_so_range_queries_see_them(tmp_path):
+    path = str(tmp_path / 'session.feed')
+    stamps = [100, 300, 200, 400, 350, 500]
+    recorder = write_capture(path, [(START_NS + t, ASYNC_IN, str(t).encode()) for t in stamps], index_interval=1e-7)
+    assert recorder.stats()['reordered'] == 2
+    with FeedReader(path) as reader:
+        written = list(reader)
+    assert [r.payload for r in written] == [str(t).encode() for t in stamps]
+    assert [r.timestamp_ns - START_NS for r in written] == [100, 300, 300, 400, 400, 500]
+    with FeedReader(path) as reader:
+        assert [r.payload for r in reader.records(START_NS + 300, START_NS + 400)] == [b'300', b'200', b'400', b'350']
+
+
+def test_truncated_last_record_ends_iteration(tmp_path):
+    path = str(tmp_path / 'session.feed')
+    records = sample_records(10)
+    write_capture(path, records)
+    with open(path, 'r+b') as f:
+        f.truncate(f.seek(0, 2) - 3)
+    with FeedReader(path) as reader:
+        assert list(reader) == records[:-1]
+
+
+def test_missing_index_reads_from_the_start(tmp_path):
+    path = str(tmp_path / 'session.feed')
+    records = sample_records(100)
+    write_capture(path, records)
+    (tmp_path / 'session.feed.idx').unlink()
+    assert read_index(path) == ([], [])
+    with FeedReader(path) as reader:
+        assert list(reader.records(records[50].timestamp_ns)) == records[50:]
+
+
+def test_rejects_files_that_are_not_captures(tmp_path):
+    path = tmp_path / 'other.feed'
+    path.write_bytes(b'NOTAFEED' + FILE_MAGIC)
+    with pytest.raises(ValueError):
+        FeedReader(str(path))
+    (tmp_path / 'x.feed').write_bytes(FILE_MAGIC)
+    (tmp_path / 'x.feed.idx').write_bytes(b'garbage!')
+    assert index_path(str(tmp_path / 'x.feed')).endswith('.idx')
+    with pytest.raises(ValueError):
+        read_index(str(tmp_path / 'x.feed'))
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path):
+    recorder = FeedRecorder(str(tmp_path / 'session.feed'), max_pending=10)
+    for i in range(25):
+        recorder.record(ASYNC_IN, b'x', START_NS + i)
+    assert recorder.stats()['dropped'] == 15
+    recorder.start().close()
+    assert recorder.stats()['records'] == 10
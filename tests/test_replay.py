@@ -0,0 +1,83 @@
+import queue
+import threading
+import time
+from collections import Counter
+
+import pytest
+
+pytest.importorskip('numpy')
+
+import bos_fixml
+from bos_bot import BossaAPIClient
+from bos_recorder import FeedReader, ASYNC_IN, SYNC_OUT
+from bos_replay import SessionReplay
+from bos_simulator import NOL3Simulator
+from bos_transport import decode_frame
+
+ISINS = ['PL0GF0031252', 'PL0GF0031880']
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Przekroczono czas oczekiwania.")
+        time.sleep(0.01)
+
+
+@pytest.fixture(scope='module')
+def recorded(tmp_path_factory):
+    """Live session against the simulator, recorded; returns (capture path, final live quotes)."""
+    path = str(tmp_path_factory.mktemp('replay') / 'session.feed')
+    simulator = NOL3Simulator(rate=400, heartbeat_interval=0.2, statement_interval=0.3, seed=5).start()
+    events = queue.Queue()
+    client = BossaAPIClient('BOS', 'BOS', events, sync_port=simulator.sync_port, async_port=simulator.async_port, gui_rate_hz=None, record_path=path)
+    threading.Thread(target=client.run, daemon=True).start()
+    try:
+        wait_for(lambda: client.recorder is not None and client.async_pipeline is not None)
+        client.add_to_filter(ISINS)
+        wait_for(lambda: all(client.market_data.get(isin, 'last_price') is not None for isin in ISINS))
+        time.sleep(0.5)
+        # Koniec notowań przed rozłączeniem, aby klient przetworzył wszystko, co nagrał.
+        simulator.rate = 0
+        time.sleep(0.3)
+        quotes = {isin: client.market_data.quote(isin) for isin in ISINS}
+    finally:
+        client.disconnect()
+        simulator.stop()
+    return path, quotes
+
+
+def test_capture_holds_the_async_feed_and_sync_requests_without_the_login(recorded):
+    path, _ = recorded
+    with FeedReader(path) as reader:
+        records = list(reader)
+    kinds = Counter(bos_fixml.message_type(decode_frame(record.payload)) for record in records if record.direction == ASYNC_IN)
+    assert kinds['MktDataInc'] > 100 and kinds['Statement'] >= 1 and kinds['Heartbeat'] >= 1
+    outgoing = [record.payload for record in records if record.direction == SYNC_OUT]
+    assert any(b'MktDataReq' in payload for payload in outgoing)
+    assert not any(b'UserReq' in payload for payload in outgoing)
+
+
+def test_replay_rebuilds_the_live_quotes(recorded):
+    path, quotes = recorded
+    replay = SessionReplay(path)
+    stats = replay.run()
+    with FeedReader(path) as reader:
+        recorded_types = Counter(bos_fixml.message_type(decode_frame(record.payload)) for record in reader if record.direction == ASYNC_IN)
+    assert stats['messages'] == dict(recorded_types)
+    assert {isin: replay.client.market_data.quote(isin) for isin in ISINS} == quotes
+
+
+def test_replay_runs_actions_at_capture_time_and_tracks_its_clock(recorded):
+    path, _ = recorded
+    replay = SessionReplay(path)
+    seen = []
+    replay.at(0.8, lambda client: seen.append((client.clock.time_ns(), len(client.tick_history.last_seconds(ISINS[0], 0.5)))))
+    replay.run()
+    with FeedReader(path) as reader:
+        first_ns = next(record.timestamp_ns for record in reader if record.direction == ASYNC_IN)
+    assert len(seen) == 1
+    action_ns, recent_ticks = seen[0]
+    assert action_ns == first_ns + 800_000_000
+    assert recent_ticks > 0
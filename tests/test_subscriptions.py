@@ -0,0 +1,92 @@
+import itertools
+import xml.etree.ElementTree as ET
+
+from bos_encoder import FixmlEncoder
+from bos_fixml import FIXML_OPEN, FIXML_CLOSE
+from bos_subscriptions import SubscriptionManager
+from bos_transport import decode_frame
+
+CONFIRMED = f'{FIXML_OPEN}<MktDataFull/>{FIXML_CLOSE}'
+ISINS = [f'PL{i:010d}' for i in range(7)]
+
+
+class FakeServer:
+    """send_many stub: records each write as [(SubReqTyp, [ISIN, ...]), ...] and confirms all but ``reject``."""
+
+    def __init__(self):
+        self.writes = []
+        self.reject = set()
+
+    def send_many(self, requests):
+        write = []
+        for request in requests:
+            element = ET.fromstring(decode_frame(request.frame[4:])).find('MktDataReq')
+            write.append((element.get('SubReqTyp'), [instrument.get('ID') for instrument in element.iter('Instrmt')]))
+        self.writes.append(write)
+        return [None if set(isins) & self.reject else CONFIRMED for _, isins in write]
+
+
+def manager(**kwargs):
+    server = FakeServer()
+    ids = itertools.count(1)
+    return SubscriptionManager(FixmlEncoder(), server.send_many, lambda: next(ids), **kwargs), server
+
+
+def test_add_sends_only_new_instruments_in_batches():
+    subscriptions, server = manager(batch_size=3)
+    assert subscriptions.add(ISINS[:5]) == set(ISINS[:5])
+    assert server.writes == [[('1', ISINS[0:3]), ('1', ISINS[3:5])]]
+    assert subscriptions.add(ISINS[3:7]) == set(ISINS[5:7])
+    assert server.writes[-1] == [('1', ISINS[5:7])]
+    assert subscriptions.add(ISINS[:2]) == set()
+    assert len(server.writes) == 2
+    assert subscriptions.instruments == frozenset(ISINS)
+
+
+def test_remove_lists_only_dropped_instruments():
+    subscriptions, server = manager(batch_size=2)
+    subscriptions.add(ISINS[:4])
+    assert subscriptions.remove([ISINS[1], ISINS[2], ISINS[6]]) == {ISINS[1], ISINS[2]}
+    assert server.writes[-1] == [('2', [ISINS[1], ISINS[2]])]
+    assert subscriptions.instruments == {ISINS[0], ISINS[3]}
+    assert subscriptions.remove(ISINS[6]) == set()
+
+
+def test_remove_without_partial_support_clears_and_resubscribes():
+    subscriptions, server = manager(partial_remove=False)
+    subscriptions.add(ISINS[:3])
+    assert subscriptions.remove(ISINS[1]) == {ISINS[1]}
+    assert server.writes[-1] == [('2', []), ('1', [ISINS[0], ISINS[2]])]
+    assert subscriptions.instruments == {ISINS[0], ISINS[2]}
+
+
+def test_set_diffs_against_the_filter():
+    subscriptions, server = manager()
+    subscriptions.add(ISINS[:3])
+    assert subscriptions.set(ISINS[2:5]) == ({ISINS[3], ISINS[4]}, {ISINS[0], ISINS[1]})
+    assert server.writes[1:] == [[('2', ISINS[0:2])], [('1', ISINS[3:5])]]
+
+
+def test_rejected_batch_stays_out_of_the_filter():
+    subscriptions, server = manager(batch_size=2)
+    server.reject = {ISINS[2]}
+    assert subscriptions.add(ISINS[:4]) == set(ISINS[:2])
+    assert ISINS[2] not in subscriptions and ISINS[3] not in subscriptions
+    server.reject = set()
+    assert subscriptions.add(ISINS[:4]) == {ISINS[2], ISINS[3]}
+
+
+def test_consumers_outlive_the_filter():
+    subscriptions, _ = manager()
+    seen = []
+    consumer = lambda isin, received_ns: seen.append((isin, received_ns))
+    subscriptions.add(ISINS[0], consumer)
+    subscriptions.add_consumer(ISINS[0], consumer)
+    subscriptions.dispatch([ISINS[0], ISINS[1]], 5)
+    assert seen == [(ISINS[0], 5)]
+    assert subscriptions.clear()
+    subscriptions.dispatch([ISINS[0]], 6)
+    assert seen[-1] == (ISINS[0], 6)
+    subscriptions.remove_consumer(ISINS[0], consumer)
+    subscriptions.dispatch([ISINS[0]], 7)
+    assert len(seen) == 2
@@ -0,0 +1,212 @@
+import socket
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import pytest
+
+from bos_transport import (FRAME_HEADER, EncodedMessage, FrameReader, FrameWriter, PipelinedSyncChannel, SyncConnectionPool,
+                           correlation_id, decode_frame, encode_frame)
+
+
+@pytest.fixture
+def pair():
+    a, b = socket.socketpair()
+    yield a, b
+    a.close()
+    b.close()
+
+
+def test_encode_frame_prefixes_little_endian_length():
+    frame = encode_frame('<FIXML>ż</FIXML>')
+    assert FRAME_HEADER.unpack_from(frame)[0] == len('<FIXML>ż</FIXML>'.encode('utf-8'))
+    assert frame[4:].decode('utf-8') == '<FIXML>ż</FIXML>'
+
+
+def test_decode_frame_strips_whitespace_and_nul_padding():
+    assert decode_frame(memoryview(b' \r\n<FIXML/>\x00\x00\n')) == '<FIXML/>'
+    assert decode_frame(memoryview(b'\x00\x00')) == ''
+
+
+def test_reader_splits_many_frames_from_one_recv(pair):
+    a, b = pair
+    messages = [f'<FIXML><Heartbeat n="{i}"/></FIXML>' for i in range(50)]
+    a.sendall(b''.join(encode_frame(message) for message in messages))
+    a.shutdown(socket.SHUT_WR)
+    reader = FrameReader(b)
+    assert [reader.read_message() for _ in messages] == messages
+    assert reader.read_message() is None
+
+
+def test_reader_reassembles_frames_split_across_sends(pair):
+    a, b = pair
+    data = encode_frame('<FIXML><A/></FIXML>') + encode_frame('<FIXML><B/></FIXML>')
+
+    def trickle():
+        for i in range(len(data)):
+            a.sendall(data[i:i + 1])
+        a.shutdown(socket.SHUT_WR)
+
+    thread = threading.Thread(target=trickle)
+    thread.start()
+    reader = FrameReader(b, buffer_size=8)
+    assert reader.read_message() == '<FIXML><A/></FIXML>'
+    assert reader.read_message() == '<FIXML><B/></FIXML>'
+    assert reader.read_message() is None
+    thread.join()
+
+
+def test_reader_grows_buffer_for_frames_larger_than_it(pair):
+    a, b = pair
+    big = '<FIXML>' + 'x' * 100_000 + '</FIXML>'
+    thread = threading.Thread(target=a.sendall, args=(encode_frame(big) + encode_frame('<FIXML/>'),))
+    thread.start()
+    reader = FrameReader(b, buffer_size=1024)
+    assert reader.read_message() == big
+    assert reader.read_message() == '<FIXML/>'
+    thread.join()
+
+
+def test_reader_raises_on_eof_inside_a_frame(pair):
+    a, b = pair
+    a.sendall(encode_frame('<FIXML><A/></FIXML>')[:10])
+    a.shutdown(socket.SHUT_WR)
+    with pytest.raises(ConnectionError):
+        FrameReader(b).read_frame()
+
+
+def test_empty_frame_is_read_as_empty_message(pair):
+    a, b = pair
+    a.sendall(FRAME_HEADER.pack(0) + encode_frame('<FIXML/>'))
+    reader = FrameReader(b)
+    assert reader.read_message() == ''
+    assert reader.read_message() == '<FIXML/>'
+
+
+def test_writer_coalesces_queued_frames_into_one_send(pair):
+    a, b = pair
+    writer = FrameWriter(a)
+    writer.queue('<FIXML><A/></FIXML>')
+    writer.queue('<FIXML><B/></FIXML>')
+    writer.flush()
+    writer.send_many(['<FIXML><C/></FIXML>', '<FIXML><D/></FIXML>'])
+    assert writer.stats.snapshot()['sends'] == 2
+    assert writer.stats.snapshot()['frames'] == 4
+    reader = FrameReader(b)
+    assert [reader.read_message() for _ in range(4)] == [f'<FIXML><{tag}/></FIXML>' for tag in 'ABCD']
+
+
+def test_correlation_id_takes_first_inner_element_id():
+    assert correlation_id('<FIXML v="5.0"><Order ID="17" Acct="1"><Instrmt ID="PL1"/></Order></FIXML>') == '17'
+    assert correlation_id('<FIXML><MktDataReq ReqID="5" SubReqTyp="1"/></FIXML>') == '5'
+    assert correlation_id('<FIXML><UserReq UserReqID="3" Username="BOS"/></FIXML>') == '3'
+    assert correlation_id('<FIXML><Heartbeat/></FIXML>') is None
+    assert correlation_id(EncodedMessage(b'', '9')) == '9'
+
+
+class ScriptedServer:
+    """Sync port stand-in: collects requests and answers when told to."""
+
+    def __init__(self):
+        self.server = socket.create_server(('127.0.0.1', 0))
+        self.port = self.server.getsockname()[1]
+        self.requests = []
+        self.received = threading.Semaphore(0)
+        self.conn = None
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _serve(self):
+        self.conn, _ = self.server.accept()
+        reader = FrameReader(self.conn)
+        while True:
+            try:
+                message = reader.read_message()
+            except OSError:
+                return
+            if message is None:
+                return
+            self.requests.append(message)
+            self.received.release()
+
+    def wait_requests(self, count):
+        for _ in range(count):
+            assert self.received.acquire(timeout=5)
+
+    def answer(self, *messages):
+        self.conn.sendall(b''.join(encode_frame(message) for message in messages))
+
+    def close(self):
+        self.server.close()
+        if self.conn is not None:
+            self.conn.close()
+
+
+@pytest.fixture
+def channel():
+    server = ScriptedServer()
+    channel = PipelinedSyncChannel(SyncConnectionPool('127.0.0.1', server.port, size=1))
+    yield channel, server
+    channel.close()
+    server.close()
+
+
+def test_responses_resolve_futures_by_id_in_any_order(channel):
+    channel, server = channel
+    futures = channel.submit_many([f'<FIXML><Order ID="{i}"/></FIXML>' for i in (1, 2, 3)])
+    server.wait_requests(3)
+    server.answer('<FIXML><ExecRpt ID="3"/></FIXML>', '<FIXML><ExecRpt ID="1"/></FIXML>', '<FIXML><ExecRpt ID="2"/></FIXML>')
+    assert [correlation_id(response) for response in channel.results(futures, 5)] == ['1', '2', '3']
+    assert channel.stats()['max_in_flight'] == 3
+    assert channel.stats()['unmatched'] == 0
+
+
+def test_response_without_known_id_resolves_oldest_request(channel):
+    channel, server = channel
+    first = channel.submit('<FIXML><Order ID="1"/></FIXML>')
+    second = channel.submit('<FIXML><Order ID="2"/></FIXML>')
+    server.wait_requests(2)
+    server.answer('<FIXML><BizMsgRej Txt="x"/></FIXML>', '<FIXML><ExecRpt ID="2"/></FIXML>')
+    assert 'BizMsgRej' in first.result(5)
+    assert 'ID="2"' in second.result(5)
+    assert channel.stats()['unmatched'] == 1
+
+
+def test_timed_out_request_is_dropped_and_its_late_answer_discarded(channel):
+    channel, server = channel
+    with pytest.raises(FutureTimeoutError):
+        channel.request('<FIXML><Order ID="1"/></FIXML>', timeout=0.05)
+    assert channel.stats()['in_flight'] == 0
+    future = channel.submit('<FIXML><Order ID="2"/></FIXML>')
+    server.wait_requests(2)
+    # Spóźniona odpowiedź na ID 1 nie może rozwiązać żądania 2.
+    server.answer('<FIXML><ExecRpt ID="1"/></FIXML>', '<FIXML><ExecRpt ID="2"/></FIXML>')
+    assert correlation_id(future.result(5)) == '2'
+    stats = channel.stats()
+    assert (stats['timed_out'], stats['late'], stats['unmatched']) == (1, 1, 0)
+
+
+def test_late_answer_to_request_without_id_is_discarded(channel):
+    channel, server = channel
+    with pytest.raises(FutureTimeoutError):
+        channel.request('<FIXML><Heartbeat/></FIXML>', timeout=0.05)
+    future = channel.submit('<FIXML><Heartbeat/></FIXML>')
+    server.wait_requests(2)
+    server.answer('<FIXML><BizMsgRej Txt="first"/></FIXML>', '<FIXML><BizMsgRej Txt="second"/></FIXML>')
+    assert 'second' in future.result(5)
+
+
+def test_close_fails_pending_requests(channel):
+    channel, server = channel
+    future = channel.submit('<FIXML><Order ID="1"/></FIXML>')
+    server.wait_requests(1)
+    channel.close()
+    with pytest.raises(ConnectionError):
+        future.result(5)
+
+
+def test_server_disconnect_fails_pending_requests(channel):
+    channel, server = channel
+    future = channel.submit('<FIXML><Order ID="1"/></FIXML>')
+    server.wait_requests(1)
+    server.conn.shutdown(socket.SHUT_RDWR)
+    with pytest.raises(ConnectionError):
+        future.result(5)